@@ -0,0 +1,147 @@
+import mmap
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+from Model.Task import Task, Priority
+from Controller.StorageBackend import StorageBackend, gc_paused, sync_file
+
+MAGIC = b'TSKB'
+VERSION = 2
+
+# magic, version, reserved, task count, tag reference count, string count
+HEADER = struct.Struct('<4sHHIII')
+# id string, title string, due date ordinal (0 = none), priority value,
+# completed, tag count, index of the first tag reference, completion date
+# ordinal (0 = none)
+RECORD = struct.Struct('<IIiBBHIi')
+# Version 1 records, written before completion dates were kept
+RECORD_V1 = struct.Struct('<IIiBBHI')
+U32 = struct.Struct('<I')
+SPAN = struct.Struct('<II')
+
+
+class BinaryStorage(StorageBackend):
+    """Compact binary snapshot read through mmap.
+
+    Layout, all little-endian:
+
+        header
+        task records      fixed width, one per task
+        tag references    u32 string index per tag, records point at a run
+        string offsets    u32 per string plus a final end offset
+        string blob       UTF-8, every distinct string stored once
+
+    Scalars sit in fixed-width records, so loading reads them with one
+    struct unpack per task and strings are decoded only when a record
+    refers to them. Mapped pages are faulted in on first touch, so a
+    streamed load only reads the part of the file it has reached.
+    """
+
+    def __init__(self, data_file: str = "tasks.bin"):
+        self.data_file = Path(data_file)
+
+    def save(self, tasks: Iterable[Task]):
+        """Write all tasks atomically in the binary layout"""
+        try:
+            strings: dict[str, int] = {}
+
+            def intern(value: str) -> int:
+                index = strings.get(value)
+                if index is None:
+                    index = strings[value] = len(strings)
+                return index
+
+            records = bytearray()
+            tag_refs = bytearray()
+            count = tag_count = 0
+            for task in tasks:
+                records += RECORD.pack(
+                    intern(task.id), intern(task.title),
+                    task.due_date.toordinal() if task.due_date else 0,
+                    task.priority.value, task.completed, len(task.tags), tag_count,
+                    task.completed_at.toordinal() if task.completed_at else 0,
+                )
+                for tag in task.tags:
+                    tag_refs += U32.pack(intern(tag))
+                tag_count += len(task.tags)
+                count += 1
+
+            encoded = [value.encode('utf-8') for value in strings]
+            offsets = bytearray()
+            position = 0
+            for data in encoded:
+                offsets += U32.pack(position)
+                position += len(data)
+            offsets += U32.pack(position)
+
+            temp_file = self.data_file.with_suffix('.tmp')
+            with open(temp_file, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, 0, count, tag_count, len(encoded)))
+                f.write(records)
+                f.write(tag_refs)
+                f.write(offsets)
+                f.write(b''.join(encoded))
+                if self.fsync:
+                    sync_file(f)
+            temp_file.replace(self.data_file)
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+
+    def load(self) -> list[Task]:
+        with gc_paused():
+            return [task for batch in self.iter_load(None) for task in batch]
+
+    def iter_load(self, batch_size: int = 500, replay=None, max_batch_size: int = None):
+        """Decode records straight from the mapped file in growing batches"""
+        if not self.data_file.exists() or self.data_file.stat().st_size == 0:
+            return
+        try:
+            with open(self.data_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, _, count, tag_count, string_count = HEADER.unpack_from(mm, 0)
+                if magic != MAGIC or version not in (1, VERSION):
+                    raise ValueError(f"Not a version {VERSION} task snapshot")
+                record = RECORD if version == VERSION else RECORD_V1
+                records_at = HEADER.size
+                tags_at = records_at + count * record.size
+                offsets_at = tags_at + tag_count * U32.size
+                blob_at = offsets_at + (string_count + 1) * U32.size
+
+                def string(index: int) -> str:
+                    start, end = SPAN.unpack_from(mm, offsets_at + index * U32.size)
+                    return str(mm[blob_at + start:blob_at + end], 'utf-8')
+
+                # Tags and dates repeat a lot; decode each distinct one once
+                tag_cache: dict[int, str] = {}
+                dates: dict[int, datetime] = {}
+                priorities = {p.value: p for p in Priority}
+
+                batch = []
+                for offset in range(records_at, tags_at, record.size):
+                    id_ref, title_ref, ordinal, priority, completed, n_tags, first_tag, *done = \
+                        record.unpack_from(mm, offset)
+                    tags = []
+                    for i in range(first_tag, first_tag + n_tags):
+                        tag_ref = U32.unpack_from(mm, tags_at + i * U32.size)[0]
+                        tag = tag_cache.get(tag_ref)
+                        if tag is None:
+                            tag = tag_cache[tag_ref] = string(tag_ref)
+                        tags.append(tag)
+                    due = None
+                    if ordinal:
+                        due = dates.get(ordinal)
+                        if due is None:
+                            due = dates[ordinal] = datetime.fromordinal(ordinal)
+                    completed_at = datetime.fromordinal(done[0]) if done and done[0] else None
+                    batch.append(Task.from_fields(string(id_ref), string(title_ref), due, priorities[priority],
+                                                  bool(completed), tags, completed_at))
+                    if batch_size and len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                        batch_size *= 2
+                        if max_batch_size:
+                            batch_size = min(batch_size, max_batch_size)
+                if batch:
+                    yield batch
+        except Exception as e:
+            print(f"Error loading tasks: {e}")
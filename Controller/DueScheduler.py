@@ -0,0 +1,101 @@
+import threading
+from datetime import date, datetime, timedelta
+from Model.Task import Task
+
+# Longest sleep between checks, so a suspend or clock change is noticed
+# within this many seconds even when no task is due for weeks
+MAX_SLEEP = 3600
+
+
+class DueScheduler:
+    """Calls `on_change(due_today, overdue)` when tasks become due or overdue.
+
+    Due dates are days, so an open task changes state only at midnight:
+    when its due day starts and when the next one does. Instead of scanning
+    the tasks on a timer, the scheduler asks the due-date index for the
+    earliest open task due today or later and sleeps until the midnight
+    that changes it, capped at MAX_SLEEP. On waking, the tasks that crossed
+    a boundary are read back with range queries.
+
+    `after(seconds, callback)` arms the timer and returns a handle for
+    `cancel(handle)`. They default to a daemon threading.Timer; the GUI
+    passes wrappers around root.after / after_cancel so callbacks run on
+    the Tk thread. Call reschedule() after tasks change, which is a no-op
+    unless the task manager's version moved.
+    """
+
+    def __init__(self, task_manager, on_change, after=None, cancel=None, clock=datetime.now):
+        self.task_manager = task_manager
+        self.on_change = on_change
+        self._after = after or self._start_timer
+        self._cancel = cancel or (lambda timer: timer.cancel())
+        self._clock = clock
+        self._day: date = None
+        self._version = None
+        self._handle = None
+
+    @staticmethod
+    def _start_timer(seconds: float, callback) -> threading.Timer:
+        timer = threading.Timer(seconds, callback)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def start(self):
+        self._day = self._clock().date()
+        self._arm()
+
+    def stop(self):
+        if self._handle is not None:
+            self._cancel(self._handle)
+            self._handle = None
+
+    def reschedule(self):
+        """Re-arm for the current tasks, if any changed since the timer was armed"""
+        if self._day is not None and self.task_manager.version != self._version:
+            self.stop()
+            self._arm()
+
+    def next_boundary(self) -> datetime:
+        """The next midnight at which an open task becomes due or overdue, or None"""
+        today = self._day
+        due = self.task_manager.next_due_date(today)
+        if due is None:
+            return None
+        day = due.date()
+        # Due today: it turns overdue tomorrow; due later: it turns due that day
+        if day == today:
+            day += timedelta(days=1)
+        return datetime.combine(day, datetime.min.time())
+
+    def _arm(self):
+        self._version = self.task_manager.version
+        boundary = self.next_boundary()
+        if boundary is None:
+            self._handle = None
+            return
+        delay = (boundary - self._clock()).total_seconds()
+        self._handle = self._after(min(max(delay, 0), MAX_SLEEP), self._wake)
+
+    def check(self) -> tuple[list[Task], list[Task]]:
+        """(tasks now due today, tasks now overdue) since the last check"""
+        today = self._clock().date()
+        last, self._day = self._day, today
+        if today <= last:
+            return [], []
+        manager = self.task_manager
+        with manager.lock:
+            # Due from the last checked day through yesterday: crossed into overdue
+            overdue = manager.get_tasks(filter_completed=False, sort=True, due_from=last.strftime("%Y-%m-%d"),
+                                        due_to=(today - timedelta(days=1)).strftime("%Y-%m-%d"))
+            return manager.get_due('today', today), overdue
+
+    def _wake(self):
+        self._handle = None
+        try:
+            due, overdue = self.check()
+            if due or overdue:
+                self.on_change(due, overdue)
+        except Exception as e:
+            print(f"Error checking due tasks: {e}")
+        self._arm()
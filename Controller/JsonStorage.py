@@ -0,0 +1,466 @@
+import codecs
+import io
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import Iterable
+from Model.Task import Task
+from Controller.StorageBackend import StorageBackend, StorageConflict, gc_paused, sync_file
+from Controller.TaskJournal import TaskJournal
+from Controller.FileLock import FileLock
+from Controller.Metrics import metrics
+
+_CHUNK_SIZE = 1 << 16
+# Whitespace and the commas between array elements
+_SKIP = re.compile(r'[\s,]*')
+
+
+def _record_text(data: dict) -> str:
+    """A record exactly as it appears inside the indented snapshot array"""
+    return json.dumps(data, indent=2).replace("\n", "\n  ")
+
+
+def _fingerprint(data: dict) -> int:
+    """Hash of a record's snapshot text, to spot records another process changed"""
+    return hash(_record_text(data))
+
+
+def _flatten(records: list[dict]) -> list[dict]:
+    return [sub_record for record in records
+            for sub_record in (record['records'] if record.get('op') == 'batch' else [record])]
+
+
+def without_ids(records: list[dict], ids: set) -> list[dict]:
+    """`records` minus those about tasks in `ids`.
+
+    Used when merging another process's changes under our own pending
+    ones: ours win for the tasks they touch anyway.
+    """
+    kept = []
+    for record in _flatten(records):
+        if record.get('op') == 'clear_completed' and 'ids' in record:
+            record = {**record, 'ids': [task_id for task_id in record['ids'] if task_id not in ids]}
+        elif (record.get('id') or record.get('task', {}).get('id')) in ids:
+            continue
+        kept.append(record)
+    return kept
+
+
+def record_ids(records: list[dict]) -> set:
+    """Ids of the tasks a list of mutation records touches"""
+    ids = set()
+    for record in _flatten(records):
+        if 'ids' in record:
+            ids.update(record['ids'])
+        else:
+            ids.add(record.get('id') or record.get('task', {}).get('id'))
+    ids.discard(None)
+    return ids
+
+
+class JsonStorage(StorageBackend):
+    """tasks.json snapshot, optionally with an append-only mutation journal.
+
+    Several processes may share the files. Every read and write happens
+    under an advisory FileLock (`<name>.lock`), and writes are optimistic:
+    the snapshot's size and mtime and the journal's size are remembered
+    whenever this process reads or writes them, and a write finding them
+    changed raises StorageConflict instead of overwriting someone else's
+    work. read_changes() then returns just what the other process did, as
+    mutation records: the journal lines it appended, or, if it rewrote the
+    snapshot, the records whose contents differ from the last ones seen.
+    """
+
+    def __init__(self, data_file: str = "tasks.json", journal: bool = False, compact_every: int = 1000):
+        self.data_file = Path(data_file)
+        # Journaled mode appends each mutation to a log instead of rewriting
+        # the whole file, and folds the log into the snapshot every
+        # `compact_every` records.
+        self.journal = TaskJournal(self.data_file.with_suffix('.journal')) if journal else None
+        self.compact_every = compact_every
+        self.lock = FileLock(self.data_file.with_suffix('.lock'))
+        self._snapshot_checksum = 0
+        self._missing_ids = False
+        # (snapshot size, snapshot mtime, journal size) as last read or
+        # written by this process; None until the files are first loaded
+        self._seen: tuple = None
+        # id -> _fingerprint of every record in the stored state. Built on
+        # the first snapshot diff rather than on load, which it would slow
+        # down, and kept current by every write after that.
+        self._fingerprints: dict[str, int] = None
+
+    def _read_snapshot(self, batch_size: int = None, build: bool = True, max_batch_size: int = None,
+                       data: bytes = None):
+        """Parse the snapshot incrementally, yielding lists of tasks (of
+        (record dict, fingerprint) pairs if not `build`).
+
+        The file (or `data`, its bytes read earlier) is read in chunks and
+        records are peeled off the top-level array one at a time with
+        raw_decode, so the first batch is ready after reading only its own
+        bytes. Batches double in size, up to `max_batch_size`, so the number
+        of yields stays logarithmic in the task count. Sets
+        `_snapshot_checksum` and `_missing_ids` once the whole file is read.
+        """
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder('utf-8')()
+        checksum = 0
+        missing_ids = False
+        buf, pos = "", 0
+        started = eof = False
+        batch = []
+
+        if data is not None:
+            f = io.BytesIO(data)
+        else:
+            f = open(self.data_file, 'rb') if self.data_file.exists() else None
+        try:
+            while True:
+                pos = _SKIP.match(buf, pos).end()
+                if not started:
+                    if pos < len(buf):
+                        if buf[pos] != '[':
+                            raise ValueError("Expected a JSON array of tasks")
+                        started = True
+                        pos += 1
+                        continue
+                elif pos < len(buf) and buf[pos] == ']':
+                    break
+                elif pos < len(buf):
+                    start = pos
+                    try:
+                        task_data, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                        task_data = None
+                    if task_data is not None:
+                        pos = end
+                        missing_ids = missing_ids or 'id' not in task_data
+                        if build:
+                            try:
+                                batch.append(Task.from_dict(task_data))
+                            except (KeyError, ValueError) as e:
+                                print(f"Skipping invalid task: {e}")
+                        else:
+                            # Hashing the record's own text is much cheaper
+                            # than re-serializing it
+                            batch.append((task_data, hash(buf[start:end])))
+                        if batch_size and len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+                            batch_size *= 2
+                            if max_batch_size:
+                                batch_size = min(batch_size, max_batch_size)
+                        continue
+
+                if eof:
+                    if started:
+                        raise ValueError("Unterminated JSON array")
+                    break
+                # Need more input for the next token
+                raw = f.read(_CHUNK_SIZE) if f else b""
+                checksum = zlib.crc32(raw, checksum)
+                eof = not raw
+                buf = buf[pos:] + text_decoder.decode(raw, final=eof)
+                pos = 0
+
+            # Trailing bytes after the array still count toward the checksum
+            while f:
+                raw = f.read(_CHUNK_SIZE)
+                if not raw:
+                    break
+                checksum = zlib.crc32(raw, checksum)
+        finally:
+            if f:
+                f.close()
+
+        self._snapshot_checksum = checksum
+        self._missing_ids = missing_ids
+        if batch:
+            yield batch
+
+    def _journal(self) -> TaskJournal:
+        # Journals left by another (journaled) process are read even when
+        # this one does not write one
+        return self.journal or TaskJournal(self.data_file.with_suffix('.journal'))
+
+    def _stat(self) -> tuple:
+        """(snapshot size, snapshot mtime, journal size), the optimistic version"""
+        journal = self._journal().path
+        snapshot = self.data_file.stat() if self.data_file.exists() else None
+        return (snapshot.st_size if snapshot else None, snapshot.st_mtime_ns if snapshot else None,
+                journal.stat().st_size if journal.exists() else 0)
+
+    def _check_unchanged(self):
+        if self._seen is not None and self._stat() != self._seen:
+            raise StorageConflict(f"{self.data_file} was changed by another process")
+
+    def changed(self) -> bool:
+        return self._seen is not None and self._stat() != self._seen
+
+    def load(self) -> list[Task]:
+        """Load tasks from JSON file with enhanced error handling"""
+        with self.lock:
+            self._seen = self._stat()
+            metrics.count('json.read.bytes', self._seen[0] or 0)
+            try:
+                with gc_paused(), metrics.span('json.parse'):
+                    tasks = [task for batch in self._read_snapshot() for task in batch]
+            except Exception as e:
+                print(f"Error loading tasks: {e}")
+                return []
+            return self._replay_journal(tasks)
+
+    def iter_load(self, batch_size: int = 500, replay=None, max_batch_size: int = None):
+        """Stream the snapshot in growing batches, of at most `max_batch_size` tasks.
+
+        Which journal belongs to the snapshot is only known once all of it
+        was read (by its checksum), so leftover journal records come last:
+        their net effect is handed to `replay` as add/update/delete records
+        for the tasks already yielded. Without `replay` the journal is
+        folded in first and everything arrives as a single batch.
+
+        The lock is only held to read the file and to replay the journal,
+        not while the caller works through the batches.
+        """
+        with self.lock:
+            whole = replay is None and self._journal().has_records()
+            if not whole:
+                self._seen = self._stat()
+                data = self.data_file.read_bytes() if self.data_file.exists() else None
+        if whole:
+            yield self.load()
+            return
+
+        metrics.count('json.read.bytes', self._seen[0] or 0)
+        tasks = []
+        try:
+            for batch in self._read_snapshot(batch_size, max_batch_size=max_batch_size, data=data):
+                tasks.extend(batch)
+                yield batch
+        except Exception as e:
+            print(f"Error loading tasks: {e}")
+            return
+
+        with self.lock:
+            if self._stat()[:2] == self._seen[:2]:
+                self._replay_journal(tasks, replay)
+            elif replay is not None:
+                # Another process replaced the snapshot meanwhile: catch up
+                # from a full load (rare, so every task counts as changed)
+                current = self.load()
+                replay(self._net_changes(tasks, {task.id: task for task in current}))
+            # Without `replay` the stale _seen turns the next write into a
+            # StorageConflict, which re-reads the file
+
+    def _replay_journal(self, tasks: list[Task], replay=None) -> list[Task]:
+        """Apply any journal left over from the last session and compact.
+
+        With `replay`, it is also called with the records that turn
+        `tasks` into the replayed state.
+        """
+        missing_ids = self._missing_ids
+        self._fingerprints = None
+
+        # Replay any journal left behind, even when not in journaled mode,
+        # so mutations from an earlier journaled session are never lost.
+        journal = self._journal()
+        records, clean = journal.read(self._snapshot_checksum)
+        if records:
+            by_id = {task.id: task for task in tasks}
+            for record in records:
+                try:
+                    self.apply_record(by_id, record)
+                except (KeyError, ValueError, IndexError, TypeError) as e:
+                    print(f"Skipping invalid journal entry: {e}")
+            if replay is not None:
+                replay(self._net_changes(tasks, by_id))
+            tasks = list(by_id.values())
+            self._note_records(records)
+
+        # Folded into the snapshot, which restarts the journal on top of it.
+        # Never deleted: a journaled process may still be appending to it.
+        if records or not clean or missing_ids:
+            self.save(tasks)
+        elif self.journal is not None and not journal.path.exists():
+            journal.reset(self._snapshot_checksum)
+        self._seen = self._stat()
+        return tasks
+
+    @staticmethod
+    def _net_changes(before: list[Task], after: dict[str, Task]) -> list[dict]:
+        """Records turning `before` into `after`, one per task that differs.
+
+        apply_record builds a new Task for every add and update, so the
+        tasks it left alone are still the same objects.
+        """
+        old = {task.id: task for task in before}
+        records = [{'op': 'delete', 'id': task_id} for task_id in old.keys() - after.keys()]
+        for task_id, task in after.items():
+            if old.get(task_id) is not task:
+                records.append({'op': 'update' if task_id in old else 'add', 'id': task_id, 'task': task.to_dict()})
+        return records
+
+    def _note_records(self, records: list[dict]):
+        """Keep the fingerprints in step with records written or read"""
+        fingerprints = self._fingerprints
+        if fingerprints is None:
+            return
+        for record in _flatten(records):
+            op = record.get('op')
+            if op in ('add', 'update'):
+                fingerprints[record.get('id') or record['task'].get('id')] = _fingerprint(record['task'])
+            elif op == 'delete':
+                fingerprints.pop(record.get('id'), None)
+            elif op == 'clear_completed':
+                for task_id in record.get('ids', ()):
+                    fingerprints.pop(task_id, None)
+
+    def _diff_snapshot(self, tasks: Iterable[Task]) -> list[dict]:
+        """Records turning the last seen state into the current snapshot.
+
+        The snapshot is tokenized, but only records whose fingerprint
+        changed are returned (and later turned into Task objects). Without
+        fingerprints yet, `tasks` (the caller's copy of the last seen
+        state) are fingerprinted first.
+        """
+        if self._fingerprints is None:
+            self._fingerprints = {task.id: _fingerprint(task.to_dict()) for task in tasks or ()}
+        known = self._fingerprints
+        fresh = {}
+        records = []
+        for batch in self._read_snapshot(build=False):
+            for data, fingerprint in batch:
+                task_id = data.get('id')
+                if task_id is None:
+                    continue
+                fresh[task_id] = fingerprint
+                if task_id not in known:
+                    records.append({'op': 'add', 'task': data})
+                elif known[task_id] != fingerprint:
+                    records.append({'op': 'update', 'id': task_id, 'task': data})
+        records.extend({'op': 'delete', 'id': task_id} for task_id in known.keys() - fresh.keys())
+        self._fingerprints = fresh
+        return records
+
+    def read_changes(self, tasks: Iterable[Task] = None) -> list[dict]:
+        """What other processes changed since this one last read or wrote the files.
+
+        `tasks` is the caller's current state, only consulted the first
+        time another process's rewrite of the snapshot has to be diffed.
+        """
+        with self.lock:
+            seen, stat = self._seen, self._stat()
+            if seen is None or stat == seen:
+                return []
+            journal = self._journal()
+            if stat[:2] == seen[:2] and stat[2] >= seen[2]:
+                # Only the journal grew: the new lines are the changes
+                records = journal.read_from(seen[2])
+                self._note_records(records)
+            else:
+                # Rewritten snapshot (a save or another process compacting),
+                # plus whatever was journaled on top of it since
+                records = self._diff_snapshot(tasks)
+                journal_records, _ = journal.read(self._snapshot_checksum)
+                self._note_records(journal_records)
+                records += journal_records
+            self._seen = stat
+            return records
+
+    @staticmethod
+    def apply_record(tasks: dict[str, Task], record: dict):
+        """Apply one journal record to an id -> Task map"""
+        op = record['op']
+        if op == 'add':
+            task = Task.from_dict(record['task'])
+            tasks[task.id] = task
+        elif op in ('update', 'delete'):
+            # Journals written before stable ids address tasks by position
+            task_id = record['id'] if 'id' in record else list(tasks)[record['index']]
+            if op == 'update':
+                tasks[task_id] = Task.from_dict({**record['task'], 'id': task_id})
+            else:
+                # Idempotent, so merging another process's records is safe
+                tasks.pop(task_id, None)
+        elif op == 'batch':
+            # A transaction: one journal line, so it is replayed whole or not at all
+            for sub_record in record['records']:
+                JsonStorage.apply_record(tasks, sub_record)
+        elif op == 'clear_completed':
+            # Records carry the cleared ids; older ones are replayed by state
+            cleared = record['ids'] if 'ids' in record else [t.id for t in tasks.values() if t.completed]
+            for task_id in cleared:
+                tasks.pop(task_id, None)
+        else:
+            raise ValueError(f"Unknown journal op {op!r}")
+
+    def save(self, tasks: Iterable[Task]):
+        """Save tasks to JSON file with atomic write"""
+        with self.lock:
+            self._check_unchanged()
+            self._write_snapshot(tasks)
+
+    def _write_snapshot(self, tasks: Iterable[Task]):
+        try:
+            temp_file = self.data_file.with_suffix('.tmp')
+            with metrics.span('json.serialize'):
+                records = [task.to_dict() for task in tasks]
+                # Same bytes as json.dumps(records, indent=2), built per record
+                # so each one's fingerprint comes for free
+                texts = [_record_text(data) for data in records]
+                payload = ("[\n  " + ",\n  ".join(texts) + "\n]" if texts else "[]").encode('utf-8')
+            with metrics.span('json.write'):
+                with open(temp_file, 'wb') as f:
+                    f.write(payload)
+                    if self.fsync:
+                        sync_file(f)
+
+                # Atomic replace
+                temp_file.replace(self.data_file)
+            metrics.count('json.write.bytes', len(payload))
+            self._snapshot_checksum = TaskJournal.checksum(payload)
+            self._fingerprints = {data['id']: hash(text) for data, text in zip(records, texts)}
+            # Everything journaled so far is in the new snapshot. Another
+            # process's journal is restarted on top of it too, not left
+            # with a base its records would be dropped for on replay.
+            journal = self._journal()
+            if self.journal is not None or journal.path.exists():
+                journal.reset(self._snapshot_checksum, self.fsync)
+            self._seen = self._stat()
+        except Exception as e:  
+            print(f"Error saving tasks: {e}")
+
+    def commit(self, tasks: Iterable[Task], record: dict):
+        """Persist a single mutation, journaled or as a full rewrite"""
+        self.commit_many(tasks, [record])
+
+    def commit_many(self, tasks: Iterable[Task], records: list[dict]):
+        """Persist a burst of mutations with one journal write or one rewrite.
+
+        Raises StorageConflict, writing nothing, if another process changed
+        the files since this one last read or wrote them.
+        """
+        if not records:
+            return
+        with self.lock:
+            self._check_unchanged()
+            if self.journal is None:
+                self._write_snapshot(tasks)
+                return
+            try:
+                if self.journal.base() != self._snapshot_checksum:
+                    # Missing or started against another snapshot: replay
+                    # would drop whatever is appended to it
+                    self.journal.reset(self._snapshot_checksum, self.fsync)
+                self.journal.append_many(records, self.fsync)
+            except Exception as e:
+                print(f"Error writing journal: {e}")
+                self._write_snapshot(tasks)
+                return
+            self._note_records(records)
+            if self.journal.entries >= self.compact_every:
+                self._write_snapshot(tasks)
+            else:
+                self._seen = self._stat()
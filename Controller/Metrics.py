@@ -0,0 +1,221 @@
+import atexit
+import io
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from Model.Task import parse_date
+
+# Histogram bucket i holds durations up to 2**i microseconds (bucket 0: <= 1 us)
+_BUCKETS = 32
+
+
+class _Histogram:
+    """Latency histogram with power-of-two microsecond buckets"""
+
+    __slots__ = ('count', 'total', 'low', 'high', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.low = float('inf')
+        self.high = 0.0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.low = min(self.low, seconds)
+        self.high = max(self.high, seconds)
+        micros = int(seconds * 1e6)
+        self.buckets[min(micros.bit_length(), _BUCKETS - 1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the `fraction` quantile, in seconds"""
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min((1 << i) / 1e6, self.high)
+        return self.high
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_s': self.total,
+            'mean_ms': self.total / self.count * 1000,
+            'min_ms': self.low * 1000,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p90_ms': self.percentile(0.9) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.high * 1000,
+            # Upper bound in microseconds -> count, empty buckets left out
+            'buckets_us': {1 << i: n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class _NullSpan:
+    """What span() returns while disabled: entering and leaving do nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """Opt-in latency histograms, counters and byte counts for the hot paths.
+
+    Methods are wrapped with @metrics.timed(name), inner phases with
+    `with metrics.span(name):`, and events counted with metrics.count().
+    While disabled (the default) each of those is one attribute check, so
+    instrumented code runs at practically full speed.
+
+    Set TODO_METRICS to a file name to enable collection from the start
+    and have a JSON report written there at exit ("-" prints a summary to
+    stderr instead). profile() / start_profile() capture a cProfile run on
+    demand, independently of the metrics.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._histograms: dict[str, _Histogram] = {}
+        self._counters: dict[str, int] = {}
+        self._started = time.time()
+        self._profiler = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+            self._started = time.time()
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration under `name`"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram()
+            histogram.add(seconds)
+
+    def count(self, name: str, n: int = 1):
+        """Add `n` to a counter; byte counts use names ending in '.bytes'"""
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def timed(self, name: str):
+        """Decorator recording every call's duration, including time spent waiting for locks"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def span(self, name: str):
+        """Context manager timing a block under `name`"""
+        return self._span(name) if self.enabled else _NULL_SPAN
+
+    @contextmanager
+    def _span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """Everything collected so far as plain data"""
+        with self._lock:
+            histograms = {name: h.to_dict() for name, h in sorted(self._histograms.items())}
+            counters = dict(sorted(self._counters.items()))
+        # Date parsing is cached; misses are the strptime calls actually made
+        dates = parse_date.cache_info()
+        counters['parse_date.hits'] = dates.hits
+        counters['parse_date.misses'] = dates.misses
+        return {
+            'started': self._started,
+            'elapsed_s': time.time() - self._started,
+            'latency': histograms,
+            'counters': counters,
+        }
+
+    def export(self, path=None):
+        """Write the snapshot as JSON to `path`, or a summary table to stderr if None"""
+        snapshot = self.snapshot()
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2)
+            return
+        print(f"{'operation':<36} {'count':>8} {'total ms':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+              file=sys.stderr)
+        for name, h in snapshot['latency'].items():
+            print(f"{name:<36} {h['count']:>8} {h['total_s'] * 1000:>10.1f} {h['p50_ms']:>9.2f} "
+                  f"{h['p99_ms']:>9.2f} {h['max_ms']:>9.2f}", file=sys.stderr)
+        for name, value in snapshot['counters'].items():
+            print(f"{name:<36} {value:>8}", file=sys.stderr)
+
+    @property
+    def profiling(self) -> bool:
+        return self._profiler is not None
+
+    def start_profile(self):
+        """Start a cProfile capture of the calling thread"""
+        # Imported on demand; the CLI should not pay for them at start-up
+        import cProfile
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self, path=None, top: int = 25) -> str:
+        """Stop the capture; dump it to `path` for pstats/snakeviz and return
+        the `top` entries by cumulative time as text"""
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return ""
+        import pstats
+        profiler.disable()
+        if path is not None:
+            profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        return out.getvalue()
+
+    @contextmanager
+    def profile(self, path=None, top: int = 25):
+        """Profile the block; the report goes to `path` and the summary to stderr"""
+        self.start_profile()
+        try:
+            yield
+        finally:
+            print(self.stop_profile(path, top), file=sys.stderr)
+
+
+metrics = Metrics()
+
+_report = os.environ.get('TODO_METRICS')
+if _report:
+    metrics.enable()
+    atexit.register(metrics.export, None if _report == '-' else _report)
@@ -0,0 +1,170 @@
+import atexit
+import threading
+from Model.Task import Task
+from Controller.StorageBackend import StorageBackend, StorageConflict
+from Controller.JsonStorage import JsonStorage, record_ids, without_ids
+from Controller.Metrics import metrics
+
+DURABILITY_LEVELS = ('none', 'batch', 'always')
+# Attempts at a write that keeps losing the race against other processes
+CONFLICT_RETRIES = 5
+
+
+class PersistenceWorker:
+    """Writes task mutations to a storage backend on a background thread.
+
+    TaskManager submits each mutation record and returns straight away. The
+    worker waits `window` seconds after the first record of a burst and then
+    persists everything that arrived meanwhile with one commit_many call, so
+    rapid edits cost at most one write per window.
+
+    Writes are made from the worker's own id -> Task map, kept up to date by
+    replaying the submitted records, so a save never iterates the tasks the
+    UI thread is editing. If another process changed the files first, the
+    worker folds its changes into that map, re-applies its own records on
+    top, retries, and keeps the other process's records for
+    take_external().
+
+    Durability levels:
+        'none'    never fsync; the OS writes the data back when it likes
+        'batch'   fsync once per coalesced write
+        'always'  no coalescing window, every mutation is written and fsynced
+                  as soon as the worker picks it up
+    """
+
+    def __init__(self, storage: StorageBackend, window: float = 0.2, durability: str = 'batch'):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level {durability!r}")
+        self.storage = storage
+        self.storage.fsync = durability != 'none'
+        self.window = 0 if durability == 'always' else window
+        self.writes = 0
+        self.has_baseline = False
+        self._tasks: dict[str, Task] = None
+        # ('record', record) or ('baseline', tasks, save), in submission order
+        self._pending: list[tuple] = []
+        # Records from other processes met while resolving write conflicts
+        self._external: list[dict] = []
+        self._busy = False
+        self._urgent = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="task-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def baseline(self, tasks: dict[str, Task], save: bool = False):
+        """Take a copy of `tasks` (id -> Task) as the state later records apply to.
+
+        With `save` the whole set is written, superseding any records
+        still waiting.
+        """
+        self.has_baseline = True
+        self._put(('baseline', dict(tasks), save))
+
+    def submit(self, record: dict):
+        """Queue one mutation record for the next write"""
+        self._put(('record', record))
+
+    def _put(self, item: tuple):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Persistence worker is closed")
+            self._pending.append(item)
+            self._cond.notify_all()
+
+    def take_external(self) -> list[dict]:
+        """Records from other processes the worker merged since the last call"""
+        with self._cond:
+            external, self._external = self._external, []
+        return external
+
+    def flush(self, timeout: float = None) -> bool:
+        """Write everything submitted so far without waiting out the window.
+
+        Blocks until it is on disk; returns False if `timeout` ran out first.
+        """
+        with self._cond:
+            if self._pending:
+                self._urgent = True
+                self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self):
+        """Flush and stop the worker thread"""
+        atexit.unregister(self.close)
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Coalescing window: let the rest of the burst arrive
+                self._cond.wait_for(lambda: self._urgent or self._closed, self.window)
+                items, self._pending = self._pending, []
+                self._urgent = False
+                self._busy = True
+            try:
+                self._write(items)
+            except Exception as e:
+                print(f"Error saving tasks: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @metrics.timed('writer.write')
+    def _write(self, items: list[tuple]):
+        records = []
+        save = False
+        for item in items:
+            if item[0] == 'baseline':
+                self._tasks = item[1]
+                if item[2]:
+                    save = True
+                    records = []
+                continue
+            if self._apply(item[1]):
+                records.append(item[1])
+        if not save and not records:
+            return
+
+        for _ in range(CONFLICT_RETRIES):
+            tasks = self._tasks.values() if self._tasks is not None else None
+            try:
+                if save:
+                    # The saved state already includes any records after the baseline
+                    self.storage.save(tasks)
+                else:
+                    self.storage.commit_many(tasks, records)
+                self.writes += 1
+                metrics.count('writer.records', len(records))
+                return
+            except StorageConflict:
+                metrics.count('writer.conflicts')
+                # Their changes first, then ours on top again
+                tasks = self._tasks.values() if self._tasks is not None else None
+                external = without_ids(self.storage.read_changes(tasks), record_ids(records))
+                with self._cond:
+                    self._external.extend(external)
+                for record in external + records:
+                    self._apply(record)
+        print(f"Error saving tasks: gave up after {CONFLICT_RETRIES} conflicting writes")
+
+    def _apply(self, record: dict) -> bool:
+        """Apply a record to the worker's copy of the tasks"""
+        if self._tasks is None:
+            return True
+        try:
+            JsonStorage.apply_record(self._tasks, record)
+            return True
+        except (KeyError, ValueError, IndexError, TypeError) as e:
+            print(f"Skipping invalid mutation: {e}")
+            return False
@@ -0,0 +1,50 @@
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class QueryCache:
+    """Bounded LRU of get_tasks results, valid for one data version.
+
+    Entries are keyed by the query arguments and belong to the version
+    they were computed at. Looking anything up at a newer version drops the
+    whole cache, so a mutation invalidates every result at once without the
+    mutation paths having to know about the cache, and memory is freed as
+    soon as the results go stale.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._results: OrderedDict[tuple, list] = OrderedDict()
+
+    def get(self, key: tuple, version: int) -> list:
+        """The result cached for `key` at `version`, or None"""
+        if version != self._version:
+            self._results.clear()
+            self._version = version
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: tuple, version: int, result: list):
+        if version != self._version or self.maxsize <= 0:
+            return
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        self._results.clear()
+        self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Hit/miss statistics, like functools.lru_cache's cache_info()"""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._results))
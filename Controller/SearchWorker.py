@@ -0,0 +1,133 @@
+import threading
+from Model.Task import Task
+from Controller.TextIndex import FIELDS, task_matches
+from Controller.TaskQuery import is_plain
+
+# How many candidates to refine between checks for a newer query
+_CANCEL_CHECK_EVERY = 1024
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class SearchWorker:
+    """Runs search-box queries on a background thread; the newest query wins.
+
+    submit() returns immediately. A newer submit() or cancel() supersedes
+    whatever is queued or running, and superseded results are never
+    reported. The UI thread collects finished results with poll(), e.g.
+    from a root.after loop, so no Tk call ever happens off the main thread.
+
+    Queries use the structured syntax of get_tasks(query=...). When a
+    plain one-word query contains the previous one (typically the user
+    typed one more character) and no task changed in between, its results
+    are a subset of the previous ones, so they are refined from that list
+    instead of searched from scratch. A query that does not parse yet
+    (e.g. 'due<2025-0' halfway through typing) simply matches nothing.
+    """
+
+    def __init__(self, task_manager):
+        self.task_manager = task_manager
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._request: tuple[int, str] = None
+        self._running = False
+        self._result: tuple[int, list[Task]] = None
+        # (query, task manager version, results) of the last finished search
+        self._last: tuple[str, int, list[Task]] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="task-search", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str):
+        """Start searching for `query`, superseding any earlier query"""
+        with self._cond:
+            self._generation += 1
+            self._request = (self._generation, query)
+            self._result = None
+            self._cond.notify_all()
+
+    def cancel(self):
+        """Drop the queued or running query, if any"""
+        with self._cond:
+            self._generation += 1
+            self._request = None
+            self._result = None
+
+    @property
+    def busy(self) -> bool:
+        """True while the current query has not produced its result yet"""
+        with self._cond:
+            return self._request is not None or (self._running and self._result is None)
+
+    def poll(self) -> list[Task]:
+        """Results of the current query once it has finished, else None"""
+        with self._cond:
+            result, self._result = self._result, None
+            if result is None or result[0] != self._generation:
+                return None
+            return result[1]
+
+    def wait(self, timeout: float = None) -> list[Task]:
+        """Block until the current query finishes and return its results"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._result is not None or self._request is None and not self._running,
+                                timeout)
+        return self.poll()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._request = None
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _current(self, generation: int):
+        if generation != self._generation:
+            raise _Cancelled
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._request is not None or self._closed)
+                if self._closed:
+                    return
+                (generation, query), self._request = self._request, None
+                self._running = True
+            try:
+                tasks = self._search(generation, query)
+            except _Cancelled:
+                tasks = None
+            except ValueError:
+                tasks = []
+            except Exception as e:
+                print(f"Error searching tasks: {e}")
+                tasks = []
+            with self._cond:
+                self._running = False
+                if tasks is not None and generation == self._generation:
+                    self._result = (generation, tasks)
+                self._cond.notify_all()
+
+    def _search(self, generation: int, query: str) -> list[Task]:
+        manager = self.task_manager
+        version = manager.version
+        last = self._last
+        if (last is not None and last[1] == version and is_plain(query) and is_plain(last[0])
+                and last[0].lower() in query.lower()):
+            # Narrowing the previous query: only its matches can still match
+            needle = query.lower()
+            tasks = []
+            for i, task in enumerate(last[2]):
+                if i % _CANCEL_CHECK_EVERY == 0:
+                    self._current(generation)
+                if task_matches(task, needle, FIELDS):
+                    tasks.append(task)
+        else:
+            with manager.lock:
+                self._current(generation)
+                tasks = manager.get_tasks(query=query)
+        self._current(generation)
+        self._last = (query, version, tasks)
+        return tasks
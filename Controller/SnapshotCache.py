@@ -0,0 +1,165 @@
+import json
+from pathlib import Path
+from typing import Iterator
+from Model.Task import Task
+from Controller.BinaryStorage import BinaryStorage
+from Controller.TaskJournal import TaskJournal
+from Controller.FileLock import FileLock
+
+# Past this much un-cached journal the caller should do a full load (which
+# compacts) instead of replaying the tail on every start
+MAX_TAIL_BYTES = 1 << 20
+
+
+class SnapshotCache:
+    """Binary copy of a journaled tasks.json, for starts that do not parse JSON.
+
+    rebuild() writes the current task state to `<name>.cache.bin` and
+    stamps it with the snapshot's size and mtime plus the journal header
+    and length at that moment. While the snapshot is unchanged, the cache
+    plus the journal records appended after the stamp is the current state:
+    iter_tasks() streams the cached records through mmap and overlays that
+    (bounded) journal tail, so reading the first tasks costs the same for
+    ten tasks or a million. append() adds a mutation straight to the
+    journal without loading anything.
+    """
+
+    def __init__(self, data_file: str = "tasks.json"):
+        self.data_file = Path(data_file)
+        self.journal = TaskJournal(self.data_file.with_suffix('.journal'))
+        self.cache_file = self.data_file.with_suffix('.cache.bin')
+        self.stamp_file = self.data_file.with_suffix('.cache.stamp')
+        # Same lock JsonStorage takes, so appends never interleave with a save
+        self.lock = FileLock(self.data_file.with_suffix('.lock'))
+
+    def _snapshot_stat(self) -> list[int]:
+        if not self.data_file.exists():
+            return None
+        stat = self.data_file.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _journal_header(self) -> str:
+        if not self.journal.path.exists():
+            return None
+        with open(self.journal.path, 'r', encoding='utf-8') as f:
+            return f.readline()
+
+    def _stamp(self) -> dict:
+        """The stamp if the cache still describes the snapshot and journal, else None"""
+        try:
+            stamp = json.loads(self.stamp_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if not self.cache_file.exists() or stamp.get('snapshot') != self._snapshot_stat():
+            return None
+        if stamp.get('journal_header') != self._journal_header():
+            return None
+        size = self.journal.path.stat().st_size if stamp['journal_header'] is not None else 0
+        if not stamp['journal_offset'] <= size <= stamp['journal_offset'] + MAX_TAIL_BYTES:
+            return None
+        return stamp
+
+    def valid(self) -> bool:
+        return self._stamp() is not None
+
+    def rebuild(self, tasks):
+        """Cache `tasks`, the state after a full journaled load of the data file"""
+        BinaryStorage(self.cache_file).save(tasks)
+        header = self._journal_header()
+        stamp = {
+            'snapshot': self._snapshot_stat(),
+            'journal_header': header,
+            'journal_offset': self.journal.path.stat().st_size if header is not None else 0,
+        }
+        temp_file = self.stamp_file.with_suffix('.tmp')
+        temp_file.write_text(json.dumps(stamp), encoding='utf-8')
+        temp_file.replace(self.stamp_file)
+
+    def _tail(self, stamp: dict) -> list[dict]:
+        with open(self.journal.path, 'rb') as f:
+            f.seek(stamp['journal_offset'])
+            data = f.read().decode('utf-8')
+        records = []
+        for line in data.split("\n"):
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Torn tail; replay on a full load stops here too
+                break
+        return records
+
+    def iter_tasks(self) -> Iterator[Task]:
+        """Stream the current tasks in storage order, or None if the cache is stale"""
+        stamp = self._stamp()
+        if stamp is None:
+            return None
+
+        deleted = set()
+        updated: dict[str, dict] = {}
+        added: dict[str, dict] = {}
+        records = []
+        for record in self._tail(stamp):
+            # Transactions are flattened; their single journal line already
+            # made them all-or-nothing
+            records.extend(record['records'] if record.get('op') == 'batch' else [record])
+        for record in records:
+            op = record.get('op')
+            if op == 'add':
+                added[record['task']['id']] = record['task']
+            elif op == 'update' and 'id' in record:
+                data = {**record['task'], 'id': record['id']}
+                if record['id'] in added:
+                    added[record['id']] = data
+                else:
+                    updated[record['id']] = data
+            elif op == 'delete' and 'id' in record or op == 'clear_completed' and 'ids' in record:
+                for task_id in record['ids'] if op == 'clear_completed' else [record['id']]:
+                    if added.pop(task_id, None) is None:
+                        updated.pop(task_id, None)
+                        deleted.add(task_id)
+            else:
+                # Position-based or state-based records need the full list
+                return None
+        return self._stream(deleted, updated, added)
+
+    def _stream(self, deleted: set, updated: dict, added: dict) -> Iterator[Task]:
+        for batch in BinaryStorage(self.cache_file).iter_load():
+            for task in batch:
+                if task.id in deleted:
+                    continue
+                data = updated.get(task.id)
+                yield Task.from_dict(data) if data is not None else task
+        for data in added.values():
+            yield Task.from_dict(data)
+
+    def update(self, task_id: str, change) -> Task:
+        """Run `change` on the current copy of a task and journal the result;
+        None if the cache is stale or the task is gone.
+
+        The copy is read under the lock, so an edit another process journaled
+        since the caller last looked is kept rather than overwritten.
+        """
+        with self.lock:
+            tasks = self.iter_tasks()
+            if tasks is None or self._journal_header() is None:
+                return None
+            try:
+                task = next((task for task in tasks if task.id == task_id), None)
+            finally:
+                tasks.close()
+            if task is None:
+                return None
+            change(task)
+            self.journal.append({'op': 'update', 'id': task.id, 'task': task.to_dict()})
+            return task
+
+    def append(self, record: dict) -> bool:
+        """Journal one mutation without loading; False if the cache is stale"""
+        with self.lock:
+            stamp = self._stamp()
+            if stamp is None or stamp['journal_header'] is None:
+                return False
+            self.journal.append(record)
+            return True
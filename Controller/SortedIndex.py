@@ -0,0 +1,99 @@
+from bisect import bisect_left, insort
+from Model.Task import Task, NO_DUE_DATE, due_sort_key
+
+
+SEQ_BITS = 40
+SEQ_MASK = (1 << SEQ_BITS) - 1
+
+
+class SortedIndex:
+    """Tasks kept in get_tasks(sort=True) order across mutations.
+
+    Entries are (position, task) pairs in a list kept sorted with bisect,
+    where position packs the task's sort_key above its insertion sequence.
+    The sequence reproduces the stable-sort tie-break on storage order and
+    makes positions unique, so only ints are ever compared. Reading the
+    sorted view never re-sorts.
+    """
+
+    def __init__(self):
+        self._entries: list[tuple] = []
+        self._by_id: dict[str, tuple] = {}
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rebuild(self, tasks):
+        """Index `tasks` (in storage order) with a single sort"""
+        entries = [(task.sort_key << SEQ_BITS | seq, task) for seq, task in enumerate(tasks)]
+        self._by_id = {entry[1].id: entry for entry in entries}
+        entries.sort()
+        self._entries = entries
+        self._next_seq = len(entries)
+
+    def add_many(self, tasks):
+        """Append a batch of new tasks with one merge instead of many inserts"""
+        entries = [(task.sort_key << SEQ_BITS | seq, task) for seq, task in enumerate(tasks, self._next_seq)]
+        self._next_seq += len(entries)
+        for entry in entries:
+            self._by_id[entry[1].id] = entry
+        entries.sort()
+        # Timsort merges the two sorted runs in linear time
+        self._entries += entries
+        self._entries.sort()
+
+    def add(self, task: Task, seq: int = None):
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+        entry = (task.sort_key << SEQ_BITS | seq, task)
+        self._by_id[task.id] = entry
+        insort(self._entries, entry)
+
+    def remove(self, task: Task) -> int:
+        """Drop a task, returning its insertion sequence"""
+        entry = self._by_id.pop(task.id, None)
+        if entry is None:
+            return None
+        del self._entries[bisect_left(self._entries, entry)]
+        return entry[0] & SEQ_MASK
+
+    def update(self, task: Task):
+        """Move a task whose due date or priority changed"""
+        entry = self._by_id.get(task.id)
+        if entry is not None and entry[0] >> SEQ_BITS == task.sort_key:
+            return
+        self.add(task, self.remove(task))
+
+    def tasks(self) -> list[Task]:
+        return [entry[1] for entry in self._entries]
+
+    def _due_bound(self, ordinal: int) -> int:
+        """Index of the first entry due on `ordinal` or later (undated entries come last)"""
+        # Positions of a date run from its smallest sort key up to the next date's
+        return bisect_left(self._entries, (due_sort_key(ordinal) << SEQ_BITS,))
+
+    def due_range(self, low: int = None, high: int = None, sort: bool = True) -> list[Task]:
+        """Tasks due between the `low` and `high` date ordinals (inclusive, either
+        may be None), in sorted order or, without `sort`, in insertion order.
+
+        Two bisects, so the cost is in the matches rather than the task count.
+        """
+        start = 0 if low is None else self._due_bound(low)
+        end = self._due_bound(NO_DUE_DATE if high is None else high + 1)
+        entries = self._entries[start:end]
+        if not sort:
+            entries.sort(key=lambda entry: entry[0] & SEQ_MASK)
+        return [entry[1] for entry in entries]
+
+    def due_count(self, low: int = None, high: int = None) -> int:
+        """len(due_range(low, high)), from the two bisects alone"""
+        start = 0 if low is None else self._due_bound(low)
+        return max(0, self._due_bound(NO_DUE_DATE if high is None else high + 1) - start)
+
+    def iter_due_from(self, ordinal: int):
+        """Dated tasks due on `ordinal` or later, earliest first"""
+        entries = self._entries
+        for i in range(self._due_bound(ordinal), self._due_bound(NO_DUE_DATE)):
+            yield entries[i][1]
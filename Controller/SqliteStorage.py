@@ -0,0 +1,266 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable
+from Model.Task import Task, Priority
+from Controller.StorageBackend import StorageBackend
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    uid TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    title_lower TEXT NOT NULL,
+    due_date TEXT,
+    priority INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    completed_at TEXT,
+    tags TEXT NOT NULL DEFAULT '[]'
+);
+CREATE TABLE IF NOT EXISTS task_tags (
+    task_id INTEGER NOT NULL,
+    tag_lower TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_priority ON tasks(due_date, priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag_lower, task_id);
+CREATE INDEX IF NOT EXISTS idx_task_tags_task ON task_tags(task_id);
+"""
+
+# Same order as Task.__lt__: dated tasks first by date, then higher priority,
+# ties kept in insertion order like Python's stable sort.
+ORDER_BY = "ORDER BY due_date IS NULL, due_date, priority DESC, id"
+
+COLUMNS = "uid, title, due_date, priority, completed, completed_at, tags"
+
+
+class SqliteStorage(StorageBackend):
+    """Indexed SQLite store; get_tasks filters and sorting run as SQL"""
+
+    queryable = True
+
+    def __init__(self, data_file: str = "tasks.db"):
+        self.data_file = Path(data_file)
+        # Used from whichever thread holds the TaskManager lock (the GUI's
+        # search worker, the server's manager thread), never two at once
+        self.conn = sqlite3.connect(self.data_file, check_same_thread=False)
+        # True inside transaction(), whose commit (or rollback) ends it
+        self._in_transaction = False
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        self._data_version = self._read_data_version()
+
+    def _read_data_version(self) -> int:
+        # Changes whenever another connection commits, never for our own writes
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        return self._read_data_version() != self._data_version
+
+    def read_changes(self, tasks: Iterable[Task] = None) -> list[dict]:
+        """Acknowledge other connections' commits.
+
+        SQLite cannot tell which rows they touched, so there are no records;
+        queries read the database directly and see the changes anyway.
+        """
+        self._data_version = self._read_data_version()
+        return []
+
+    def _migrate(self):
+        """Give databases created before stable task ids a uid column, and
+        those created before completion dates a completed_at column"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")]
+        if columns and 'uid' not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE tasks ADD COLUMN uid TEXT")
+                self.conn.execute("UPDATE tasks SET uid = lower(hex(randomblob(16)))")
+                self.conn.execute("CREATE UNIQUE INDEX idx_tasks_uid ON tasks(uid)")
+        if columns and 'completed_at' not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE tasks ADD COLUMN completed_at TEXT")
+
+    @staticmethod
+    def _row_to_task(row) -> Task:
+        uid, title, due_date, priority, completed, completed_at, tags = row
+        return Task.from_dict({
+            'id': uid,
+            'title': title,
+            'due_date': due_date,
+            'priority': Priority(priority).name,
+            'completed': bool(completed),
+            'completed_at': completed_at,
+            'tags': json.loads(tags),
+        })
+
+    def _insert(self, data: dict):
+        priority = Priority[data.get('priority', 'MEDIUM')].value
+        tags = data.get('tags', [])
+        cur = self.conn.execute(
+            "INSERT INTO tasks (uid, title, title_lower, due_date, priority, completed, completed_at, tags) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (data['id'], data['title'], data['title'].lower(), data.get('due_date'), priority,
+             int(bool(data.get('completed'))), data.get('completed_at'), json.dumps(tags))
+        )
+        self._write_tags(cur.lastrowid, tags)
+
+    def _write_tags(self, row_id: int, tags: list[str]):
+        self.conn.execute("DELETE FROM task_tags WHERE task_id = ?", (row_id,))
+        self.conn.executemany(
+            "INSERT INTO task_tags (task_id, tag_lower) VALUES (?, ?)",
+            [(row_id, tag.lower()) for tag in tags]
+        )
+
+    def _row_id(self, task_id: str) -> int:
+        row = self.conn.execute("SELECT id FROM tasks WHERE uid = ?", (task_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No task with id {task_id}")
+        return row[0]
+
+    def load(self) -> list[Task]:
+        rows = self.conn.execute(f"SELECT {COLUMNS} FROM tasks ORDER BY id")
+        return [self._row_to_task(row) for row in rows]
+
+    def save(self, tasks: Iterable[Task]):
+        with self.conn:
+            self.conn.execute("DELETE FROM task_tags")
+            self.conn.execute("DELETE FROM tasks")
+            for task in tasks:
+                self._insert(task.to_dict())
+
+    def commit(self, tasks: Iterable[Task], record: dict):
+        """Apply one mutation record as a single-row transaction"""
+        self.commit_many(tasks, [record])
+
+    def commit_many(self, tasks: Iterable[Task], records: list[dict]):
+        """Apply a burst of mutation records in one transaction"""
+        if self._in_transaction:
+            for record in records:
+                self._apply(record)
+            return
+        with self.conn:
+            for record in records:
+                self._apply(record)
+
+    @contextmanager
+    def transaction(self):
+        """Run the block's commits in one SQL transaction; nested blocks join it"""
+        if self._in_transaction:
+            yield
+            return
+        # IMMEDIATE takes the write lock up front, so another writer cannot
+        # get in between this block's reads and writes
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._in_transaction = False
+
+    def _apply(self, record: dict):
+        op = record['op']
+        if op == 'add':
+            self._insert(record['task'])
+        elif op == 'update':
+            row_id = self._row_id(record['id'])
+            data = record['task']
+            self.conn.execute(
+                "UPDATE tasks SET title = ?, title_lower = ?, due_date = ?, priority = ?, completed = ?, "
+                "completed_at = ?, tags = ? WHERE id = ?",
+                (data['title'], data['title'].lower(), data.get('due_date'),
+                 Priority[data['priority']].value, int(bool(data.get('completed'))),
+                 data.get('completed_at'), json.dumps(data.get('tags', [])), row_id)
+            )
+            self._write_tags(row_id, data.get('tags', []))
+        elif op == 'delete':
+            row_id = self._row_id(record['id'])
+            self.conn.execute("DELETE FROM task_tags WHERE task_id = ?", (row_id,))
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (row_id,))
+        elif op == 'batch':
+            for sub_record in record['records']:
+                self._apply(sub_record)
+        elif op == 'clear_completed':
+            self.conn.execute("DELETE FROM task_tags WHERE task_id IN (SELECT id FROM tasks WHERE completed = 1)")
+            self.conn.execute("DELETE FROM tasks WHERE completed = 1")
+        else:
+            raise ValueError(f"Unknown mutation op {op!r}")
+
+    def count(self, filter_completed: bool = None) -> int:
+        if filter_completed is None:
+            return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE completed = ?", (int(filter_completed),)
+        ).fetchone()[0]
+
+    def fetch(self, task_id: str) -> Task:
+        row = self.conn.execute(f"SELECT {COLUMNS} FROM tasks WHERE uid = ?", (task_id,)).fetchone()
+        return self._row_to_task(row) if row is not None else None
+
+    def query(self, filter_completed: bool = None, search_query: str = None, tag_filter: str = None, sort: bool = False,
+              search_tags: bool = False, due_from: str = None, due_to: str = None,
+              where: tuple[str, list] = None) -> list[Task]:
+        """Same matching rules as the in-memory get_tasks, evaluated by SQLite.
+        `where` is one more condition with its parameters, e.g. a structured
+        query's (see TaskQuery.sql_filter)."""
+        clauses, params = [], []
+
+        if filter_completed is not None:
+            clauses.append("completed = ?")
+            params.append(int(filter_completed))
+
+        if search_query:
+            query = search_query.lower()
+            parts = ["instr(title_lower, ?) > 0", "instr(due_date, ?) > 0"]
+            params += [query, query]
+            # Priority names are a fixed vocabulary, so match them here
+            values = [p.value for p in Priority if query in p.name.lower()]
+            if values:
+                parts.append(f"priority IN ({', '.join('?' * len(values))})")
+                params += values
+            if search_tags:
+                parts.append(
+                    "EXISTS (SELECT 1 FROM task_tags WHERE task_tags.task_id = tasks.id AND instr(tag_lower, ?) > 0)"
+                )
+                params.append(query)
+            clauses.append(f"({' OR '.join(parts)})")
+
+        if tag_filter:
+            clauses.append(
+                "EXISTS (SELECT 1 FROM task_tags WHERE task_tags.task_id = tasks.id AND instr(tag_lower, ?) > 0)"
+            )
+            params.append(tag_filter.lower())
+
+        # ISO dates compare chronologically as text, so these use the index
+        if due_from:
+            clauses.append("due_date >= ?")
+            params.append(due_from)
+        if due_to:
+            clauses.append("due_date <= ?")
+            params.append(due_to)
+
+        if where is not None:
+            clauses.append(f"({where[0]})")
+            params += where[1]
+
+        sql = f"SELECT {COLUMNS} FROM tasks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " " + (ORDER_BY if sort else "ORDER BY id")
+        return [self._row_to_task(row) for row in self.conn.execute(sql, params)]
+
+    def tag_counts(self) -> dict[str, int]:
+        """Counted on the task_tags index, without reading a task"""
+        rows = self.conn.execute(
+            "SELECT tag_lower, COUNT(DISTINCT task_id) AS n FROM task_tags GROUP BY tag_lower ORDER BY n DESC, tag_lower"
+        )
+        return dict(rows.fetchall())
+
+    def close(self):
+        self.conn.close()
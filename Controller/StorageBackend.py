@@ -0,0 +1,140 @@
+import gc
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable
+from Model.Task import Task
+from Controller.Metrics import metrics
+
+# Task file suffixes that pick a backend other than JSON
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+BINARY_SUFFIXES = ('.bin',)
+
+
+@contextmanager
+def gc_paused():
+    """Suspend the cyclic GC while bulk-building task objects.
+
+    A load allocates hundreds of thousands of objects and none of them are
+    garbage, yet each allocation burst triggers (increasingly expensive)
+    collections.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class StorageConflict(Exception):
+    """A write found the stored tasks changed by another process since it last read them"""
+
+
+def sync_file(f):
+    """Push a written file through the OS cache to the disk"""
+    with metrics.span('disk.fsync'):
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class StorageBackend:
+    """Where TaskManager keeps its tasks.
+
+    Mutations are handed over as small records (the same ones the JSON
+    journal stores): {'op': 'add', 'task': {...}}, {'op': 'update',
+    'id': task_id, 'task': {...}}, {'op': 'delete', 'id': task_id} and
+    {'op': 'clear_completed'}, plus {'op': 'batch', 'records': [...]} for a
+    transaction that must be applied all or nothing. Backends that set `queryable` answer
+    get_tasks themselves, so TaskManager never has to hold every task.
+    """
+
+    queryable = False
+    # Whether file writes are fsynced before they count as done
+    fsync = False
+
+    def load(self) -> list[Task]:
+        raise NotImplementedError
+
+    def iter_load(self, batch_size: int = 500, replay=None, max_batch_size: int = None):
+        """Yield the stored tasks in batches; backends that can stream override this.
+
+        A backend that only learns of changes after streaming the tasks
+        (a journal on top of a snapshot) passes them to `replay` as
+        mutation records for the tasks already yielded.
+        """
+        yield self.load()
+
+    def save(self, tasks: Iterable[Task]):
+        """Replace the stored tasks with `tasks`"""
+        raise NotImplementedError
+
+    def commit(self, tasks: Iterable[Task], record: dict):
+        """Persist one mutation; `tasks` are the in-memory tasks after applying it"""
+        self.save(tasks)
+
+    def commit_many(self, tasks: Iterable[Task], records: list[dict]):
+        """Persist a burst of mutations at once; by default as one full save"""
+        if records:
+            self.save(tasks)
+
+    @contextmanager
+    def transaction(self):
+        """Make the commits inside the block one atomic write.
+
+        Only queryable backends need this: TaskManager reads them back
+        inside its transactions, so they must see the block's own writes
+        while other readers see none until it exits, and none at all if it
+        raises. The others get a transaction as a single batch record.
+        """
+        yield
+
+    def changed(self) -> bool:
+        """Cheap check whether another process changed the stored tasks"""
+        return False
+
+    def read_changes(self, tasks: Iterable[Task] = None) -> list[dict]:
+        """Mutation records for what other processes changed since the last read or write"""
+        return []
+
+    # Only required when `queryable` is True
+    def count(self, filter_completed: bool = None) -> int:
+        raise NotImplementedError
+
+    def fetch(self, task_id: str) -> Task:
+        """Task with `task_id`, or None"""
+        raise NotImplementedError
+
+    def query(self, filter_completed: bool = None, search_query: str = None, tag_filter: str = None, sort: bool = False,
+              search_tags: bool = False, due_from: str = None, due_to: str = None,
+              where: tuple[str, list] = None) -> list[Task]:
+        raise NotImplementedError
+
+    def tag_counts(self) -> dict[str, int]:
+        """Tag (lowercased) -> number of tasks carrying it, most used first"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def open_storage(path, journal: bool = False, compact_every: int = 1000) -> StorageBackend:
+    """The backend for a task file, picked by its suffix; JSON unless it names another"""
+    # Imported here: the backends import this module
+    path = Path(path)
+    if path.suffix in SQLITE_SUFFIXES:
+        from Controller.SqliteStorage import SqliteStorage
+        return SqliteStorage(path)
+    if path.suffix in BINARY_SUFFIXES:
+        from Controller.BinaryStorage import BinaryStorage
+        return BinaryStorage(path)
+    from Controller.JsonStorage import JsonStorage
+    return JsonStorage(path, journal, compact_every)
+
+
+def convert_storage(source: StorageBackend, target: StorageBackend) -> int:
+    """Copy every task from one backend to another, e.g. tasks.json <-> tasks.bin"""
+    tasks = source.load()
+    target.save(tasks)
+    return len(tasks)
@@ -0,0 +1,149 @@
+from bisect import bisect_left, insort
+from Model.Task import Task
+from Controller.SortedIndex import SEQ_BITS
+
+
+class TagIndex:
+    """Interned tag vocabulary plus a tag -> tasks index.
+
+    Tags are matched case-insensitively, so tasks are grouped by the
+    lower-cased tag; each group is a set, which makes exact lookups O(1),
+    multi-tag AND/OR queries set intersections/unions, and per-tag counts
+    simply the set sizes, current after every add/remove/update. The
+    distinct tags are also kept sorted, so a prefix query is a bisect plus
+    one union per matching tag.
+
+    Every distinct tag string is stored once: a task loaded from JSON has
+    its own copy of '#work', and add() swaps it for the vocabulary's copy.
+    """
+
+    def __init__(self):
+        # Tag as written -> the one copy of it tasks share
+        self._vocab: dict[str, str] = {}
+        # Lower-cased tag -> tasks carrying it, and how it is displayed
+        self._tasks: dict[str, set[Task]] = {}
+        self._names: dict[str, str] = {}
+        # Lower-cased tags in order, for prefix ranges
+        self._sorted: list[str] = []
+        # Lower-cased tags each task is indexed under
+        self._keys: dict[Task, tuple[str, ...]] = {}
+        # Insertion sequence, used to return matches in storage order
+        self._seq: dict[Task, int] = {}
+        self._next_seq = 0
+
+    def __len__(self):
+        """Number of distinct tags in use"""
+        return len(self._tasks)
+
+    def rebuild(self, tasks):
+        self.__init__()
+        self.add_many(tasks)
+
+    def add_many(self, tasks):
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task: Task):
+        if task not in self._seq:
+            self._seq[task] = self._next_seq
+            self._next_seq += 1
+        tags = task.tags
+        keys = []
+        for i, tag in enumerate(tags):
+            shared = self._vocab.setdefault(tag, tag)
+            if shared is not tag:
+                tags[i] = shared
+            key = tag.lower()
+            if key in keys:
+                continue
+            keys.append(key)
+            tasks = self._tasks.get(key)
+            if tasks is None:
+                tasks = self._tasks[key] = set()
+                self._names[key] = shared
+                insort(self._sorted, key)
+            tasks.add(task)
+        self._keys[task] = tuple(keys)
+
+    def remove(self, task: Task, forget: bool = True):
+        if forget:
+            self._seq.pop(task, None)
+        for key in self._keys.pop(task, ()):
+            tasks = self._tasks[key]
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks[key]
+                del self._names[key]
+                del self._sorted[bisect_left(self._sorted, key)]
+
+    def update(self, task: Task):
+        """Re-index a task whose tags may have changed, keeping its position"""
+        old = self._keys.get(task)
+        if old is not None and old == tuple(dict.fromkeys(tag.lower() for tag in task.tags)):
+            return
+        self.remove(task, forget=False)
+        self.add(task)
+
+    def exact(self, tag: str) -> set[Task]:
+        """Tasks tagged `tag` (case-insensitive); the set is the index's own, do not modify it"""
+        return self._tasks.get(tag.lower(), set())
+
+    def _prefixed(self, prefix: str) -> list[str]:
+        prefix = prefix.lower()
+        start = bisect_left(self._sorted, prefix)
+        end = bisect_left(self._sorted, prefix + "\U0010ffff", start)
+        return self._sorted[start:end]
+
+    def prefix(self, prefix: str) -> set[Task]:
+        """Tasks with any tag starting with `prefix`"""
+        return set().union(*(self._tasks[key] for key in self._prefixed(prefix)))
+
+    def count(self, tag: str, prefix: bool = False) -> int:
+        """How many tasks exact(tag) or, as an upper bound, prefix(tag) returns"""
+        if prefix:
+            return sum(len(self._tasks[key]) for key in self._prefixed(tag))
+        return len(self._tasks.get(tag.lower(), ()))
+
+    def containing(self, text: str) -> set[Task]:
+        """Tasks with any tag containing `text`, get_tasks' tag_filter semantics.
+
+        Only the vocabulary is scanned, not the tasks.
+        """
+        text = text.lower()
+        return set().union(*(tasks for key, tasks in self._tasks.items() if text in key))
+
+    def count_containing(self, text: str) -> int:
+        """Upper bound on len(containing(text)); tasks with several matching tags count more than once"""
+        text = text.lower()
+        return sum(len(tasks) for key, tasks in self._tasks.items() if text in key)
+
+    def select(self, tags, match_all: bool = True, prefix: bool = False) -> set[Task]:
+        """Tasks carrying all (or with match_all=False, any) of `tags`.
+
+        With `prefix` each tag matches every tag starting with it.
+        """
+        groups = [self.prefix(tag) if prefix else self.exact(tag) for tag in tags]
+        if not groups:
+            return set()
+        if not match_all:
+            return set().union(*groups)
+        # Smallest set first keeps every intersection small
+        groups.sort(key=len)
+        result = set(groups[0])
+        for group in groups[1:]:
+            if not result:
+                break
+            result &= group
+        return result
+
+    def ordered(self, tasks: set[Task], sort: bool = False) -> list[Task]:
+        """`tasks` in storage order, or in get_tasks(sort=True) order"""
+        seq = self._seq
+        if sort:
+            return sorted(tasks, key=lambda task: task.sort_key << SEQ_BITS | seq[task])
+        return sorted(tasks, key=seq.__getitem__)
+
+    def counts(self) -> dict[str, int]:
+        """Tag (as first written) -> number of tasks, most used first"""
+        return dict(sorted(((self._names[key], len(tasks)) for key, tasks in self._tasks.items()),
+                           key=lambda item: (-item[1], item[0].lower())))
@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+from Model.Task import Task, parse_date
+from Controller.StorageBackend import sync_file
+from Controller.FileLock import FileLock
+from Controller.TextIndex import task_matches
+from Controller.Metrics import metrics
+
+
+class TaskArchive:
+    """Completed tasks moved out of the hot task file, in append-only monthly segments.
+
+    `<name>.archive/YYYY-MM.jsonl` holds one task record per line for the
+    tasks completed that month (archived that month if the completion
+    date was never recorded). Segments are only ever appended to, under
+    an advisory lock shared with other processes, and nothing is read
+    until a query asks for it: iter_tasks() opens only the segments in
+    the requested range and yields tasks one line at a time.
+
+    Tasks are archived before they are removed from the hot file, so a
+    crash in between can leave a task in both, or archived twice; queries
+    report each task id once.
+    """
+
+    def __init__(self, directory, fsync: bool = False):
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self._lock = FileLock(self.directory.with_name(self.directory.name + '.lock'))
+
+    @staticmethod
+    def month_of(task: Task) -> str:
+        """Segment a task belongs in, e.g. '2025-06'"""
+        return (task.completed_at or datetime.now()).strftime("%Y-%m")
+
+    def months(self) -> list[str]:
+        """Months with a segment, oldest first"""
+        if not self.directory.exists():
+            return []
+        return sorted(path.stem for path in self.directory.glob("*.jsonl"))
+
+    def append(self, tasks: Iterable[Task]) -> int:
+        """Add `tasks` to their month segments, returns how many were written"""
+        segments: dict[str, list[str]] = {}
+        for task in tasks:
+            segments.setdefault(self.month_of(task), []).append(
+                json.dumps(task.to_dict(), separators=(',', ':')) + "\n")
+        if not segments:
+            return 0
+        written = 0
+        with metrics.span('archive.append'), self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for month, lines in segments.items():
+                path = self.directory / f"{month}.jsonl"
+                with open(path, 'a+b') as f:
+                    data = "".join(lines).encode('utf-8')
+                    # A crash mid-append leaves a torn last line; end it so
+                    # the new records start on lines of their own
+                    if f.tell() > 0:
+                        f.seek(-1, 2)
+                        if f.read(1) != b"\n":
+                            data = b"\n" + data
+                    f.write(data)
+                    if self.fsync:
+                        sync_file(f)
+                metrics.count('archive.write.bytes', len(data))
+                written += len(lines)
+        return written
+
+    def iter_tasks(self, completed_from: str = None, completed_to: str = None, search_query: str = None,
+                   tag_filter: str = None):
+        """Archived tasks, oldest segment first, read lazily.
+
+        `completed_from`/`completed_to` (YYYY-MM-DD, inclusive) limit the
+        completion date and, by month, the segments opened; tasks whose
+        completion date is unknown only appear without them.
+        `search_query` and `tag_filter` match as in get_tasks with
+        search_tags.
+        """
+        try:
+            low = parse_date(completed_from) if completed_from else None
+            high = parse_date(completed_to) if completed_to else None
+        except ValueError:
+            raise ValueError("Invalid date format. Use YYYY-MM-DD")
+        query = search_query.lower() if search_query else None
+        tag_filter = tag_filter.lower() if tag_filter else None
+        seen = set()
+        for month in self.months():
+            if (low and month < low.strftime("%Y-%m")) or (high and month > high.strftime("%Y-%m")):
+                continue
+            with open(self.directory / f"{month}.jsonl", 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        task = Task.from_dict(json.loads(line))
+                    except (ValueError, KeyError):
+                        # Torn line from a crash mid-append
+                        continue
+                    if task.id in seen:
+                        continue
+                    seen.add(task.id)
+                    if (low or high) and (task.completed_at is None or (low and task.completed_at < low)
+                                          or (high and task.completed_at > high)):
+                        continue
+                    if query and not task_matches(task, query, ('title', 'priority', 'due', 'tags')):
+                        continue
+                    if tag_filter and not any(tag_filter in tag.lower() for tag in task.tags):
+                        continue
+                    yield task
@@ -0,0 +1,117 @@
+import json
+import zlib
+from pathlib import Path
+from Controller.StorageBackend import sync_file
+from Controller.Metrics import metrics
+
+
+class TaskJournal:
+    """Append-only log of task mutations kept next to the JSON snapshot.
+
+    The first line is a header holding the CRC32 of the snapshot the journal
+    was started against. Every following line is one mutation record. A
+    journal whose header does not match the current snapshot was already
+    folded in by a compaction that crashed before truncating it, so it is
+    ignored on replay.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries = 0
+
+    @staticmethod
+    def checksum(data: bytes) -> int:
+        return zlib.crc32(data)
+
+    def reset(self, base: int, fsync: bool = False):
+        """Start a fresh journal on top of the snapshot with checksum `base`"""
+        temp_file = self.path.with_suffix('.journal.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'base': base}) + "\n")
+            if fsync:
+                sync_file(f)
+        temp_file.replace(self.path)
+        self.entries = 0
+
+    def append(self, record: dict, fsync: bool = False):
+        """Append a single mutation record, O(1) in the number of tasks"""
+        self.append_many([record], fsync)
+
+    def append_many(self, records: list[dict], fsync: bool = False):
+        """Append several records with one write (and at most one fsync)"""
+        lines = "".join(json.dumps(record, separators=(',', ':')) + "\n" for record in records)
+        with metrics.span('journal.append'), open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            if fsync:
+                sync_file(f)
+        self.entries += len(records)
+        metrics.count('journal.write.bytes', len(lines))
+
+    def base(self) -> int:
+        """Checksum of the snapshot the journal was started against, None if it has no header"""
+        if not self.path.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            try:
+                return json.loads(f.readline()).get('base')
+            except (ValueError, AttributeError):
+                return None
+
+    def has_records(self) -> bool:
+        """True if anything was appended after the header"""
+        if not self.path.exists():
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            f.readline()
+            return bool(f.readline().strip())
+
+    def read(self, base: int) -> tuple[list[dict], bool]:
+        """Return (records, clean) for the journal written against `base`.
+
+        `clean` is False when the tail was torn by a crash mid-append or the
+        journal was stale, meaning the caller should compact.
+        """
+        if not self.path.exists():
+            return [], True
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.read().split("\n")
+
+        try:
+            header = json.loads(lines[0])
+        except (ValueError, IndexError):
+            return [], False
+        if header.get('base') != base:
+            return [], False
+
+        records = []
+        clean = True
+        for line in lines[1:]:
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Torn write from a crash: everything after it is unreliable
+                clean = False
+                break
+        self.entries = len(records)
+        return records, clean
+
+    def read_from(self, offset: int) -> list[dict]:
+        """Records appended after byte `offset`, e.g. by another process"""
+        if not self.path.exists():
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            lines = f.read().decode('utf-8').split("\n")
+        records = []
+        for line in lines:
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+        self.entries += len(records)
+        return records
@@ -1,147 +1,823 @@
-import json
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import wraps
+from operator import attrgetter
 from pathlib import Path
-from datetime import datetime
-from Model.Task import Task, Priority
+from Model.Task import Task, Priority, parse_date
+from Controller.StorageBackend import StorageBackend, StorageConflict, open_storage
+from Controller.JsonStorage import record_ids, without_ids
+from Controller.TextIndex import TextIndex
+from Controller.SortedIndex import SortedIndex
+from Controller.TagIndex import TagIndex
+from Controller.ColumnStore import ColumnStore
+from Controller.QueryCache import QueryCache
+from Controller.TaskArchive import TaskArchive
+from Controller.TaskQuery import (QueryPlan, parse_query, sql_filter, CompletedTerm, TextTerm, TagTerm,
+                                  TagContainsTerm, DueTerm)
+from Controller.PersistenceWorker import PersistenceWorker
+from Controller.Metrics import metrics
+
+# Bulk operations touching more tasks than this rebuild the in-memory
+# indexes once instead of updating them task by task
+BULK_REINDEX_THRESHOLD = 1000
+# Attempts at a write that keeps losing the race against other processes
+CONFLICT_RETRIES = 5
+# Task attributes a stored record carries besides the id
+TASK_FIELDS = ('title', 'due_date', 'priority', 'completed', 'completed_at', 'tags')
+# Most tasks one load_step() parses, so a UI loop driving a lazy load
+# never stalls on a single huge batch
+LAZY_MAX_BATCH = 4000
+
+
+def synchronized(method):
+    """Run a TaskManager method under its lock, so worker threads can read safely"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class TaskManager:
-    def __init__(self, data_file: str = "tasks.json"):
+    def __init__(self, data_file: str = "tasks.json", journal: bool = False, compact_every: int = 1000,
+                 storage: StorageBackend = None, columnar: bool = False, lazy_load: bool = False,
+                 background: bool = False, write_window: float = 0.2, durability: str = 'batch',
+                 query_cache_size: int = 32, archive_after: int = None):
         self.data_file = Path(data_file)
-        self.tasks = self._load_tasks()
+        # Held by every public read and mutation; re-entrant because
+        # mutations finish loading first
+        self.lock = threading.RLock()
+        # Bumped whenever the task set changes, so readers can tell whether
+        # something they computed earlier is still current
+        self.version = 0
+        # Recent get_tasks results, dropped as soon as the version moves on
+        self.query_cache = QueryCache(query_cache_size)
+        # Records an open transaction() holds back (None with queryable
+        # storage, which writes them at once inside an SQL transaction), and
+        # what it needs to roll back: the id -> Task map at its start plus
+        # the pre-change state of every task it updated
+        self._batch: list[dict] = None
+        self._undo: tuple[dict, dict] = None
+        # Ids changed by other processes, picked up while resolving a write
+        # conflict and not yet reported by check_external_changes()
+        self._external_ids: set[str] = set()
+        if storage is None:
+            storage = open_storage(self.data_file, journal, compact_every)
+        self.storage = storage
+        # With `background`, mutations are written by a worker thread that
+        # coalesces each burst into one write. Queryable backends answer
+        # reads from storage, so their writes have to stay synchronous.
+        self._writer = None
+        if background and not storage.queryable:
+            self._writer = PersistenceWorker(storage, write_window, durability)
+        # Completed tasks moved out of the hot file; with `archive_after`
+        # those completed that many days ago move there automatically
+        self.archive = TaskArchive(self.data_file.with_suffix('.archive'), storage.fsync)
+        self.archive_after = archive_after
+        self._archived_on = None
+        self.text_index = TextIndex()
+        self.sorted_index = SortedIndex()
+        # Interned tags and tag -> tasks sets, for tag queries and counts
+        self.tag_index = TagIndex()
+        # Optional columnar copy that answers completed/tag/due-range filters
+        # with bitset operations
+        self.column_store = ColumnStore() if columnar else None
+        # Every in-memory index implements rebuild/add/remove/update
+        self._indexes = [self.text_index, self.sorted_index, self.tag_index]
+        if self.column_store is not None:
+            self._indexes.append(self.column_store)
+        # id -> Task in storage order. Queryable backends answer get_tasks
+        # themselves, so this is only filled if something asks for `tasks`.
+        self._tasks: dict[str, Task] = None
+        # With lazy_load the caller drives load_step() (e.g. from the Tk
+        # loop) and can show the first batch before the file is fully parsed
+        self._loader = None
+        if not storage.queryable:
+            if lazy_load:
+                self.tasks = []
+                self._loader = self._load_batches()
+            else:
+                self.tasks = self._load_tasks()
+        if self._loader is None:
+            self.auto_archive()
+
+    @property
+    def tasks(self) -> list[Task]:
+        if self._tasks is None:
+            self.tasks = self._load_tasks()
+        return list(self._tasks.values())
+
+    @tasks.setter
+    def tasks(self, tasks: list[Task]):
+        self._tasks = {task.id: task for task in tasks}
+        self.version += 1
+        self._rebuild_indexes()
+        if self._writer is not None and self._writer.has_baseline:
+            self._writer.baseline(self._tasks)
+
+    def _rebuild_indexes(self):
+        # Queryable backends keep their own indexes
+        tasks = [] if self.storage.queryable else self._tasks.values()
+        for index in self._indexes:
+            index.rebuild(tasks)
+
+    def _index_task(self, task: Task):
+        if not self.storage.queryable:
+            for index in self._indexes:
+                index.add(task)
+
+    def _unindex_task(self, task: Task):
+        if not self.storage.queryable:
+            for index in self._indexes:
+                index.remove(task)
+
+    def _reindex_task(self, task: Task):
+        if not self.storage.queryable:
+            for index in self._indexes:
+                index.update(task)
     
+    @metrics.timed('task_manager.load')
     def _load_tasks(self) -> list[Task]:
-        """Load tasks from JSON file with enhanced error handling"""
+        """Load tasks from the storage backend"""
+        return self.storage.load()
+
+    def _load_batches(self):
+        # A journal left on top of the snapshot arrives after the last batch
+        for batch in self.storage.iter_load(replay=self._apply_external, max_batch_size=LAZY_MAX_BATCH):
+            for task in batch:
+                self._tasks[task.id] = task
+            for index in self._indexes:
+                index.add_many(batch)
+            yield len(batch)
+
+    @property
+    def loading(self) -> bool:
+        return self._loader is not None
+
+    @metrics.timed('task_manager.load_step')
+    @synchronized
+    def load_step(self) -> bool:
+        """Parse the next batch of a lazy load, returns False once loading is complete"""
+        if self._loader is None:
+            return False
         try:
-            if not self.data_file.exists():
-                return []
-            
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                tasks = []
-                for task_data in data:
-                    try:
-                        task = Task(
-                            title=task_data.get('title', ''),
-                            due_date=task_data.get('due_date'),
-                            priority=Priority[task_data.get('priority', 'MEDIUM')],
-                            tags = task_data.get('tags', []),
-                        )
-                        if task_data.get('completed', False):
-                            task.mark_completed()
-                        tasks.append(task)
-                    except (KeyError, ValueError) as e:
-                        print(f"Skipping invalid task: {e}")
-                return tasks
-        except Exception as e:
-            print(f"Error loading tasks: {e}")
-            return []
+            next(self._loader)
+            self.version += 1
+            return True
+        except StopIteration:
+            self._loader = None
+            self.auto_archive()
+            return False
+
+    @synchronized
+    def warm_indexes(self, limit: int = 2000) -> bool:
+        """Index a few queued tasks for search, returns True while more remain"""
+        return self.text_index.flush(limit) > 0
+
+    def _finish_loading(self):
+        """Mutations and full saves need the complete task set"""
+        while self.load_step():
+            pass
+        if self._writer is not None and not self._writer.has_baseline:
+            # The worker's copy of the tasks, taken before the first mutation
+            self._writer.baseline(self._tasks)
 
+    @metrics.timed('task_manager.save')
+    @synchronized
     def _save_tasks(self):
-        """Save tasks to JSON file with atomic write"""
-        try:
-            temp_file = self.data_file.with_suffix('.tmp')
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump([{
-                    'title': task.title,
-                    'due_date': task.due_date.strftime("%Y-%m-%d") if task.due_date else None,
-                    'priority': task.priority.name,
-                    'completed': task.completed,
-                    'tags': task.tags
-                } for task in self.tasks], f, indent=2)
-            
-            # Atomic replace
-            temp_file.replace(self.data_file)
-        except Exception as e:  
-            print(f"Error saving tasks: {e}")
+        """Write every task to the storage backend"""
+        self._finish_loading()
+        if self._writer is not None:
+            self._writer.baseline(self._tasks, save=True)
+            return
+        self.storage.save(self.tasks)
 
-    def add_task(self, title: str, due_date: str = None, priority: Priority = Priority.MEDIUM, tags: list[str] = []) -> Task:
-        """Add a new task with validation"""
+    @metrics.timed('task_manager.commit')
+    def _commit(self, record: dict):
+        """Persist a single mutation record"""
+        self.version += 1
+        if self._batch is not None:
+            # Held back until the transaction commits
+            self._batch.extend(record['records'] if record['op'] == 'batch' else [record])
+            return
+        if self._writer is not None:
+            self._writer.submit(record)
+            return
+        for _ in range(CONFLICT_RETRIES):
+            try:
+                self.storage.commit(self._tasks.values() if self._tasks is not None else None, record)
+                return
+            except StorageConflict:
+                metrics.count('task_manager.conflicts')
+                # Someone else wrote first: take their changes, put ours
+                # back on top and try again
+                tasks = self._tasks.values() if self._tasks is not None else None
+                external = without_ids(self.storage.read_changes(tasks), record_ids([record]))
+                self._external_ids |= self._apply_external(external)
+                self._apply_external([record])
+        raise StorageConflict(f"Could not write {self.data_file}: it keeps changing")
+
+    def _apply_external(self, records: list[dict]) -> set[str]:
+        """Apply mutation records from another process, returns the ids they touched.
+
+        Changed tasks are updated in place, so they keep their position and
+        only their own index entries move.
+        """
+        if self._tasks is None:
+            return set()
+        touched = set()
+        for record in records:
+            op = record.get('op')
+            if op == 'batch':
+                touched |= self._apply_external(record['records'])
+            elif op in ('add', 'update'):
+                try:
+                    incoming = Task.from_dict({**record['task'], 'id': record.get('id') or record['task'].get('id')})
+                except (KeyError, ValueError) as e:
+                    print(f"Skipping invalid change: {e}")
+                    continue
+                task = self._tasks.get(incoming.id)
+                if task is None:
+                    self._tasks[incoming.id] = incoming
+                    self._index_task(incoming)
+                else:
+                    for attr in TASK_FIELDS:
+                        setattr(task, attr, getattr(incoming, attr))
+                    self._reindex_task(task)
+                touched.add(incoming.id)
+            elif op == 'delete' or op == 'clear_completed':
+                if op == 'delete':
+                    ids = [record.get('id')]
+                elif 'ids' in record:
+                    ids = record['ids']
+                else:
+                    ids = [t.id for t in self._tasks.values() if t.completed]
+                for task_id in ids:
+                    task = self._tasks.pop(task_id, None)
+                    if task is not None:
+                        self._unindex_task(task)
+                        touched.add(task_id)
+        if touched:
+            self.version += 1
+        return touched
+
+    @metrics.timed('task_manager.check_external_changes')
+    @synchronized
+    def check_external_changes(self) -> set[str]:
+        """Pick up what other processes changed in the task files.
+
+        Cheap when nothing changed (a couple of stat calls), so a UI can
+        poll it. Only the changed records are read and applied; returns the
+        ids of the tasks that were added, changed or removed.
+        """
+        if self.storage.queryable:
+            # Queries read the database, so there is nothing to apply; the
+            # version bump is what expires cached results and ETags
+            self._sync_queryable()
+            return set()
+        if self._tasks is None or self.loading:
+            return set()
+        if self._writer is not None:
+            if self.storage.changed():
+                # Our own queued writes go first, so they are not mistaken
+                # for (or overwritten by) the other process's changes
+                self._writer.flush()
+            self._external_ids |= self._apply_external(self._writer.take_external())
+        touched = self._external_ids | self._apply_external(self.storage.read_changes(self._tasks.values()))
+        self._external_ids = set()
+        return touched
+
+    def _sync_queryable(self):
+        """Bump the version if another connection committed to queryable storage"""
+        if self.storage.changed():
+            # What was cached may be stale
+            self.storage.read_changes()
+            self.version += 1
+
+    def flush(self):
+        """Block until every mutation so far is written (no-op without `background`)"""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """Write out pending mutations and release the storage backend"""
+        if self._writer is not None:
+            self._writer.close()
+        self.storage.close()
+
+    @synchronized
+    def get_task(self, task_id: str) -> Task:
+        """Look up a task by id in O(1), returns None if it does not exist"""
+        if self._tasks is not None:
+            return self._tasks.get(task_id)
+        return self.storage.fetch(task_id)
+
+    @contextmanager
+    def transaction(self):
+        """Group mutations into one atomic commit.
+
+        Inside the block add_task, update_task, delete_task, clear_completed
+        and the bulk operations change the tasks as usual, and reads inside
+        it see those changes. Their records are held back and persisted
+        together as a single 'batch' record when the block exits; queryable
+        storage writes them at once inside one SQL transaction instead. If
+        the block raises, every change it made is rolled back and nothing
+        is persisted. Nested transactions join the outermost one.
+        """
+        with self.lock:
+            if self._undo is not None:
+                yield self
+                return
+            self._finish_loading()
+            self._batch = None if self.storage.queryable else []
+            self._undo = (dict(self._tasks) if self._tasks is not None else None, {})
+            try:
+                with self.storage.transaction():
+                    yield self
+            except BaseException:
+                records = None
+                self._rollback()
+                raise
+            else:
+                records = self._batch
+            finally:
+                self._batch = self._undo = None
+            if records:
+                self._commit(records[0] if len(records) == 1 else {'op': 'batch', 'records': records})
+
+    def _remember(self, task: Task):
+        """Save a task's state before a transaction first changes it"""
+        if self._undo is not None and task.id not in self._undo[1]:
+            self._undo[1][task.id] = task.to_dict()
+
+    def _rollback(self):
+        tasks, saved = self._undo
+        if tasks is None:
+            # Queryable storage rolled back its own writes; only what was
+            # cached from inside the transaction is left to drop
+            self.version += 1
+            return
+        # Restored in place, since callers may hold on to the Task objects
+        for task_id, data in saved.items():
+            task = tasks.get(task_id)
+            if task is not None:
+                original = Task.from_dict(data)
+                for attr in TASK_FIELDS:
+                    setattr(task, attr, getattr(original, attr))
+        self.tasks = list(tasks.values())
+
+    @staticmethod
+    def _new_task(title: str, due_date: str = None, priority: Priority = Priority.MEDIUM, tags: list[str] = None) -> Task:
+        """Validated, not yet stored Task"""
         if not title.strip():
             raise ValueError("Task title cannot be empty")
-            
+
         try:
-            parsed_date = datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
+            parsed_date = parse_date(due_date) if due_date else None
         except ValueError:
             raise ValueError("Invalid date format. Use YYYY-MM-DD")
-        
-        task = Task(title=title, due_date=due_date, priority=priority, tags=tags)
-        self.tasks.append(task)
-        self._save_tasks()
+
+        if isinstance(priority, str):
+            try:
+                priority = Priority[priority.upper()]
+            except KeyError:
+                raise ValueError("Invalid priority value")
+
+        task = Task(title=title, priority=priority, tags=list(tags) if tags else [])
+        task.due_date = parsed_date
         return task
 
-    def delete_task(self, index: int) -> bool:
-        """Delete task by index, returns success status"""
-        if 0 <= index < len(self.tasks):
-            del self.tasks[index]
-            self._save_tasks()
-            return True
-        return False
-    def get_tasks(self, filter_completed: bool = None, search_query: str = None, tag_filter: str = None, sort: bool = False ) -> list[Task]:
-        tasks = self.tasks.copy()
+    @metrics.timed('task_manager.add_task')
+    @synchronized
+    def add_task(self, title: str, due_date: str = None, priority: Priority = Priority.MEDIUM, tags: list[str] = []) -> Task:
+        """Add a new task with validation"""
+        self._finish_loading()
+        task = self._new_task(title, due_date, priority, tags)
+        if self._tasks is not None:
+            self._tasks[task.id] = task
+            self._index_task(task)
+        self._commit({'op': 'add', 'task': task.to_dict()})
+        return task
+
+    @metrics.timed('task_manager.delete_task')
+    @synchronized
+    def delete_task(self, task_id: str) -> bool:
+        """Delete task by id, returns success status"""
+        self._finish_loading()
+        if self._tasks is not None:
+            task = self._tasks.pop(task_id, None)
+            if task is None:
+                return False
+            self._unindex_task(task)
+        elif self.storage.fetch(task_id) is None:
+            return False
+        self._commit({'op': 'delete', 'id': task_id})
+        return True
+
+    @staticmethod
+    def _due_ordinal(date_str: str) -> int:
+        if date_str is None:
+            return None
+        try:
+            return parse_date(date_str).toordinal()
+        except ValueError:
+            raise ValueError("Invalid date format. Use YYYY-MM-DD")
+
+    @metrics.timed('task_manager.get_tasks')
+    @synchronized
+    def get_tasks(self, filter_completed: bool = None, search_query: str = None, tag_filter: str = None, sort: bool = False,
+                  search_tags: bool = False, due_from: str = None, due_to: str = None, query: str = None) -> list[Task]:
+        """Filter (and optionally sort) tasks.
+
+        `search_query` matches title, priority name and due date; with
+        `search_tags` it also matches tags. `due_from`/`due_to`
+        (YYYY-MM-DD, inclusive) keep only tasks due in that range.
+        `query` is a structured query as the GUI search box takes it (see
+        TaskQuery.parse_query), e.g. 'tag:#work priority:HIGH due<2025-07-01
+        -done "report"'; with it, every filter is planned together and the
+        most selective index goes first.
+
+        Repeating a query before anything changed returns the cached list
+        from the first call, which callers therefore must not modify.
+        """
+        if self.storage.queryable:
+            self._sync_queryable()
+        # A query can be relative to the day (due<today, is:overdue), so its
+        # results also expire at midnight
+        today = date.today() if query is not None else None
+        key = (filter_completed, search_query, tag_filter, sort, search_tags, due_from, due_to, query, today)
+        tasks = self.query_cache.get(key, self.version)
+        if tasks is None:
+            tasks = self._query(*key)
+            self.query_cache.put(key, self.version, tasks)
+        return tasks
+
+    def _query(self, filter_completed: bool, search_query: str, tag_filter: str, sort: bool, search_tags: bool,
+               due_from: str, due_to: str, query: str, today: date) -> list[Task]:
+        low, high = self._due_ordinal(due_from), self._due_ordinal(due_to)
+        due_range = low is not None or high is not None
+
+        if query is not None:
+            # The plain filters become terms of every alternative
+            extra = []
+            if filter_completed is not None:
+                extra.append(CompletedTerm(filter_completed))
+            if search_query:
+                extra.append(TextTerm(search_query, ('title', 'priority', 'due', 'tags') if search_tags
+                                      else ('title', 'priority', 'due')))
+            if tag_filter:
+                extra.append(TagContainsTerm(tag_filter))
+            if due_range:
+                extra.append(DueTerm(low, high))
+            return self._run_query([terms + tuple(extra) for terms in parse_query(query, today)], sort)
+
+        if self.storage.queryable:
+            return self.storage.query(filter_completed, search_query, tag_filter, sort, search_tags, due_from, due_to)
+
+        if self.column_store is not None and not search_query and (
+                filter_completed is not None or tag_filter or due_range):
+            # Bitset filtering; only matching rows become Task objects
+            tasks = self.column_store.select(filter_completed, tag_filter, low, high)
+            filter_completed = tag_filter = None
+            due_range = False
+        elif search_query:
+            # Index lookup, already in storage order
+            fields = ('title', 'priority', 'due', 'tags') if search_tags else ('title', 'priority', 'due')
+            tasks = self.text_index.search(search_query, fields)
+        elif tag_filter:
+            # Only the tagged tasks, in the order asked for
+            tasks = self.tag_index.ordered(self.tag_index.containing(tag_filter), sort)
+            tag_filter = None
+            sort = False
+        elif due_range:
+            # Two bisects into the sorted order instead of testing every task
+            tasks = self.sorted_index.due_range(low, high, sort)
+            due_range = sort = False
+        elif sort:
+            # Read the maintained order; the filters below keep it intact
+            tasks = self.sorted_index.tasks()
+            sort = False
+        else:
+            tasks = self.tasks
 
         if filter_completed is not None:
             tasks = [t for t in tasks if t.completed == filter_completed]
 
-        if search_query:
-            query = search_query.lower()
+        if tag_filter:
+            tagged = self.tag_index.containing(tag_filter)
+            tasks = [t for t in tasks if t in tagged]
+
+        if due_range:
             tasks = [
                 t for t in tasks
-                if (
-                    query in t.title.lower()
-                    or query in t.priority.name.lower()
-                    or (t.due_date and query in t.due_date.strftime("%Y-%m-%d"))
-                )
+                if t.due_date and (low is None or low <= t.due_date.toordinal())
+                and (high is None or t.due_date.toordinal() <= high)
             ]
 
-        if tag_filter:
-            tag_query = tag_filter.lower()
-            tasks = [t for t in tasks if any(tag_query in tag.lower() for tag in t.tags)]
-
         if sort:
-            tasks.sort()  # Uses __lt__
+            # Stable sort on the precomputed key, same order as __lt__
+            with metrics.span('task_manager.sort'):
+                tasks.sort(key=attrgetter('sort_key'))
 
         return tasks
 
-   
+    def _plans(self, alternatives) -> list[QueryPlan]:
+        total = len(self._tasks)
+        return [QueryPlan(self, terms, total) for terms in alternatives]
 
-    def update_task(self, index: int, **kwargs) -> bool:
-        """Update task attributes"""
-        if not 0 <= index < len(self.tasks):
-            return False
-            
-        task = self.tasks[index]
-        
+    def _run_query(self, alternatives, sort: bool) -> list[Task]:
+        if self.storage.queryable:
+            # No in-memory indexes: SQLite narrows the rows by the tag,
+            # priority, due and state terms, the rest are tested on what it returns
+            return [task for task in self.storage.query(sort=sort, where=sql_filter(alternatives))
+                    if any(all(term.matches(task) for term in terms) for terms in alternatives)]
+        plans = self._plans(alternatives)
+        if len(plans) == 1:
+            plan = plans[0]
+            if plan.seed is None:
+                # A scan in the order asked for needs no reordering
+                return plan.run(self, self.sorted_index.tasks if sort else self._tasks.values)
+            return self.tag_index.ordered(plan.run(self, None), sort)
+        matched = set()
+        for plan in plans:
+            matched |= set(plan.run(self, self._tasks.values))
+        return self.tag_index.ordered(matched, sort)
+
+    @synchronized
+    def explain_query(self, query: str) -> str:
+        """How get_tasks(query=...) would run, one line per OR alternative"""
+        if self.storage.queryable:
+            where = sql_filter(parse_query(query))
+            return f"storage query {'where ' + where[0] if where else 'of every row'}, then check every term"
+        return "\n".join(plan.explain() for plan in self._plans(parse_query(query)))
+
+    @metrics.timed('task_manager.get_tasks_by_tags')
+    @synchronized
+    def get_tasks_by_tags(self, tags: list[str], match_all: bool = True, prefix: bool = False,
+                          sort: bool = False) -> list[Task]:
+        """Tasks carrying all of `tags` (any of them with match_all=False).
+
+        Tags match case-insensitively and in full, or with `prefix` as
+        prefixes ('#proj' matches '#project-x'). Results are in storage
+        order, or sorted as get_tasks(sort=True) does, and cached like
+        get_tasks results.
+        """
+        if self.storage.queryable:
+            # No in-memory index: the same conditions as tag: query terms, run by SQLite
+            if not tags:
+                return []
+            terms = [TagTerm(tag, prefix) for tag in tags]
+            alternatives = (tuple(terms),) if match_all else tuple((term,) for term in terms)
+            return self.storage.query(sort=sort, where=sql_filter(alternatives))
+        key = ('by_tags', tuple(tags), match_all, prefix, sort)
+        tasks = self.query_cache.get(key, self.version)
+        if tasks is None:
+            tasks = self.tag_index.ordered(self.tag_index.select(tags, match_all, prefix), sort)
+            self.query_cache.put(key, self.version, tasks)
+        return tasks
+
+    @synchronized
+    def tag_counts(self) -> dict[str, int]:
+        """Tag -> number of tasks carrying it, most used first, e.g. for a tag sidebar"""
+        if self.storage.queryable:
+            return self.storage.tag_counts()
+        return self.tag_index.counts()
+
+    @synchronized
+    def get_due(self, window: str, today: date = None) -> list[Task]:
+        """Open tasks in a due-date window, sorted: 'overdue' (due before
+        today), 'today', or 'week' (today through Sunday)"""
+        today = today or date.today()
+        if window == 'overdue':
+            low, high = None, today - timedelta(days=1)
+        elif window == 'today':
+            low = high = today
+        elif window == 'week':
+            low, high = today, today + timedelta(days=6 - today.weekday())
+        else:
+            raise ValueError("Window must be 'overdue', 'today' or 'week'")
+        return self.get_tasks(filter_completed=False, sort=True,
+                              due_from=low and low.strftime("%Y-%m-%d"), due_to=high.strftime("%Y-%m-%d"))
+
+    @synchronized
+    def next_due_date(self, today: date = None) -> datetime:
+        """Earliest due date on or after `today` among open tasks, None if there is none"""
+        today = today or date.today()
+        if self.storage.queryable:
+            tasks = self.get_tasks(filter_completed=False, sort=True, due_from=today.strftime("%Y-%m-%d"))
+            return tasks[0].due_date if tasks else None
+        for task in self.sorted_index.iter_due_from(today.toordinal()):
+            if not task.completed:
+                return task.due_date
+        return None
+
+    @staticmethod
+    def _validate_changes(kwargs: dict) -> dict:
+        """Check update_task keyword arguments, returns the attributes to set"""
+        changes = {}
         if 'title' in kwargs:
             if not kwargs['title'].strip():
                 raise ValueError("Title cannot be empty")
-            task.title = kwargs['title']
+            changes['title'] = kwargs['title']
             
         if 'priority' in kwargs:
             try:
-                task.priority = Priority[kwargs['priority'].upper()]
+                changes['priority'] = Priority[kwargs['priority'].upper()]
             except KeyError:
                 raise ValueError("Invalid priority value")
                 
         if 'due_date' in kwargs:
             try:
-                task.due_date = (datetime.strptime(kwargs['due_date'], "%Y-%m-%d") 
-                                if kwargs['due_date'] else None)
+                changes['due_date'] = (parse_date(kwargs['due_date']) 
+                                       if kwargs['due_date'] else None)
             except ValueError:
                 raise ValueError("Invalid date format. Use YYYY-MM-DD")
-                
+
         if 'completed' in kwargs:
-            if kwargs['completed']:
-                task.mark_completed()
-            else:
-                task.completed = False
-                
-        self._save_tasks()
+            changes['completed'] = bool(kwargs['completed'])
+        return changes
+
+    def _apply_changes(self, task: Task, changes: dict, reindex: bool = True):
+        self._remember(task)
+        for attr, value in changes.items():
+            setattr(task, attr, value)
+        if 'completed' in changes and task.completed == (task.completed_at is None):
+            # Newly completed, or reopened
+            task.completed_at = parse_date(date.today().strftime("%Y-%m-%d")) if task.completed else None
+        if reindex:
+            self._reindex_task(task)
+        self._commit({'op': 'update', 'id': task.id, 'task': task.to_dict()})
+
+    @metrics.timed('task_manager.update_task')
+    @synchronized
+    def update_task(self, task_id: str, **kwargs) -> bool:
+        """Update task attributes by id"""
+        self._finish_loading()
+        task = self.get_task(task_id)
+        if task is None:
+            return False
+
+        # Validate everything before touching the task so a bad value
+        # leaves it (and the indexes) untouched
+        self._apply_changes(task, self._validate_changes(kwargs))
         return True
 
+    @metrics.timed('task_manager.add_tasks')
+    @synchronized
+    def add_tasks(self, rows) -> list[Task]:
+        """Add many tasks with a single commit.
+
+        `rows` are dicts of add_task arguments (title, due_date, priority,
+        tags). Every row is validated before any task is added; an invalid
+        one raises ValueError naming its position and nothing changes.
+        """
+        new = []
+        for i, row in enumerate(rows):
+            try:
+                new.append(self._new_task(**row))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Row {i}: {e}")
+
+        with self.transaction():
+            if self._tasks is not None:
+                for task in new:
+                    self._tasks[task.id] = task
+                if not self.storage.queryable:
+                    for index in self._indexes:
+                        index.add_many(new)
+            self._commit({'op': 'batch', 'records': [{'op': 'add', 'task': task.to_dict()} for task in new]})
+        return new
+
+    @metrics.timed('task_manager.import_tasks')
+    @synchronized
+    def import_tasks(self, tasks) -> int:
+        """Add existing Task objects (e.g. read from another file) with a single commit.
+
+        Their ids are kept, and one whose id is already stored replaces
+        that task. Every task is validated before anything changes; an
+        untitled one raises ValueError naming its position. Returns how
+        many tasks were imported.
+        """
+        # The last of several tasks sharing an id wins
+        tasks = list({task.id: task for task in tasks}.values())
+        for i, task in enumerate(tasks):
+            if not task.title.strip():
+                raise ValueError(f"Task {i}: Task title cannot be empty")
+
+        with self.transaction():
+            new, records = [], []
+            for task in tasks:
+                current = self.get_task(task.id)
+                if current is None:
+                    new.append(task)
+                    records.append({'op': 'add', 'task': task.to_dict()})
+                    continue
+                self._remember(current)
+                for attr in TASK_FIELDS:
+                    setattr(current, attr, getattr(task, attr))
+                self._reindex_task(current)
+                records.append({'op': 'update', 'id': current.id, 'task': current.to_dict()})
+            if self._tasks is not None:
+                for task in new:
+                    self._tasks[task.id] = task
+                if not self.storage.queryable:
+                    for index in self._indexes:
+                        index.add_many(new)
+            self._commit({'op': 'batch', 'records': records})
+        return len(tasks)
+
+    @metrics.timed('task_manager.update_where')
+    @synchronized
+    def update_where(self, predicate, **kwargs) -> int:
+        """Apply update_task changes to every task for which `predicate(task)` is true.
+
+        The changes are validated once up front and committed together,
+        returns how many tasks were updated.
+        """
+        changes = self._validate_changes(kwargs)
+        with self.transaction():
+            matched = [task for task in self.get_tasks() if predicate(task)]
+            bulk = len(matched) > BULK_REINDEX_THRESHOLD
+            for task in matched:
+                self._apply_changes(task, changes, reindex=not bulk)
+            if bulk and not self.storage.queryable:
+                self._rebuild_indexes()
+        return len(matched)
+
+    @metrics.timed('task_manager.delete_where')
+    @synchronized
+    def delete_where(self, predicate) -> int:
+        """Delete every task for which `predicate(task)` is true with one commit"""
+        with self.transaction():
+            if self._tasks is None:
+                doomed = [task for task in self.get_tasks() if predicate(task)]
+            else:
+                doomed = [task for task in self._tasks.values() if predicate(task)]
+                for task in doomed:
+                    del self._tasks[task.id]
+                if len(doomed) > BULK_REINDEX_THRESHOLD:
+                    self._rebuild_indexes()
+                else:
+                    for task in doomed:
+                        self._unindex_task(task)
+            self._commit({'op': 'batch', 'records': [{'op': 'delete', 'id': task.id} for task in doomed]})
+        return len(doomed)
+
+    @metrics.timed('task_manager.clear_completed')
+    @synchronized
     def clear_completed(self) -> int:
         """Remove all completed tasks, returns count removed"""
-        initial_count = len(self.tasks)
-        self.tasks = [t for t in self.tasks if not t.completed]
-        removed = initial_count - len(self.tasks)
+        self._finish_loading()
+        if self._tasks is None:
+            removed = self.storage.count(filter_completed=True)
+        else:
+            done = [t for t in self._tasks.values() if t.completed]
+            for t in done:
+                del self._tasks[t.id]
+                self._unindex_task(t)
+            removed = len(done)
         if removed > 0:
-            self._save_tasks()
-        return removed
\ No newline at end of file
+            record = {'op': 'clear_completed'}
+            if self._tasks is not None:
+                record['ids'] = [t.id for t in done]
+            self._commit(record)
+        return removed
+
+    @metrics.timed('task_manager.archive_completed')
+    @synchronized
+    def archive_completed(self, older_than: int = None) -> int:
+        """Move completed tasks into the archive, returns how many moved.
+
+        Only tasks completed at least `older_than` days ago (default
+        archive_after, else 0) move. Tasks completed before completion
+        dates were recorded are of unknown age, so only older_than=0 moves
+        them. They leave memory, the indexes and the hot file, and are read
+        back only through iter_archived().
+        """
+        self._finish_loading()
+        if older_than is None:
+            older_than = self.archive_after or 0
+        cutoff = datetime.combine(date.today() - timedelta(days=older_than), datetime.min.time())
+        done = [task for task in self.get_tasks(filter_completed=True)
+                if (task.completed_at <= cutoff if task.completed_at is not None else older_than == 0)]
+        if not done:
+            return 0
+        # Archived first: a crash in between leaves a duplicate, not a loss
+        self.archive.append(done)
+        ids = {task.id for task in done}
+        return self.delete_where(lambda task: task.id in ids)
+
+    @synchronized
+    def auto_archive(self) -> int:
+        """Run the archive_after policy at most once a day, e.g. from a UI's poll loop"""
+        # A lazy load runs the policy itself once it finishes
+        if self.archive_after is None or self.loading or self._archived_on == date.today():
+            return 0
+        self._archived_on = date.today()
+        return self.archive_completed()
+
+    def iter_archived(self, completed_from: str = None, completed_to: str = None, search_query: str = None,
+                      tag_filter: str = None):
+        """Stream archived tasks, oldest month first; see TaskArchive.iter_tasks"""
+        return self.archive.iter_tasks(completed_from, completed_to, search_query, tag_filter)
@@ -0,0 +1,466 @@
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from Model.Task import Task, Priority, parse_date, NO_DUE_DATE
+from Controller.TextIndex import FIELDS, task_matches
+from Controller.Metrics import metrics
+
+# One term: optional '-', optional field and operator, then a quoted or bare value
+_TOKEN = re.compile(r'(-?)(?:([A-Za-z]+)(<=|>=|:|<|>|=))?("[^"]*"?|[^\s"]+)')
+# Per-task cost of checking a text term, relative to the other terms'
+# one: a substring test on each of the task's indexed field values
+TEXT_CHECK_COST = 3
+# Cost per matching task of fetching a text term from the index, which
+# intersects trigram posting lists and confirms every candidate value
+TEXT_FETCH_COST = 4
+
+
+class Term:
+    """One condition of a query.
+
+    Every term can test a single task with matches(). Terms an index can
+    answer also give an estimate() of how many tasks match, cheap to get
+    from the index alone, and fetch() the matching tasks as a set (which
+    may be the index's own and must not be modified). Terms SQLite storage
+    can answer give an sql() condition on its tasks table.
+    """
+
+    __slots__ = ()
+    # Relative cost of matches() per task, and of fetch() per task fetched
+    cost = 1
+    fetch_cost = 1
+
+    def estimate(self, manager) -> int:
+        """Tasks matching, or an upper bound; None if no index can answer the term"""
+        return None
+
+    def fetch(self, manager) -> set[Task]:
+        raise NotImplementedError
+
+    def matches(self, task: Task) -> bool:
+        raise NotImplementedError
+
+    def sql(self) -> tuple[str, list]:
+        """WHERE condition (never NULL) and its parameters, None if SQL cannot express the term"""
+        return None
+
+    def checker(self, manager):
+        """matches(), possibly sped up with the manager's indexes"""
+        return self.matches
+
+
+# A condition on one of a task's rows in task_tags
+_TAG_SQL = "EXISTS (SELECT 1 FROM task_tags WHERE task_tags.task_id = tasks.id AND {})"
+
+
+def _due_sql(low: int, high: int) -> tuple[str, list]:
+    """Dated tasks due between two ordinals (either may be None); ISO dates
+    compare chronologically as text"""
+    if low is not None and high is not None and low > high:
+        return "0", []
+    clauses, params = ["due_date IS NOT NULL"], []
+    for op, ordinal in ((">=", low), ("<=", high)):
+        if ordinal is not None and ordinal < NO_DUE_DATE:
+            clauses.append(f"due_date {op} ?")
+            params.append(date.fromordinal(ordinal).strftime("%Y-%m-%d"))
+    return " AND ".join(clauses), params
+
+
+class TagTerm(Term):
+    """tag:#work, #work, or tag:#proj* for a prefix"""
+
+    __slots__ = ('tag', 'prefix')
+
+    def __init__(self, tag: str, prefix: bool = False):
+        self.tag = tag.lower()
+        self.prefix = prefix
+
+    def estimate(self, manager) -> int:
+        return manager.tag_index.count(self.tag, self.prefix)
+
+    def fetch(self, manager) -> set[Task]:
+        return manager.tag_index.prefix(self.tag) if self.prefix else manager.tag_index.exact(self.tag)
+
+    def matches(self, task: Task) -> bool:
+        if self.prefix:
+            return any(tag.lower().startswith(self.tag) for tag in task.tags)
+        return any(tag.lower() == self.tag for tag in task.tags)
+
+    def sql(self) -> tuple[str, list]:
+        if self.prefix:
+            return _TAG_SQL.format("substr(tag_lower, 1, ?) = ?"), [len(self.tag), self.tag]
+        return _TAG_SQL.format("tag_lower = ?"), [self.tag]
+
+    def __str__(self):
+        return f"tag:{self.tag}{'*' if self.prefix else ''}"
+
+
+class TagContainsTerm(Term):
+    """get_tasks' tag_filter: any tag containing the text"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text.lower()
+
+    def estimate(self, manager) -> int:
+        return manager.tag_index.count_containing(self.text)
+
+    def fetch(self, manager) -> set[Task]:
+        return manager.tag_index.containing(self.text)
+
+    def matches(self, task: Task) -> bool:
+        return any(self.text in tag.lower() for tag in task.tags)
+
+    def sql(self) -> tuple[str, list]:
+        return _TAG_SQL.format("instr(tag_lower, ?) > 0"), [self.text]
+
+    def __str__(self):
+        return f"tag~{self.text}"
+
+
+class DueTerm(Term):
+    """Due date between two ordinals, inclusive; due:none is the range past every date"""
+
+    __slots__ = ('low', 'high')
+
+    def __init__(self, low: int = None, high: int = None):
+        self.low = low
+        self.high = high
+
+    def estimate(self, manager) -> int:
+        return manager.sorted_index.due_count(self.low, self.high)
+
+    def fetch(self, manager) -> set[Task]:
+        return set(manager.sorted_index.due_range(self.low, self.high))
+
+    def matches(self, task: Task) -> bool:
+        ordinal = task.due_ordinal
+        if self.low is not None and ordinal < self.low:
+            return False
+        return ordinal <= (NO_DUE_DATE - 1 if self.high is None else self.high)
+
+    def sql(self) -> tuple[str, list]:
+        if self.low == NO_DUE_DATE and self.high == NO_DUE_DATE:
+            return "due_date IS NULL", []
+        return _due_sql(self.low, self.high)
+
+    def __str__(self):
+        if self.low is not None and self.high is not None and self.low > self.high:
+            return "due:(nothing)"
+        if self.low == NO_DUE_DATE:
+            return "due:none"
+        low = date.fromordinal(self.low) if self.low is not None else None
+        high = date.fromordinal(self.high) if self.high is not None else None
+        if low == high:
+            return f"due:{low}"
+        return " ".join(part for part in (low and f"due>={low}", high and f"due<={high}") if part)
+
+
+class OverdueTerm(Term):
+    """is:overdue, open tasks due before today"""
+
+    __slots__ = ('today',)
+
+    def __init__(self, today: int):
+        self.today = today
+
+    def estimate(self, manager) -> int:
+        return manager.sorted_index.due_count(None, self.today - 1)
+
+    def fetch(self, manager) -> set[Task]:
+        return {task for task in manager.sorted_index.due_range(None, self.today - 1) if not task.completed}
+
+    def matches(self, task: Task) -> bool:
+        return not task.completed and task.due_ordinal < self.today
+
+    def sql(self) -> tuple[str, list]:
+        clause, params = _due_sql(None, self.today - 1)
+        return f"completed = 0 AND {clause}", params
+
+    def __str__(self):
+        return "is:overdue"
+
+
+class PriorityTerm(Term):
+    __slots__ = ('priorities',)
+
+    def __init__(self, priorities):
+        self.priorities = frozenset(priorities)
+
+    def matches(self, task: Task) -> bool:
+        return task.priority in self.priorities
+
+    def sql(self) -> tuple[str, list]:
+        values = sorted(p.value for p in self.priorities)
+        return f"priority IN ({', '.join('?' * len(values))})" if values else "0", values
+
+    def __str__(self):
+        return "priority:" + ",".join(p.name for p in sorted(self.priorities, key=lambda p: p.value))
+
+
+class CompletedTerm(Term):
+    """done / is:done / is:open"""
+
+    __slots__ = ('completed',)
+
+    def __init__(self, completed: bool):
+        self.completed = completed
+
+    def matches(self, task: Task) -> bool:
+        return task.completed == self.completed
+
+    def sql(self) -> tuple[str, list]:
+        return "completed = ?", [int(self.completed)]
+
+    def __str__(self):
+        return "is:done" if self.completed else "is:open"
+
+
+class TextTerm(Term):
+    """A bare or quoted word, matched as a substring like the old search box"""
+
+    __slots__ = ('text', 'fields')
+    cost = TEXT_CHECK_COST
+    fetch_cost = TEXT_FETCH_COST
+
+    def __init__(self, text: str, fields=FIELDS):
+        self.text = text.lower()
+        self.fields = fields
+
+    def estimate(self, manager) -> int:
+        return manager.text_index.estimate(self.text, self.fields)
+
+    def fetch(self, manager) -> set[Task]:
+        return manager.text_index.matching(self.text, self.fields)
+
+    def matches(self, task: Task) -> bool:
+        return task_matches(task, self.text, self.fields)
+
+    def checker(self, manager):
+        text, fields, matches = self.text, self.fields, manager.text_index.matches
+        return lambda task: matches(task, text, fields)
+
+    def __str__(self):
+        return f'"{self.text}"'
+
+
+class NotTerm(Term):
+    __slots__ = ('term',)
+
+    def __init__(self, term: Term):
+        self.term = term
+
+    @property
+    def cost(self):
+        return self.term.cost
+
+    def matches(self, task: Task) -> bool:
+        return not self.term.matches(task)
+
+    def sql(self) -> tuple[str, list]:
+        inner = self.term.sql()
+        return None if inner is None else (f"NOT ({inner[0]})", inner[1])
+
+    def checker(self, manager):
+        check = self.term.checker(manager)
+        return lambda task: not check(task)
+
+    def __str__(self):
+        return f"-{self.term}"
+
+
+def _day(value: str, today: date) -> date:
+    if value.lower() == 'today':
+        return today
+    if value.lower() == 'tomorrow':
+        return today + timedelta(days=1)
+    try:
+        return parse_date(value).date()
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+
+
+def _field_term(field: str, op: str, value: str, today: date) -> Term:
+    """The term for `field op value`, or None if `field` is not a query field"""
+    equals = op in (':', '=')
+    if field in ('tag', 'tags') and equals:
+        return TagTerm(value[:-1], prefix=True) if value.endswith('*') else TagTerm(value)
+    if field in ('priority', 'p'):
+        try:
+            priority = Priority[value.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown priority {value!r}, use LOW, MEDIUM or HIGH")
+        compare = {':': int.__eq__, '=': int.__eq__, '<': int.__lt__, '<=': int.__le__,
+                   '>': int.__gt__, '>=': int.__ge__}[op]
+        return PriorityTerm(p for p in Priority if compare(p.value, priority.value))
+    if field == 'due':
+        if value.lower() == 'none' and equals:
+            return DueTerm(NO_DUE_DATE, NO_DUE_DATE)
+        ordinal = _day(value, today).toordinal()
+        low, high = {':': (ordinal, ordinal), '=': (ordinal, ordinal), '<': (None, ordinal - 1),
+                     '<=': (None, ordinal), '>': (ordinal + 1, None), '>=': (ordinal, None)}[op]
+        return DueTerm(low, high)
+    if field == 'is' and equals:
+        state = value.lower()
+        if state in ('done', 'completed'):
+            return CompletedTerm(True)
+        if state in ('open', 'pending'):
+            return CompletedTerm(False)
+        if state == 'overdue':
+            return OverdueTerm(today.toordinal())
+        raise ValueError(f"Unknown state {value!r}, use done, open or overdue")
+    return None
+
+
+@lru_cache(maxsize=256)
+def _parse(text: str, today: date) -> tuple[tuple[Term, ...], ...]:
+    conjunctions = [[]]
+    for match in _TOKEN.finditer(text):
+        negate, field, op, value = match.groups()
+        quoted = value.startswith('"')
+        if quoted:
+            value = value.strip('"')
+            if not value:
+                continue
+        if not quoted and not negate and not field and value == 'OR':
+            conjunctions.append([])
+            continue
+        term = _field_term(field.lower(), op, value, today) if field else None
+        if term is None:
+            if field:
+                # Not a query field (e.g. a URL): search for the text as typed
+                value = f"{field}{op}{value}"
+            if not quoted and value.startswith('#') and len(value) > 1:
+                term = TagTerm(value)
+            elif not quoted and value.lower() == 'done':
+                term = CompletedTerm(True)
+            else:
+                term = TextTerm(value)
+        conjunctions[-1].append(NotTerm(term) if negate else term)
+    return tuple(tuple(terms) for terms in conjunctions if terms) or ((),)
+
+
+def parse_query(text: str, today: date = None) -> tuple[tuple[Term, ...], ...]:
+    """Parse a search query into alternatives (split on OR), each a tuple of
+    terms that must all hold. Raises ValueError on an invalid field value.
+
+        tag:#work  #work  tag:#proj*         tag, exact or by prefix
+        priority:HIGH  p>=medium             priority
+        due:2025-07-01  due<today  due:none  due date (also <=, >, >=, tomorrow)
+        done  is:done  is:open  is:overdue   state
+        report  "weekly report"              text in title, priority, date or tags
+        -term                                negation
+        a b OR c                             (a and b) or c
+
+    Parses are cached, so re-running a query only plans and executes it.
+    """
+    return _parse(text, today or date.today())
+
+
+def is_plain(text: str) -> bool:
+    """True for a single word without any query syntax, which matches
+    exactly what a TextTerm for it matches"""
+    if len(text.split()) != 1:
+        return False
+    try:
+        (terms,) = parse_query(text)
+    except ValueError:
+        return False
+    return len(terms) == 1 and type(terms[0]) is TextTerm and terms[0].text == text.lower()
+
+
+def sql_filter(alternatives: tuple[tuple[Term, ...], ...]) -> tuple[str, list]:
+    """A WHERE condition every task matching `alternatives` meets, built from
+    the terms SQL can express, and its parameters; None if some alternative
+    has no such term, so every row is a candidate. The other terms (text)
+    still have to be checked on the rows it returns."""
+    parts, params = [], []
+    for terms in alternatives:
+        conditions = [condition for condition in (term.sql() for term in terms) if condition is not None]
+        if not conditions:
+            return None
+        parts.append(" AND ".join(f"({clause})" for clause, _ in conditions))
+        params += [param for _, values in conditions for param in values]
+    return " OR ".join(f"({part})" for part in parts), params
+
+
+def _merge_due(terms: tuple[Term, ...]) -> list[Term]:
+    """`terms` with their due ranges (due>=a due<=b) combined into one"""
+    ranges = [term for term in terms if type(term) is DueTerm]
+    if len(ranges) < 2:
+        return list(terms)
+    lows = [term.low for term in ranges if term.low is not None]
+    low = max(lows) if lows else None
+    # A missing high is still bounded: DueTerm stops at the last real date, so
+    # due:none due>=a is empty rather than due:none
+    high = min(NO_DUE_DATE - 1 if term.high is None else term.high for term in ranges)
+    if low is not None and low > high:
+        # Contradictory, so the plan is the empty range alone and fetches nothing
+        return [DueTerm(low, high)]
+    merged = DueTerm(low, None if high == NO_DUE_DATE - 1 else high)
+    return [term for term in terms if type(term) is not DueTerm] + [merged]
+
+
+class QueryPlan:
+    """How one alternative of a query runs.
+
+    The seed is the indexed term cheapest to fetch, i.e. with the fewest
+    expected matches weighted by its fetch cost; it is fetched from its index and every other term is applied to the
+    survivors only. An indexed residual term whose set costs less to fetch
+    than testing each survivor is intersected as a set, the rest are
+    checked per task, cheapest first. Without any indexed term, or when
+    even the seed costs more to fetch than checking it on every task, the
+    plan scans every task.
+    """
+
+    def __init__(self, manager, terms: tuple[Term, ...], total: int):
+        terms = _merge_due(terms)
+        # Estimates are upper bounds (a short text term counts every task once
+        # per field), never more than the tasks there are
+        estimates = {term: None if (size := term.estimate(manager)) is None else min(size, total)
+                     for term in terms}
+        indexed = [term for term in terms if estimates[term] is not None]
+        self.seed = min(indexed, key=lambda term: estimates[term] * term.fetch_cost, default=None)
+        if self.seed is not None and estimates[self.seed] * self.seed.fetch_cost >= total * self.seed.cost:
+            # Fetching an unselective term costs more than testing every task
+            self.seed = None
+        rows = total if self.seed is None else estimates[self.seed]
+        self.estimates = estimates
+        self.total = total
+        self.intersect: list[Term] = []
+        self.check: list[Term] = []
+        rest = sorted((term for term in terms if term is not self.seed),
+                      key=lambda term: (term.cost, total if estimates[term] is None else estimates[term]))
+        for term in rest:
+            size = estimates[term]
+            # Fetching costs about the set's size plus one lookup per survivor
+            if self.seed is not None and size is not None and size * term.fetch_cost < rows * (term.cost - 1):
+                self.intersect.append(term)
+            else:
+                self.check.append(term)
+            if size is not None:
+                rows = min(rows, size)
+
+    def run(self, manager, scan):
+        """Matching tasks: a set (possibly an index's own, not to be modified),
+        or with no seed a list in the order `scan()` yields them"""
+        checks = [term.checker(manager) for term in self.check]
+        if self.seed is None:
+            metrics.count('query.scans')
+            return [task for task in scan() if all(check(task) for check in checks)]
+        metrics.count('query.seeded')
+        tasks = self.seed.fetch(manager)
+        for term in self.intersect:
+            tasks = tasks & term.fetch(manager)
+        if checks:
+            return {task for task in tasks if all(check(task) for check in checks)}
+        return tasks
+
+    def explain(self) -> str:
+        steps = [f"scan {self.total}" if self.seed is None
+                 else f"index {self.seed} ~{self.estimates[self.seed]}"]
+        steps += [f"intersect {term} ~{self.estimates[term]}" for term in self.intersect]
+        if self.check:
+            steps.append("check " + ", ".join(str(term) for term in self.check))
+        return " -> ".join(steps)
@@ -0,0 +1,217 @@
+from itertools import islice
+from Model.Task import Task
+
+GRAM_SIZE = 3
+
+FIELDS = ('title', 'priority', 'due', 'tags')
+
+
+def _field_values(task: Task) -> dict[str, tuple[str, ...]]:
+    """Lower-cased values for each searchable field, as get_tasks compares them"""
+    return {
+        'title': (task.title.lower(),),
+        'priority': (task.priority.name.lower(),),
+        'due': (task.due_date.strftime("%Y-%m-%d"),) if task.due_date else (),
+        'tags': tuple(tag.lower() for tag in task.tags),
+    }
+
+
+def task_matches(task: Task, query: str, fields=('title', 'priority', 'due')) -> bool:
+    """Linear-scan equivalent of TextIndex.search for one task; `query` is lower-case"""
+    values = _field_values(task)
+    return any(query in value for field in fields for value in values[field])
+
+
+def _grams(value: str) -> set[str]:
+    """Trigrams of `value`; shorter values are their own single gram"""
+    if len(value) <= GRAM_SIZE:
+        return {value}
+    return {value[i:i + GRAM_SIZE] for i in range(len(value) - GRAM_SIZE + 1)}
+
+
+class _FieldIndex:
+    """Distinct values of one field, the tasks holding each, and trigram
+    posting lists over the distinct values.
+
+    Dates, priorities and tags repeat across many tasks, so their grams are
+    indexed once per distinct value rather than once per task.
+    """
+
+    def __init__(self):
+        self.tasks_by_value: dict[str, set[Task]] = {}
+        self.grams: dict[str, set[str]] = {}
+        # (value, task) pairs, for the average number of tasks per value
+        self.size = 0
+
+    def add(self, value: str, task: Task):
+        tasks = self.tasks_by_value.get(value)
+        if tasks is None:
+            tasks = self.tasks_by_value[value] = set()
+            for gram in _grams(value):
+                self.grams.setdefault(gram, set()).add(value)
+        if task not in tasks:
+            tasks.add(task)
+            self.size += 1
+
+    def remove(self, value: str, task: Task):
+        tasks = self.tasks_by_value.get(value)
+        if tasks is None or task not in tasks:
+            return
+        tasks.discard(task)
+        self.size -= 1
+        if tasks:
+            return
+        del self.tasks_by_value[value]
+        for gram in _grams(value):
+            bucket = self.grams[gram]
+            bucket.discard(value)
+            if not bucket:
+                del self.grams[gram]
+
+    def matching_values(self, query: str) -> set[str]:
+        if len(query) < GRAM_SIZE:
+            # Every occurrence of a short query lies inside some indexed gram
+            return {value for gram, values in self.grams.items() if query in gram for value in values}
+
+        buckets = []
+        for i in range(len(query) - GRAM_SIZE + 1):
+            bucket = self.grams.get(query[i:i + GRAM_SIZE])
+            if not bucket:
+                return set()
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        candidates = set(buckets[0])
+        for bucket in buckets[1:]:
+            candidates &= bucket
+            if not candidates:
+                break
+        return {value for value in candidates if query in value}
+
+    def search(self, query: str, matches: set[Task]):
+        for value in self.matching_values(query):
+            matches |= self.tasks_by_value[value]
+
+    def estimate(self, query: str) -> int:
+        """Rough count of the tasks matching `query`, from posting list sizes only:
+        the values holding its rarest trigram times the tasks per value"""
+        if not self.tasks_by_value:
+            return 0
+        if len(query) < GRAM_SIZE:
+            return self.size
+        values = min(len(self.grams.get(query[i:i + GRAM_SIZE], ())) for i in range(len(query) - GRAM_SIZE + 1))
+        return -(-values * self.size // len(self.tasks_by_value))
+
+
+class TextIndex:
+    """Incrementally maintained trigram index for substring search.
+
+    Queries intersect the posting lists of their trigrams and confirm the
+    surviving values with `in`, so results are identical to a linear scan
+    but cost scales with the candidates instead of the task count.
+
+    Adding a task only queues it; queued tasks are indexed by flush(),
+    which search() calls first. Loading a big file therefore does not pay
+    for indexing up front, and a UI can flush in small steps while idle.
+    """
+
+    def __init__(self):
+        self.fields = {field: _FieldIndex() for field in FIELDS}
+        self._values: dict[Task, dict[str, tuple[str, ...]]] = {}
+        # Added but not yet indexed, in insertion order
+        self._pending: dict[Task, None] = {}
+        # Insertion sequence, used to return matches in storage order
+        self._seq: dict[Task, int] = {}
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self._values) + len(self._pending)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def rebuild(self, tasks):
+        self.__init__()
+        self.add_many(tasks)
+
+    def add_many(self, tasks):
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task: Task):
+        if task not in self._seq:
+            self._seq[task] = self._next_seq
+            self._next_seq += 1
+        self._pending[task] = None
+
+    def _index(self, task: Task):
+        values = _field_values(task)
+        self._values[task] = values
+        for field, field_values in values.items():
+            index = self.fields[field]
+            for value in field_values:
+                index.add(value, task)
+
+    def flush(self, limit: int = None) -> int:
+        """Index up to `limit` queued tasks (all by default), returns how many remain"""
+        pending = self._pending
+        if limit is None or limit >= len(pending):
+            batch = list(pending)
+            pending.clear()
+        else:
+            batch = list(islice(pending, limit))
+            for task in batch:
+                del pending[task]
+        for task in batch:
+            self._index(task)
+        return len(pending)
+
+    def remove(self, task: Task, forget: bool = True):
+        if forget:
+            self._seq.pop(task, None)
+        if task in self._pending:
+            del self._pending[task]
+            return
+        values = self._values.pop(task, None)
+        if values is None:
+            return
+        for field, field_values in values.items():
+            index = self.fields[field]
+            for value in field_values:
+                index.remove(value, task)
+
+    def update(self, task: Task):
+        """Re-index a task after its fields changed, keeping its position"""
+        if task in self._pending:
+            return
+        old = self._values.get(task)
+        if old is not None and old == _field_values(task):
+            return
+        self.remove(task, forget=False)
+        self.add(task)
+
+    def search(self, query: str, fields=('title', 'priority', 'due')) -> list[Task]:
+        """Tasks whose fields contain `query` (case-insensitive), in insertion order"""
+        return sorted(self.matching(query, fields), key=self._seq.__getitem__)
+
+    def matches(self, task: Task, query: str, fields=('title', 'priority', 'due')) -> bool:
+        """task_matches() on the values already indexed for `task`; `query` is lower-case"""
+        values = self._values.get(task)
+        if values is None:
+            return task_matches(task, query, fields)
+        return any(query in value for field in fields for value in values[field])
+
+    def matching(self, query: str, fields=('title', 'priority', 'due')) -> set[Task]:
+        """search() as an unordered set"""
+        self.flush()
+        query = query.lower()
+        matches = set()
+        for field in fields:
+            self.fields[field].search(query, matches)
+        return matches
+
+    def estimate(self, query: str, fields=('title', 'priority', 'due')) -> int:
+        """Rough len(search(query, fields)) in a few dict lookups, for query planning"""
+        self.flush()
+        query = query.lower()
+        return sum(self.fields[field].estimate(query) for field in fields)
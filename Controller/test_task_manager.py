@@ -0,0 +1,872 @@
+import asyncio
+from collections import Counter
+from datetime import date, datetime
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+import pytest
+from Controller.TaskManager import TaskManager
+from Controller.JsonStorage import JsonStorage
+from Controller.BinaryStorage import BinaryStorage
+from Controller.StorageBackend import convert_storage
+from Controller.SearchWorker import SearchWorker
+from Controller.SnapshotCache import SnapshotCache
+from Controller.Metrics import metrics
+from Controller.DueScheduler import DueScheduler
+from View import cli
+from View.server import TaskServer
+from Model.Task import Priority, NO_DUE_DATE
+
+
+def test_journal_appends_instead_of_rewriting(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    first = TaskManager(data_file).add_task("first", "2025-06-06", Priority.HIGH, ["#work"])
+    snapshot = data_file.read_bytes()
+
+    manager = TaskManager(data_file, journal=True)
+
+    second = manager.add_task("second")
+    manager.update_task(first.id, completed=True)
+    manager.delete_task(second.id)
+
+    assert data_file.read_bytes() == snapshot
+    reloaded = TaskManager(data_file, journal=True)
+    assert [(t.title, t.completed) for t in reloaded.tasks] == [("first", True)]
+
+
+def test_journal_compacts_and_ignores_torn_tail(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    manager = TaskManager(data_file, journal=True, compact_every=3)
+    for i in range(4):
+        manager.add_task(f"task {i}")
+    assert manager.storage.journal.entries == 1
+
+    with open(manager.storage.journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "add", "task": {"title": "torn"')
+
+    reloaded = TaskManager(data_file)
+    assert [t.title for t in reloaded.tasks] == [f"task {i}" for i in range(4)]
+    # Folded in and restarted, not deleted under the journaled manager
+    assert not reloaded.storage._journal().has_records()
+    manager.add_task("after the fold")
+    assert [t.title for t in TaskManager(data_file).tasks][-1] == "after the fold"
+
+
+def test_sqlite_backend_matches_json_queries(tmp_path):
+    json_manager = TaskManager(tmp_path / "tasks.json")
+    sql_manager = TaskManager(tmp_path / "tasks.db")
+    rows = [
+        ("Write report", "2025-07-01", Priority.HIGH, ["#work"]),
+        ("Buy milk", None, Priority.LOW, ["#home"]),
+        ("Plan sprint", "2025-06-06", Priority.MEDIUM, ["#work", "#Planning"]),
+        ("Call mom", "2025-06-06", Priority.HIGH, []),
+    ]
+    for manager in (json_manager, sql_manager):
+        added = [manager.add_task(title, due, priority, tags) for title, due, priority, tags in rows]
+        manager.update_task(added[1].id, completed=True)
+        manager.delete_task(added[3].id)
+        assert manager.get_task(added[0].id).title == "Write report"
+
+    def titles(manager, **kwargs):
+        return [t.title for t in manager.get_tasks(**kwargs)]
+
+    for kwargs in ({}, {'sort': True}, {'filter_completed': False}, {'search_query': 'HIG'},
+                   {'search_query': '06-06'}, {'tag_filter': 'WORK', 'sort': True}, {'tag_filter': 'plan'}):
+        assert titles(sql_manager, **kwargs) == titles(json_manager, **kwargs)
+
+    assert sql_manager.clear_completed() == json_manager.clear_completed() == 1
+    reopened = TaskManager(tmp_path / "tasks.db")
+    assert titles(reopened, sort=True) == titles(json_manager, sort=True)
+
+
+def test_text_index_matches_linear_scan(tmp_path):
+    manager = TaskManager(tmp_path / "tasks.json")
+    report = manager.add_task("Write quarterly report", "2025-07-01", Priority.HIGH, ["#work"])
+    milk = manager.add_task("Buy milk", None, Priority.LOW, ["#home", "#errands"])
+    manager.add_task("Report bug", "2025-06-06", Priority.MEDIUM, ["#Work"])
+    manager.update_task(milk.id, title="Buy oat milk")
+    manager.delete_task(report.id)
+
+    def scan(query, tags):
+        return [
+            t for t in manager.tasks
+            if query in t.title.lower() or query in t.priority.name.lower()
+            or (t.due_date and query in t.due_date.strftime("%Y-%m-%d"))
+            or (tags and any(query in tag.lower() for tag in t.tags))
+        ]
+
+    for query in ("o", "rep", "report", "oat milk", "milk", "2025-06", "med", "work", "#err", "zzz"):
+        for tags in (False, True):
+            assert manager.get_tasks(search_query=query, search_tags=tags) == scan(query, tags)
+
+
+def test_task_ids_persist_and_address_tasks(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    data_file.write_text('[{"title": "legacy", "due_date": null, "priority": "LOW", "completed": false, "tags": []}]')
+    manager = TaskManager(data_file, journal=True)
+    legacy_id = manager.tasks[0].id
+    later = manager.add_task("later", "2024-01-01")
+
+    # Sorted view order differs from storage order; ids still hit the right task
+    assert [t.id for t in manager.get_tasks(sort=True)] == [later.id, legacy_id]
+    assert manager.update_task(later.id, completed=True)
+    assert not manager.update_task("missing", completed=True)
+
+    reloaded = TaskManager(data_file)
+    assert reloaded.get_task(legacy_id).title == "legacy"
+    assert reloaded.get_task(later.id).completed
+
+
+def test_sorted_view_tracks_mutations(tmp_path):
+    manager = TaskManager(tmp_path / "tasks.json")
+    dates = ["2025-07-01", None, "2025-06-06", "2025-06-06", None, "2025-01-31"]
+    priorities = [Priority.LOW, Priority.HIGH, Priority.MEDIUM, Priority.HIGH, Priority.LOW, Priority.MEDIUM]
+    added = [manager.add_task(f"t{i}", d, p) for i, (d, p) in enumerate(zip(dates, priorities))]
+    manager.update_task(added[0].id, due_date="2025-06-06", priority="HIGH")
+    manager.update_task(added[3].id, due_date="")
+    manager.delete_task(added[5].id)
+    manager.add_task("late", "2025-06-06", Priority.HIGH)
+
+    expected = sorted(manager.tasks)  # Task.__lt__ with stable ties
+    assert manager.get_tasks(sort=True) == expected
+    assert manager.get_tasks(filter_completed=False, sort=True) == expected
+    assert manager.get_tasks(search_query="t", sort=True) == [t for t in expected if "t" in t.title]
+
+
+def test_columnar_filters_match_row_filters(tmp_path):
+    managers = [TaskManager(tmp_path / "rows.json"), TaskManager(tmp_path / "cols.json", columnar=True),
+                TaskManager(tmp_path / "tasks.db")]
+    for manager in managers:
+        added = [
+            manager.add_task(f"task {i}", f"2025-06-{i % 28 + 1:02d}" if i % 3 else None,
+                             list(Priority)[i % 3], [["#work"], ["#Home", "#workshop"], []][i % 3])
+            for i in range(200)
+        ]
+        for task in added[::4]:
+            manager.update_task(task.id, completed=True)
+        for task in added[::7]:
+            manager.delete_task(task.id)
+        manager.update_task(added[1].id, due_date="2025-07-04")
+
+    queries = [
+        {'filter_completed': True}, {'filter_completed': False, 'tag_filter': 'WORK'},
+        {'tag_filter': 'home', 'sort': True}, {'due_from': '2025-06-10', 'due_to': '2025-06-20'},
+        {'due_from': '2025-07-01', 'filter_completed': False}, {'due_to': '2025-06-02', 'sort': True},
+    ]
+    for kwargs in queries:
+        expected = [t.title for t in managers[0].get_tasks(**kwargs)]
+        assert expected
+        for manager in managers[1:]:
+            assert [t.title for t in manager.get_tasks(**kwargs)] == expected
+
+
+def test_lazy_load_streams_batches(tmp_path, monkeypatch):
+    data_file = tmp_path / "tasks.json"
+    data_file.write_text(json.dumps([
+        {'id': str(i), 'title': f"task {i}", 'due_date': f"2025-06-{i % 28 + 1:02d}", 'priority': 'LOW'}
+        for i in range(3000)
+    ]))
+    # Pending journal records are replayed after the snapshot has streamed
+    journaled = TaskManager(data_file, journal=True)
+    journaled.add_task("journaled")
+    journaled.update_task("5", title="renamed", completed=True)
+    journaled.delete_task("7")
+    expected = [t.to_dict() for t in journaled.get_tasks(sort=True)]
+
+    lazy = TaskManager(data_file, journal=True, lazy_load=True)
+    assert lazy.loading and lazy.tasks == []
+    assert lazy.load_step()
+    assert len(lazy.tasks) == 500
+    while lazy.load_step():
+        pass
+    assert [t.to_dict() for t in lazy.get_tasks(sort=True)] == expected
+    assert [t.title for t in lazy.get_tasks(search_query="renamed")] == ["renamed"]
+    assert lazy.get_task("7") is None and "task 7" not in [t.title for t in lazy.get_tasks(search_query="task 7")]
+
+    lazy = TaskManager(data_file, lazy_load=True)
+    lazy.load_step()
+    first_batch = len(lazy.tasks)
+    assert 0 < first_batch < 3001
+    lazy.add_task("late")  # mutations finish the load first
+    assert not lazy.loading
+    assert [t.title for t in lazy.tasks] == [t.title for t in TaskManager(data_file).tasks]
+
+    # Batches stay small for a UI loop, and other writers are not locked out
+    # between them; a snapshot they replace meanwhile is caught up with
+    monkeypatch.setattr("Controller.TaskManager.LAZY_MAX_BATCH", 1000)
+    lazy = TaskManager(data_file, lazy_load=True)
+    sizes = [0]
+    lazy.load_step()
+    sizes.append(len(lazy.tasks))
+    writer = threading.Thread(target=lambda: TaskManager(data_file).add_task("meanwhile"), daemon=True)
+    writer.start()
+    writer.join(5)
+    assert not writer.is_alive()
+    while lazy.load_step():
+        sizes.append(len(lazy.tasks))
+    assert max(b - a for a, b in zip(sizes, sizes[1:])) == 1000
+    assert [t.title for t in lazy.tasks] == [t.title for t in TaskManager(data_file).tasks]
+    assert lazy.tasks[-1].title == "meanwhile"
+
+
+def test_binary_snapshot_round_trips_json(tmp_path):
+    json_file = tmp_path / "tasks.json"
+    manager = TaskManager(json_file)
+    manager.add_task("Write report", "2025-07-01", Priority.HIGH, ["#work", "#q3"])
+    manager.add_task("Ünïcödé title", None, Priority.LOW, ["#work"])
+    done = manager.add_task("Done", "1999-12-31")
+    manager.update_task(done.id, completed=True)
+
+    assert convert_storage(JsonStorage(json_file), BinaryStorage(tmp_path / "tasks.bin")) == 3
+    binary = TaskManager(tmp_path / "tasks.bin")
+    assert [t.to_dict() for t in binary.tasks] == [t.to_dict() for t in manager.tasks]
+
+    binary.add_task("Added to binary", "2025-01-01", Priority.MEDIUM, ["#home"])
+    convert_storage(BinaryStorage(tmp_path / "tasks.bin"), JsonStorage(tmp_path / "back.json"))
+    assert [t.to_dict() for t in TaskManager(tmp_path / "back.json").tasks] == [t.to_dict() for t in binary.tasks]
+
+
+def test_background_writes_coalesce_bursts(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    manager = TaskManager(data_file, journal=True, background=True, write_window=0.5)
+    added = [manager.add_task(f"task {i}", "2025-06-06") for i in range(50)]
+    for task in added[:10]:
+        manager.update_task(task.id, completed=True)
+    manager.delete_task(added[-1].id)
+    assert manager.clear_completed() == 10
+    manager.flush()
+
+    assert manager._writer.writes == 1
+    manager.add_task("after flush")
+    manager.close()
+
+    reloaded = TaskManager(data_file)
+    assert [t.title for t in reloaded.tasks] == [f"task {i}" for i in range(10, 49)] + ["after flush"]
+
+
+def test_search_worker_refines_and_drops_stale_queries(tmp_path):
+    manager = TaskManager(tmp_path / "tasks.json")
+    for i in range(200):
+        manager.add_task(f"report {i}", "2025-06-06" if i % 2 else None, Priority.HIGH, [f"#tag{i % 7}"])
+    worker = SearchWorker(manager)
+    try:
+        worker.submit("rep")
+        worker.submit('"report 1"')
+        assert [t.title for t in worker.wait(5)] == \
+            [t.title for t in manager.get_tasks(search_query="report 1", search_tags=True)]
+
+        worker.submit("12")
+        assert len(worker.wait(5)) == 12
+        # Extends the previous query, so it is refined from its results
+        worker.submit("125")
+        assert [t.title for t in worker.wait(5)] == ["report 125"]
+
+        # A mutation invalidates the previous results
+        manager.add_task("report 125 again")
+        worker.submit("125")
+        assert [t.title for t in worker.wait(5)] == ["report 125", "report 125 again"]
+        # Half-typed queries match nothing instead of failing
+        worker.submit("due<2025-0")
+        assert worker.wait(5) == []
+
+        worker.submit("#tag3")
+        worker.cancel()
+        assert worker.wait(5) is None
+    finally:
+        worker.close()
+
+
+def test_cli_cache_matches_full_load(tmp_path, capsys, monkeypatch):
+    data_file = tmp_path / "tasks.json"
+    manager = TaskManager(data_file, journal=True)
+    for i in range(20):
+        manager.add_task(f"task {i}", "2025-06-06", Priority.LOW, ["#work"])
+    manager.close()
+
+    def run(*args):
+        assert cli.main(["--file", str(data_file), *args]) == 0
+        return capsys.readouterr().out.split("\n")[:-1]
+
+    run("list")  # builds the cache
+    assert SnapshotCache(data_file).valid()
+    new_id = run("add", "new task", "--due", "2025-05-01", "--priority", "high")[0]
+    run("complete", new_id[:10])
+
+    resolve = cli._resolve
+
+    def resolve_then_rename(data_file, prefix):
+        task = resolve(data_file, prefix)
+        # Another process renames the task before this one journals
+        SnapshotCache(data_file).append({'op': 'update', 'id': task.id, 'task': {**task.to_dict(), 'title': "renamed"}})
+        return task
+    monkeypatch.setattr(cli, "_resolve", resolve_then_rename)
+    target = run("list")[2].split()[0]
+    assert run("complete", target)[0].startswith(f"{target}  [x] renamed")
+    monkeypatch.undo()
+    first = TaskManager(data_file).tasks[0].id
+    run("delete", first)
+    assert SnapshotCache(data_file).valid()
+
+    # Imported tasks keep their ids, replacing a stored task with the same one
+    source = tmp_path / "more.json"
+    replaced = TaskManager(data_file).tasks[0]
+    source.write_text(json.dumps([{**replaced.to_dict(), 'title': "replaced"}, {'title': "imported"}]))
+    snapshot = data_file.read_bytes()
+    run("import", str(source))
+    assert data_file.read_bytes() == snapshot  # journaled, not a full rewrite
+
+    cached = run("list", "--sort")
+    full = [cli._format(t) for t in TaskManager(data_file, journal=True).get_tasks(sort=True)]
+    assert cached == full
+    assert cached[0].startswith(new_id[:8] + "  [x] new task")
+    assert len(cached) == 21
+    assert TaskManager(data_file).get_task(replaced.id).title == "replaced"
+    assert "tkinter" not in sys.modules
+
+
+def test_bulk_operations_commit_once_and_roll_back(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    manager = TaskManager(data_file, journal=True)
+    rows = [{'title': f"task {i}", 'due_date': "2025-06-06", 'priority': "high" if i % 2 else Priority.LOW,
+             'tags': ["#work" if i % 3 else "#home"]} for i in range(3000)]
+    added = manager.add_tasks(rows)
+    assert manager.storage.journal.entries == 1
+
+    assert manager.update_where(lambda t: "#home" in t.tags, completed=True) == 1000
+    assert manager.delete_where(lambda t: t.priority == Priority.LOW and not t.completed) == 1000
+    assert manager.storage.journal.entries == 3
+
+    with pytest.raises(ValueError, match="Row 1"):
+        manager.add_tasks([{'title': "ok"}, {'title': "bad", 'due_date': "2025-02-30"}])
+
+    before = [t.to_dict() for t in manager.get_tasks(sort=True)]
+    with pytest.raises(RuntimeError):
+        with manager.transaction():
+            manager.add_task("inside")
+            manager.update_task(added[1].id, title="renamed", priority="LOW")
+            manager.clear_completed()
+            raise RuntimeError("abort")
+    assert [t.to_dict() for t in manager.get_tasks(sort=True)] == before
+    assert manager.get_tasks(search_query="renamed") == []
+    assert manager.storage.journal.entries == 3
+
+    with manager.transaction():
+        manager.add_task("inside")
+        manager.update_task(added[1].id, title="renamed")
+    assert manager.storage.journal.entries == 4
+
+    for reloaded in (TaskManager(data_file), TaskManager(data_file, background=True)):
+        assert [t.to_dict() for t in reloaded.get_tasks(sort=True)] == \
+            [t.to_dict() for t in manager.get_tasks(sort=True)]
+        reloaded.close()
+
+
+@pytest.mark.parametrize("name", ["tasks.json", "tasks.db"])
+def test_transactions_read_their_own_writes_and_roll_back_in_place(tmp_path, name):
+    data_file = tmp_path / name
+    manager = TaskManager(data_file)
+    kept = manager.add_task("kept", "2025-06-06")
+
+    with manager.transaction():
+        added = manager.add_task("added")
+        assert [t.title for t in manager.get_tasks(search_query="added")] == ["added"]
+        manager.update_task(added.id, priority="HIGH")
+        manager.update_task(added.id, completed=True)
+        manager.update_task(kept.id, title="renamed")
+    for reloaded in (manager, TaskManager(data_file)):
+        task = reloaded.get_task(added.id)
+        assert (task.priority, task.completed) == (Priority.HIGH, True)
+        assert reloaded.get_task(kept.id).title == "renamed"
+
+    held = manager.get_task(kept.id)
+    with pytest.raises(RuntimeError):
+        with manager.transaction():
+            manager.update_task(kept.id, title="rolled back", due_date=None)
+            manager.delete_task(added.id)
+            raise RuntimeError("abort")
+    # Objects handed out before the transaction are restored too
+    assert (held.title, held.due_date) == ("renamed", datetime(2025, 6, 6))
+    for reloaded in (manager, TaskManager(data_file)):
+        assert sorted(t.title for t in reloaded.get_tasks()) == ["added", "renamed"]
+        assert reloaded.get_tasks(search_query="rolled") == []
+    manager.close()
+
+
+@pytest.mark.parametrize("journal, background", [(False, False), (True, False), (True, True)])
+def test_concurrent_writers_merge_instead_of_clobbering(tmp_path, journal, background):
+    data_file = tmp_path / "tasks.json"
+    seed = TaskManager(data_file)
+    shared = seed.add_task("shared", "2025-06-06")
+    seed.add_task("untouched")
+
+    gui = TaskManager(data_file, journal=journal, background=background)
+    script = TaskManager(data_file, journal=journal)
+    assert gui.check_external_changes() == set()
+
+    # The script writes first; the GUI's write conflicts and merges
+    added = script.add_task("from script")
+    script.update_task(shared.id, priority="HIGH")
+    mine = gui.add_task("from gui")
+    gui.flush()
+    assert gui.check_external_changes() == {added.id, shared.id}
+    assert gui.get_task(shared.id).priority == Priority.HIGH
+
+    # Now the GUI writes and the script picks it up without a reload
+    gui.delete_task(added.id)
+    gui.flush()
+    assert script.check_external_changes() == {mine.id, added.id}
+
+    expected = ["shared", "untouched", "from gui"]
+    for manager in (gui, script, TaskManager(data_file)):
+        assert sorted(t.title for t in manager.tasks) == sorted(expected)
+    gui.close()
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_conflicting_writes_to_different_tasks_both_survive(tmp_path, journal):
+    data_file = tmp_path / "tasks.json"
+    seed = TaskManager(data_file)
+    first, second = seed.add_task("first"), seed.add_task("second")
+
+    one = TaskManager(data_file, journal=journal)
+    two = TaskManager(data_file, journal=journal)
+    one.update_task(first.id, completed=True)
+    # Stale view of the files: the write conflicts, reads one's change and retries
+    two.update_task(second.id, priority="HIGH")
+    assert two.get_task(first.id).completed
+    assert two.check_external_changes() == {first.id}
+    assert one.check_external_changes() == {second.id}
+
+    for manager in (one, two, TaskManager(data_file)):
+        assert [(t.title, t.completed, t.priority) for t in manager.tasks] == \
+            [("first", True, Priority.MEDIUM), ("second", False, Priority.HIGH)]
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_conflicting_writes_to_the_same_task_keep_the_last_writer(tmp_path, journal):
+    data_file = tmp_path / "tasks.json"
+    task = TaskManager(data_file).add_task("shared")
+
+    one = TaskManager(data_file, journal=journal)
+    two = TaskManager(data_file, journal=journal)
+    one.update_task(task.id, title="renamed by one")
+    # Two's record carries its whole task, so it replaces one's version
+    two.update_task(task.id, priority="HIGH")
+    assert two.check_external_changes() == set()
+    assert one.check_external_changes() == {task.id}
+
+    for manager in (one, two, TaskManager(data_file)):
+        assert [(t.title, t.priority) for t in manager.tasks] == [("shared", Priority.HIGH)]
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_plain_process_folds_journal_without_losing_later_records(tmp_path, background):
+    data_file = tmp_path / "tasks.json"
+    journaled = TaskManager(data_file, journal=True, background=background)
+    journaled.add_task("a")
+    journaled.flush()
+
+    # Another process opens the file without a journal, folding it into the snapshot
+    root = Path(__file__).resolve().parent.parent
+    subprocess.run([sys.executable, "-c", "import sys; from Controller.TaskManager import TaskManager; "
+                    "print(len(TaskManager(sys.argv[1]).tasks))", str(data_file)],
+                   cwd=root, check=True, capture_output=True)
+
+    journaled.add_task("b")
+    journaled.flush()
+    journaled.close()
+    for manager in (TaskManager(data_file), TaskManager(data_file, journal=True)):
+        assert [t.title for t in manager.tasks] == ["a", "b"]
+
+
+def test_http_server_pages_validates_etags_and_writes(tmp_path):
+    manager = TaskManager(tmp_path / "tasks.json", journal=True, background=True)
+    manager.add_tasks([{'title': f"task {i}", 'priority': "HIGH" if i % 2 else "LOW"} for i in range(250)])
+    loop = asyncio.new_event_loop()
+    server = TaskServer(manager, port=0)
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.port)
+
+    def request(method, path, body=None, headers=None):
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, json.loads(data) if data else None, response.getheader("ETag")
+
+    try:
+        status, page, etag = request("GET", "/tasks?offset=200")
+        assert status == 200 and page['total'] == 250 and page['next'] is None
+        assert [t['title'] for t in page['tasks']] == [f"task {i}" for i in range(200, 250)]
+        status, page, _ = request("GET", "/tasks?q=task+1&limit=5")
+        assert page['next'] == 5 and len(page['tasks']) == 5
+        assert request("GET", "/tasks?offset=200", headers={"If-None-Match": etag})[0] == 304
+
+        status, added, _ = request("POST", "/tasks", {'title': "report", 'due_date': "2025-07-01", 'tags': ["#work"]})
+        assert status == 201
+        assert request("GET", "/tasks?offset=200", headers={"If-None-Match": etag})[0] == 200
+        assert request("PATCH", f"/tasks/{added['id']}", {'completed': True})[1]['completed'] is True
+        assert request("POST", "/tasks", {'title': " "})[0] == 400
+        assert request("PATCH", "/tasks/missing", {'completed': True})[0] == 404
+        assert request("GET", "/tasks?completed=maybe")[0] == 400
+        assert request("POST", "/tasks/clear-completed")[1] == {'removed': 1}
+        first = request("GET", "/tasks?limit=1")[1]['tasks'][0]
+        assert request("DELETE", f"/tasks/{first['id']}")[0] == 204
+        assert request("GET", f"/tasks/{first['id']}")[0] == 404
+    finally:
+        conn.close()
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        manager.close()
+    assert len(TaskManager(tmp_path / "tasks.json").tasks) == 249
+
+
+def test_http_server_serves_sqlite_opened_on_another_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr("View.server.EXTERNAL_POLL_SECONDS", 0.05)
+    # As serve() does: the manager is created here, used on the server's thread
+    manager = TaskManager(tmp_path / "tasks.db")
+    manager.add_task("existing")
+    loop = asyncio.new_event_loop()
+    server = TaskServer(manager, port=0)
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.port)
+
+    def request(method, path, body=None, headers=None):
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        request.etag = response.getheader("ETag")
+        return response.status, json.loads(data) if data else None
+
+    try:
+        status, added = request("POST", "/tasks", {'title': "report", 'tags': ["#work"]})
+        assert status == 201
+        assert request("PATCH", f"/tasks/{added['id']}", {'completed': True})[1]['completed'] is True
+        status, page = request("GET", "/tasks?sort=1")
+        assert status == 200 and [t['title'] for t in page['tasks']] == ["existing", "report"]
+        assert request("GET", "/tasks?query=is:done")[1]['total'] == 1
+
+        # A second writer's commit moves the ETag once the server polls
+        etag = request.etag
+        assert request("GET", "/tasks?query=is:done", headers={'If-None-Match': etag})[0] == 304
+        other = TaskManager(tmp_path / "tasks.db")
+        other.update_task(other.add_task("from elsewhere", tags=["#home"]).id, completed=True)
+        other.close()
+        deadline = time.monotonic() + 5
+        while request("GET", "/tasks?query=is:done", headers={'If-None-Match': etag})[0] == 304:
+            assert time.monotonic() < deadline, "ETag never changed"
+            time.sleep(0.05)
+        assert request("GET", "/tasks?query=is:done")[1]['total'] == 2
+    finally:
+        conn.close()
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        manager.close()
+    assert [t.title for t in TaskManager(tmp_path / "tasks.db").get_tasks(filter_completed=True)] == \
+        ["report", "from elsewhere"]
+
+
+def test_taskgen_is_reproducible_and_skewed(tmp_path, monkeypatch):
+    from benchmarks import taskgen
+    tasks = taskgen.generate_tasks(5000, seed=3)
+    assert [t.to_dict() for t in tasks] == [t.to_dict() for t in taskgen.generate_tasks(5000, seed=3)]
+    assert [t.title for t in tasks] != [t.title for t in taskgen.generate_tasks(5000, seed=4)]
+
+    counts = Counter(tag for t in tasks for tag in t.tags)
+    assert [tag for tag, _ in counts.most_common(2)] == ["#work", "#home"] and len(counts) > 100
+    assert 0.7 < sum(t.due_date is not None for t in tasks) / len(tasks) < 0.8
+    assert all((t.completed_at is not None) == t.completed for t in tasks)
+
+    out_file = tmp_path / "generated.db"
+    monkeypatch.setattr(sys, "argv", ["taskgen.py", "100", str(out_file), "--seed", "3"])
+    taskgen.main()
+    assert [t.to_dict() for t in TaskManager(out_file).tasks] == [t.to_dict() for t in tasks[:100]]
+
+
+def test_metrics_are_opt_in_and_exported(tmp_path):
+    metrics.reset()
+    manager = TaskManager(tmp_path / "tasks.json", journal=True)
+    manager.add_task("before enabling")
+    manager._save_tasks()
+    size = (tmp_path / "tasks.json").stat().st_size
+    assert metrics.snapshot()['latency'] == {}
+
+    metrics.enable()
+    try:
+        with metrics.profile(tmp_path / "run.prof"):
+            manager.add_task("report", "2025-06-06")
+            manager.get_tasks()
+            manager.get_tasks(search_query="rep", sort=True)
+        TaskManager(tmp_path / "tasks.json")
+    finally:
+        metrics.disable()
+    metrics.export(tmp_path / "metrics.json")
+
+    with open(tmp_path / "metrics.json", encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['latency']['task_manager.get_tasks']['count'] == 2
+    assert report['latency']['task_manager.sort']['count'] == 1
+    assert report['latency']['task_manager.add_task']['count'] == 1
+    assert report['counters']['journal.write.bytes'] > 0
+    assert report['counters']['json.read.bytes'] == size
+    assert (tmp_path / "run.prof").stat().st_size > 0
+    metrics.reset()
+
+
+def test_query_cache_hits_until_data_changes(tmp_path, monkeypatch):
+    manager = TaskManager(tmp_path / "tasks.json", query_cache_size=2)
+    task = manager.add_task("report", "2025-06-06", Priority.HIGH, ["#work"])
+    manager.add_task("other")
+
+    first = manager.get_tasks(sort=True)
+    assert manager.get_tasks(sort=True) is first
+    assert manager.query_cache.info()[:2] == (1, 1)
+
+    # Every mutation path, a rolled back transaction included, invalidates
+    for mutate in (lambda: manager.update_task(task.id, completed=True),
+                   lambda: manager.add_task("third"), manager.clear_completed):
+        mutate()
+        assert manager.get_tasks(sort=True) is not first
+        first = manager.get_tasks(sort=True)
+    with pytest.raises(RuntimeError):
+        with manager.transaction():
+            manager.add_task("rolled back")
+            assert "rolled back" in [t.title for t in manager.get_tasks(sort=True)]
+            raise RuntimeError
+    assert [t.title for t in manager.get_tasks(sort=True)] == [t.title for t in first]
+
+    # Least recently used entry goes first
+    manager.get_tasks(filter_completed=False)
+    manager.get_tasks(search_query="oth")
+    assert manager.query_cache.info().currsize == 2
+    hits = manager.query_cache.info().hits
+    manager.get_tasks(search_query="oth")
+    assert manager.query_cache.info().hits == hits + 1
+
+    # Results relative to today expire at midnight even if nothing changed
+    class Clock(date):
+        day = date(2025, 6, 6)
+
+        @classmethod
+        def today(cls):
+            return cls.day
+
+    monkeypatch.setattr("Controller.TaskManager.date", Clock)
+    manager.add_task("late", "2025-06-06")
+    assert manager.get_tasks(query="due<today") == []
+    assert manager.get_due('overdue') == []
+    Clock.day = date(2025, 6, 7)
+    assert [t.title for t in manager.get_tasks(query="due<today")] == ["late"]
+    assert [t.title for t in manager.get_due('overdue')] == ["late"]
+
+    # SQLite results also go stale when another connection commits
+    db = TaskManager(tmp_path / "tasks.db")
+    db.add_task("mine")
+    assert len(db.get_tasks()) == 1
+    TaskManager(tmp_path / "tasks.db").add_task("theirs")
+    assert sorted(t.title for t in db.get_tasks()) == ["mine", "theirs"]
+
+
+def test_tag_index_queries_match_linear_scan(tmp_path):
+    managers = [TaskManager(tmp_path / "tasks.json"), TaskManager(tmp_path / "tasks.db")]
+    for manager in managers:
+        for i in range(120):
+            manager.add_task(f"task {i}", f"2025-06-{i % 28 + 1:02d}", list(Priority)[i % 3],
+                             [["#work"], ["#Work", "#home"], ["#project-a", "#home"], ["#project-b"], []][i % 5])
+        for task in manager.get_tasks()[::6]:
+            manager.update_task(task.id, completed=True)
+        manager.clear_completed()
+    manager = managers[0]
+
+    def scan(tags, match_all, prefix, sort=False):
+        test = all if match_all else any
+        has = lambda t, w: any(tag.lower().startswith(w) if prefix else tag.lower() == w for tag in t.tags)
+        return [t.title for t in manager.get_tasks(sort=sort) if test(has(t, w.lower()) for w in tags)]
+
+    for tags, match_all, prefix in [(["#WORK"], True, False), (["#work", "#home"], True, False),
+                                    (["#work", "#home"], False, False), (["#proj"], True, True),
+                                    (["#project-a", "#h"], True, True), (["#none"], False, False)]:
+        for sort in (False, True):
+            expected = scan(tags, match_all, prefix, sort)
+            for m in managers:
+                assert [t.title for t in m.get_tasks_by_tags(tags, match_all, prefix, sort)] == expected
+
+    counts = manager.tag_counts()
+    assert counts == {"#work": 40, "#home": 40, "#project-a": 20, "#project-b": 20}
+    assert list(managers[1].tag_counts().items()) == [(k.lower(), v) for k, v in counts.items()]
+    assert managers[1].get_tasks_by_tags([]) == manager.get_tasks_by_tags([]) == []
+    # Tasks parsed from JSON share one string per distinct tag
+    reloaded = TaskManager(tmp_path / "tasks.json")
+    assert len({id(tag) for t in reloaded.tasks for tag in t.tags if tag == "#home"}) == 1
+    manager.delete_where(lambda t: "#project-b" in t.tags)
+    assert "#project-b" not in manager.tag_counts()
+
+
+def test_due_index_ranges_and_scheduler_wakes_at_boundaries(tmp_path):
+    managers = [TaskManager(tmp_path / "tasks.json"), TaskManager(tmp_path / "tasks.db")]
+    for manager in managers:
+        for i in range(60):
+            manager.add_task(f"task {i}", f"2025-06-{i % 20 + 1:02d}" if i % 7 else None, list(Priority)[i % 3])
+        for task in manager.get_tasks()[::5]:
+            manager.update_task(task.id, completed=True)
+    manager = managers[0]
+    assert all(t.due_ordinal == (t.due_date.toordinal() if t.due_date else NO_DUE_DATE) for t in manager.tasks)
+
+    def scan(low, high, sort):
+        return [t.title for t in manager.get_tasks(sort=sort) if t.due_date
+                and (low is None or low <= t.due_date.strftime("%Y-%m-%d"))
+                and (high is None or t.due_date.strftime("%Y-%m-%d") <= high)]
+
+    for low, high in [("2025-06-05", "2025-06-09"), (None, "2025-06-03"), ("2025-06-18", None), ("2025-07-01", None)]:
+        for sort in (False, True):
+            manager.query_cache.clear()
+            expected = scan(low, high, sort)
+            for m in managers:
+                assert [t.title for t in m.get_tasks(sort=sort, due_from=low, due_to=high)] == expected
+
+    today = date(2025, 6, 12)  # a Thursday
+    for m in managers:
+        assert all(t.due_date.date() < today and not t.completed for t in m.get_due('overdue', today))
+        assert {t.due_date.day for t in m.get_due('today', today)} == {12}
+        assert {t.due_date.day for t in m.get_due('week', today)} == {12, 13, 14, 15}
+
+    now = [datetime(2025, 6, 12, 15, 0)]
+    armed, changes = [], []
+    scheduler = DueScheduler(manager, lambda due, overdue: changes.append((due, overdue)),
+                             after=lambda seconds, callback: armed.append((seconds, callback)),
+                             cancel=lambda handle: None, clock=lambda: now[0])
+    scheduler.start()
+    # Something is due today, so the next change is when it turns overdue at midnight
+    assert scheduler.next_boundary() == datetime(2025, 6, 13)
+    assert armed[-1][0] == 3600
+    now[0] = datetime(2025, 6, 13, 0, 0, 1)
+    armed[-1][1]()
+    due, overdue = changes[-1]
+    assert {t.due_date.day for t in due} == {13}
+    assert {t.due_date.day for t in overdue} == {12}
+    assert not any(t.completed for t in due + overdue)
+
+    # Nothing left in the future: the scheduler stops waking up
+    manager.delete_where(lambda t: t.due_date is not None and t.due_date.day >= 13)
+    scheduler.reschedule()
+    assert scheduler.next_boundary() is None
+    calls = len(armed)
+    scheduler.reschedule()
+    assert len(armed) == calls
+
+
+def test_completed_tasks_archive_into_monthly_segments(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    manager = TaskManager(data_file, journal=True)
+    old = [manager.add_task(f"old {i}", tags=["#work"] if i % 2 else []) for i in range(4)]
+    recent = manager.add_task("recent report")
+    manager.add_task("open")
+    for task in old + [recent]:
+        manager.update_task(task.id, completed=True)
+    assert recent.completed_at.date() == date.today()
+    # Completion dates survive reloads and reopening clears them
+    for i, task in enumerate(old):
+        task.completed_at = datetime(2025, 5 + i % 2, 10)
+        manager.update_task(task.id, completed=True)
+    manager.update_task(old[0].id, completed=False)
+    assert old[0].completed_at is None
+    manager.update_task(old[0].id, completed=True)
+    old[0].completed_at = None  # completed before dates were recorded: age unknown
+    manager.update_task(old[0].id, title="old 0")
+    assert TaskManager(data_file, journal=True).get_task(old[1].id).completed_at == datetime(2025, 6, 10)
+
+    # The archive policy leaves tasks of unknown age alone
+    assert [t.title for t in TaskManager(data_file, journal=True, archive_after=30).tasks] == \
+        ["old 0", "recent report", "open"]
+    manager.check_external_changes()
+    assert manager.archive_completed(older_than=30) == 0
+    assert not (tmp_path / "tasks.archive" / f"{date.today():%Y-%m}.jsonl").exists()
+    assert sorted(p.name for p in (tmp_path / "tasks.archive").iterdir()) == ["2025-05.jsonl", "2025-06.jsonl"]
+    # A torn tail from a crash mid-append does not hide later records
+    with open(tmp_path / "tasks.archive" / "2025-06.jsonl", "a") as f:
+        f.write('{"id": "torn')
+    manager.archive.append([old[1]])  # archived twice, reported once
+    manager.archive_completed(older_than=0)
+
+    reloaded = TaskManager(data_file, journal=True)
+    assert [t.title for t in reloaded.tasks] == ["open"]
+    archived = reloaded.iter_archived()
+    assert next(archived).title == "old 2"  # streamed, oldest month first
+    assert sorted(t.title for t in reloaded.iter_archived()) == ["old 0", "old 1", "old 2", "old 3", "recent report"]
+    assert [t.title for t in reloaded.iter_archived(completed_from="2025-06-01", completed_to="2025-06-30")] == ["old 1", "old 3"]
+    assert [t.title for t in reloaded.iter_archived(tag_filter="work")] == ["old 1", "old 3"]
+    assert [t.title for t in reloaded.iter_archived(search_query="REPORT")] == ["recent report"]
+
+    # With archive_after, loading applies the policy once a day
+    late = reloaded.add_task("late")
+    reloaded.update_task(late.id, completed=True)
+    assert [t.title for t in TaskManager(data_file, journal=True, archive_after=0).tasks] == ["open"]
+
+
+def test_structured_query_is_planned_on_the_most_selective_index(tmp_path):
+    managers = [TaskManager(tmp_path / "tasks.json"), TaskManager(tmp_path / "tasks.db"),
+                TaskManager(tmp_path / "columns.json", columnar=True)]
+    for manager in managers:
+        for i in range(150):
+            manager.add_task(f"{['weekly report', 'call bank', 'fix bike'][i % 3]} {i}",
+                             f"2025-06-{i % 30 + 1:02d}" if i % 4 else None, list(Priority)[i % 3],
+                             [["#work"], ["#home"], ["#project-a", "#work"], []][i % 4])
+        for task in manager.get_tasks()[::4]:
+            manager.update_task(task.id, completed=True)
+    manager = managers[0]
+
+    def expected(predicate, sort=False):
+        return [t.title for t in manager.get_tasks(sort=sort) if predicate(t)]
+
+    day = lambda t: t.due_date.day if t.due_date else None
+    cases = {
+        'tag:#work priority:HIGH due<2025-06-20 -done "report"':
+            lambda t: "#work" in t.tags and t.priority is Priority.HIGH and t.due_date and day(t) < 20
+            and not t.completed and "report" in t.title,
+        '#WORK -#project-a': lambda t: t.tags == ["#work"],
+        'tag:#proj* is:open': lambda t: "#project-a" in t.tags and not t.completed,
+        'p>=medium due:none': lambda t: t.priority is not Priority.LOW and t.due_date is None,
+        'due>=2025-06-10 due<=2025-06-12 OR bike done':
+            lambda t: t.due_date and 10 <= day(t) <= 12 or "bike" in t.title and t.completed,
+        '"call bank" -"bank 4"': lambda t: "call bank" in t.title and "bank 4" not in t.title,
+        # An open-ended range still excludes undated tasks when merged with due:none
+        'due:none due>=2025-06-10': lambda t: False,
+        'due<=2025-06-03 due:none bike': lambda t: False,
+        'due>=2025-06-28 due>=2025-06-25': lambda t: t.due_date and day(t) >= 28,
+        're -done': lambda t: "report" in t.title and not t.completed,
+        '-due:none -#work p<high': lambda t: t.due_date and "#work" not in t.tags and t.priority is not Priority.HIGH,
+        'is:overdue bike OR tag:#HOM*': lambda t: not t.completed and t.due_date and "bike" in t.title
+        or "#home" in t.tags,
+        '': lambda t: True,
+    }
+    for query, predicate in cases.items():
+        for sort in (False, True):
+            for m in managers:
+                assert [t.title for t in m.get_tasks(query=query, sort=sort)] == expected(predicate, sort), query
+    # Plain get_tasks filters are planned together with the query
+    assert [t.title for t in manager.get_tasks(query="report", filter_completed=False, tag_filter="proj")] == \
+        expected(lambda t: "report" in t.title and not t.completed and "#project-a" in t.tags)
+
+    # Seeded from the smallest index set, the rest checked on the survivors
+    plan = manager.explain_query('tag:#project-a due>=2025-06-01 priority:HIGH -done')
+    assert plan.startswith("index tag:#project-a ~37") and "check" in plan
+    assert manager.explain_query("done").startswith("scan 150")
+    # Too short for trigrams, so the text index could only hand back everything
+    assert manager.explain_query("re").startswith("scan 150")
+    assert manager.explain_query("bank OR #home").count("index") == 2
+    assert "due:(nothing) ~0" in manager.explain_query("due:none due>=2025-06-10 #work")
+    # SQLite is handed every term but the text, instead of returning every row
+    assert managers[1].explain_query('#work "report" OR -done').startswith(
+        "storage query where ((EXISTS (SELECT 1 FROM task_tags")
+    assert "of every row" in managers[1].explain_query('#work OR "report"')
+    with pytest.raises(ValueError):
+        manager.get_tasks(query="priority:urgent")
@@ -1,5 +1,7 @@
+import uuid
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 
 
 class Priority(Enum):
@@ -7,42 +9,133 @@ class Priority(Enum):
     MEDIUM = 2
     HIGH = 3
 
+@lru_cache(maxsize=8192)
+def parse_date(date_str: str) -> datetime:
+    """strptime for YYYY-MM-DD, cached: task lists repeat the same dates a lot"""
+    return datetime.strptime(date_str, '%Y-%m-%d')
+
+# Sort-key ordinal for tasks without a due date, so they sort last
+NO_DUE_DATE = datetime.max.toordinal() + 1
+# Sort-key rank per priority, HIGH first; a dict avoids enum .value lookups
+PRIORITY_RANK = {priority: Priority.HIGH.value - priority.value for priority in Priority}
+# Low bits of a sort key holding the priority rank, below the due ordinal
+_RANK_BITS = 2
+
+
+def due_sort_key(ordinal: int) -> int:
+    """Smallest sort key of a task due on date `ordinal`, for range bounds"""
+    return ordinal << _RANK_BITS
+
+
 class Task:
-    def __init__(self, title: str, due_date: str = None, priority: Priority = Priority.MEDIUM, tags: list[str] = None):
+    # No per-instance __dict__: large task lists are dominated by object overhead
+    __slots__ = ('id', 'title', '_due_date', '_priority', 'completed', 'completed_at', 'tags', 'sort_key')
+
+    def __init__(self, title: str, due_date: str = None, priority: Priority = Priority.MEDIUM, tags: list[str] = None,
+                 task_id: str = None):
+        # Stable identity, persisted with the task so views can address it
+        # independently of list position
+        self.id = task_id or uuid.uuid4().hex
         self.title = title
+        self._priority = priority if isinstance(priority, Priority) else Priority(priority)
         self.due_date = self.validate_date(due_date) if due_date else None
-        self.priority = priority if isinstance(priority, Priority) else Priority(priority)
         self.completed = False 
+        # Day the task was completed; None while open or if never recorded
+        self.completed_at = None
         self.tags = tags or []
 
 
+    @property
+    def due_date(self) -> datetime:
+        return self._due_date
+
+    @due_date.setter
+    def due_date(self, value: datetime):
+        self._due_date = value
+        self._update_sort_key()
+
+    @property
+    def priority(self) -> Priority:
+        return self._priority
+
+    @priority.setter
+    def priority(self, value: Priority):
+        self._priority = value
+        self._update_sort_key()
+
+    def _update_sort_key(self):
+        """Precompute the key __lt__ orders by: date ordinal, then priority.
+
+        Packed into one int (ordinal above a 2-bit priority rank, HIGH = 0) so that
+        sorting with key=sort_key is a C-level int comparison instead of a
+        Python comparator call.
+        """
+        ordinal = self._due_date.toordinal() if self._due_date else NO_DUE_DATE
+        self.sort_key = ordinal << _RANK_BITS | PRIORITY_RANK[self._priority]
+
+    @property
+    def due_ordinal(self) -> int:
+        """Due date as a date ordinal; NO_DUE_DATE, after every date, if there is none"""
+        return self.sort_key >> _RANK_BITS
+
     def validate_date(self, date_str : str):
         try:
-            return datetime.strptime(date_str, '%Y-%m-%d')
+            return parse_date(date_str)
         except ValueError:
             raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
     def mark_completed(self):
+        if not self.completed:
+            self.completed_at = parse_date(datetime.now().strftime('%Y-%m-%d'))
         self.completed = True
+    def to_dict(self) -> dict:
+        """Serialize the task to the tasks.json record schema"""
+        data = {
+            'id': self.id,
+            'title': self.title,
+            'due_date': self.due_date.strftime("%Y-%m-%d") if self.due_date else None,
+            'priority': self.priority.name,
+            'completed': self.completed,
+            'tags': self.tags
+        }
+        # Only written once known, so records of open tasks stay as they were
+        if self.completed_at:
+            data['completed_at'] = self.completed_at.strftime("%Y-%m-%d")
+        return data
+
+    @classmethod
+    def from_fields(cls, task_id: str, title: str, due_date: datetime, priority: Priority, completed: bool,
+                    tags: list[str], completed_at: datetime = None) -> "Task":
+        """Build a task from already-decoded values, skipping date parsing"""
+        task = cls.__new__(cls)
+        task.id = task_id
+        task.title = title
+        task._priority = priority
+        task.due_date = due_date
+        task.completed = completed
+        task.completed_at = completed_at
+        task.tags = tags
+        return task
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Task":
+        """Build a task from a tasks.json record, raises KeyError/ValueError on bad data"""
+        task = cls(
+            title=data.get('title', ''),
+            due_date=data.get('due_date'),
+            priority=Priority[data.get('priority', 'MEDIUM')],
+            tags=data.get('tags', []),
+            task_id=data.get('id'),
+        )
+        if data.get('completed', False):
+            task.completed = True
+            completed_at = data.get('completed_at')
+            task.completed_at = task.validate_date(completed_at) if completed_at else None
+        return task
+
     def __repr__(self):
         return f"Task('{self.title}', priority={self.priority.name}, due={self.due_date}, done={self.completed}, tags={self.tags})"
 
     # New: Enable sorting by priority
     def __lt__(self, other):
-        #Sort by due date (earliest first), then by priority (high first)#
-        # Handle None cases first
-        if self.due_date is None and other.due_date is None:
-            return self.priority.value > other.priority.value  # Higher priority first
-        elif self.due_date is None:
-            return False  # Tasks without dates go last
-        elif other.due_date is None:
-            return True  # Tasks with dates come first
-        
-        # Both have dates - compare dates first
-        if self.due_date != other.due_date:
-            return self.due_date < other.due_date  # Earlier dates first
-        
-        # Only compare priorities if dates are equal
-        return self.priority.value > other.priority.value  # Higher priority first
-
-    
-    
+        # Sort by due date (earliest first, undated last), then by priority (high first)
+        return self.sort_key < other.sort_key
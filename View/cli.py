@@ -0,0 +1,300 @@
+"""Headless command-line interface; imports nothing from the GUI.
+
+    python main.py add "Write report" --due 2025-07-01 --priority HIGH --tags "#work"
+    python main.py list --pending --sort --limit 20
+    python main.py search report
+    python main.py complete 3f2a
+    python main.py delete 3f2a
+    python main.py import more_tasks.json
+    python main.py export backup.bin
+    python main.py archive --older-than 30
+    python main.py archived --from 2025-01-01 --search report
+    python main.py serve --port 8765
+    python main.py --metrics - --profile list.prof list --sort
+
+Tasks are addressed by id or any unique id prefix. For JSON task files,
+reads stream from a binary snapshot cache and single-task edits are
+appended to the journal, so start-up does not grow with the task count.
+"""
+
+import argparse
+import json
+import sys
+from itertools import islice
+from operator import attrgetter
+from pathlib import Path
+from Model.Task import Task, Priority
+from Controller.StorageBackend import SQLITE_SUFFIXES, BINARY_SUFFIXES, open_storage
+from Controller.SnapshotCache import SnapshotCache
+from Controller.TextIndex import task_matches
+from Controller.Metrics import metrics
+
+
+def _open_manager(data_file: Path):
+    # Only imported for commands that need the full task list
+    from Controller.TaskManager import TaskManager
+    return TaskManager(data_file, journal=True)
+
+
+def _cache(data_file: Path) -> SnapshotCache:
+    """Snapshot cache for JSON task files; other backends are fast to open already"""
+    if data_file.suffix in SQLITE_SUFFIXES + BINARY_SUFFIXES:
+        return None
+    return SnapshotCache(data_file)
+
+
+def _iter_tasks(data_file: Path):
+    """Current tasks in storage order, from the cache when it is fresh"""
+    cache = _cache(data_file)
+    if cache is not None:
+        tasks = cache.iter_tasks()
+        if tasks is not None:
+            return tasks
+    manager = _open_manager(data_file)
+    tasks = manager.tasks
+    if cache is not None:
+        cache.rebuild(tasks)
+    manager.close()
+    return iter(tasks)
+
+
+def _resolve(data_file: Path, prefix: str) -> Task:
+    """The task whose id starts with `prefix`; raises ValueError unless exactly one does"""
+    matches = list(islice((t for t in _iter_tasks(data_file) if t.id.startswith(prefix)), 2))
+    if not matches:
+        raise ValueError(f"No task with id {prefix}")
+    if len(matches) > 1:
+        raise ValueError(f"Task id {prefix} is ambiguous")
+    return matches[0]
+
+
+def _commit(data_file: Path, record: dict, apply):
+    """Journal `record` directly if possible, else run `apply` on a TaskManager.
+
+    Returns what `apply` returned, or None if the record was journaled.
+    """
+    cache = _cache(data_file)
+    if cache is not None and cache.append(record):
+        return None
+    manager = _open_manager(data_file)
+    try:
+        return apply(manager)
+    finally:
+        manager.close()
+
+
+def _format(task: Task) -> str:
+    status = "x" if task.completed else " "
+    due_date = task.due_date.strftime("%Y-%m-%d") if task.due_date else "-"
+    tags = ", ".join(task.tags)
+    return f"{task.id[:8]}  [{status}] {task.title}  {due_date}  {task.priority.name}  {tags}".rstrip()
+
+
+def _print_tasks(tasks, limit: int):
+    for task in islice(tasks, limit):
+        print(_format(task))
+
+
+def cmd_add(args) -> int:
+    if not args.title.strip():
+        raise ValueError("Task title cannot be empty")
+    try:
+        priority = Priority[args.priority.upper()]
+    except KeyError:
+        raise ValueError("Invalid priority value")
+    tags = [tag.strip() for tag in args.tags.split(',') if tag.strip()] if args.tags else []
+    task = Task(args.title, args.due, priority, tags)
+    added = _commit(args.file, {'op': 'add', 'task': task.to_dict()},
+                    lambda manager: manager.add_task(args.title, args.due, priority, tags))
+    print((added or task).id)
+    return 0
+
+
+def cmd_list(args) -> int:
+    tasks = _iter_tasks(args.file)
+    if args.done or args.pending:
+        tasks = (t for t in tasks if t.completed == args.done)
+    if args.sort:
+        # Stable sort on the precomputed key, same order as get_tasks(sort=True)
+        tasks = sorted(tasks, key=attrgetter('sort_key'))
+    _print_tasks(tasks, args.limit)
+    return 0
+
+
+def cmd_search(args) -> int:
+    # Same fields and matching as the GUI search box
+    query = args.query.lower()
+    fields = ('title', 'priority', 'due', 'tags')
+    _print_tasks((t for t in _iter_tasks(args.file) if task_matches(t, query, fields)), args.limit)
+    return 0
+
+
+def cmd_complete(args) -> int:
+    task_id = _resolve(args.file, args.id).id
+    # Re-read under the lock: the resolved copy may predate another process's edit
+    cache = _cache(args.file)
+    task = cache.update(task_id, Task.mark_completed) if cache is not None else None
+    if task is None:
+        manager = _open_manager(args.file)
+        try:
+            if not manager.update_task(task_id, completed=True):
+                raise ValueError(f"No task with id {args.id}")
+            task = manager.get_task(task_id)
+        finally:
+            manager.close()
+    print(_format(task))
+    return 0
+
+
+def cmd_delete(args) -> int:
+    task = _resolve(args.file, args.id)
+    _commit(args.file, {'op': 'delete', 'id': task.id}, lambda manager: manager.delete_task(task.id))
+    print(f"Deleted {task.id[:8]}  {task.title}")
+    return 0
+
+
+def cmd_import(args) -> int:
+    """Append tasks from a JSON array (ids optional), .bin or .db file"""
+    if args.source.suffix in SQLITE_SUFFIXES + BINARY_SUFFIXES:
+        source = open_storage(args.source)
+        imported = source.load()
+        source.close()
+    else:
+        # Parsed here rather than through JsonStorage, which would write
+        # generated ids back into the source file
+        with open(args.source, 'r', encoding='utf-8') as f:
+            imported = [Task.from_dict(data) for data in json.load(f)]
+
+    manager = _open_manager(args.file)
+    try:
+        # Tasks whose id already exists replace the stored task
+        manager.import_tasks(imported)
+    finally:
+        manager.close()
+    print(f"Imported {len(imported)} tasks")
+    return 0
+
+
+def cmd_export(args) -> int:
+    """Write every task to a .json, .bin or .db file, picked by suffix"""
+    tasks = list(_iter_tasks(args.file))
+    target = open_storage(args.target)
+    target.save(tasks)
+    target.close()
+    print(f"Exported {len(tasks)} tasks to {args.target}")
+    return 0
+
+
+def cmd_archive(args) -> int:
+    """Move completed tasks out of the task file into the monthly archive"""
+    if args.older_than < 0:
+        raise ValueError("--older-than cannot be negative")
+    manager = _open_manager(args.file)
+    try:
+        moved = manager.archive_completed(args.older_than)
+    finally:
+        manager.close()
+    print(f"Archived {moved} tasks")
+    return 0
+
+
+def cmd_archived(args) -> int:
+    # Read straight from the archive segments; the hot task file is not opened
+    from Controller.TaskArchive import TaskArchive
+    archive = TaskArchive(args.file.with_suffix('.archive'))
+    _print_tasks(archive.iter_tasks(args.completed_from, args.completed_to, args.search, args.tag), args.limit)
+    return 0
+
+
+def cmd_serve(args) -> int:
+    """Serve the task file over HTTP/JSON until interrupted"""
+    # Imported here so the other commands do not load asyncio
+    from View.server import serve
+    serve(args.file, args.host, args.port)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="todo", description="Manage the task list without the GUI")
+    parser.add_argument("--file", type=Path, default=Path("tasks.json"),
+                        help="task file (.json, .bin or .db), default tasks.json")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="collect timings and counters, write them to FILE as JSON ('-' prints to stderr)")
+    parser.add_argument("--profile", metavar="FILE", help="run the command under cProfile and dump the stats to FILE")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a task and print its id")
+    add.add_argument("title")
+    add.add_argument("--due", help="due date, YYYY-MM-DD")
+    add.add_argument("--priority", default="MEDIUM", help="LOW, MEDIUM or HIGH")
+    add.add_argument("--tags", help="comma-separated tags")
+    add.set_defaults(func=cmd_add)
+
+    list_ = commands.add_parser("list", help="list tasks")
+    state = list_.add_mutually_exclusive_group()
+    state.add_argument("--done", action="store_true", help="only completed tasks")
+    state.add_argument("--pending", action="store_true", help="only open tasks")
+    list_.add_argument("--sort", action="store_true", help="order by due date, then priority")
+    list_.add_argument("--limit", type=int, help="print at most this many tasks")
+    list_.set_defaults(func=cmd_list)
+
+    search = commands.add_parser("search", help="tasks whose title, priority, date or tags contain QUERY")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, help="print at most this many tasks")
+    search.set_defaults(func=cmd_search)
+
+    complete = commands.add_parser("complete", help="mark a task complete")
+    complete.add_argument("id", help="task id or unique prefix")
+    complete.set_defaults(func=cmd_complete)
+
+    delete = commands.add_parser("delete", help="delete a task")
+    delete.add_argument("id", help="task id or unique prefix")
+    delete.set_defaults(func=cmd_delete)
+
+    import_ = commands.add_parser("import", help="add tasks from a .json, .bin or .db file")
+    import_.add_argument("source", type=Path)
+    import_.set_defaults(func=cmd_import)
+
+    export = commands.add_parser("export", help="write all tasks to a .json, .bin or .db file")
+    export.add_argument("target", type=Path)
+    export.set_defaults(func=cmd_export)
+
+    archive = commands.add_parser("archive", help="move completed tasks to the archive")
+    archive.add_argument("--older-than", type=int, default=0, metavar="DAYS",
+                         help="only tasks completed at least DAYS ago, default 0")
+    archive.set_defaults(func=cmd_archive)
+
+    archived = commands.add_parser("archived", help="list archived tasks, oldest first")
+    archived.add_argument("--from", dest="completed_from", help="completed on or after, YYYY-MM-DD")
+    archived.add_argument("--to", dest="completed_to", help="completed on or before, YYYY-MM-DD")
+    archived.add_argument("--search", help="text in title, priority, date or tags")
+    archived.add_argument("--tag", help="text in a tag")
+    archived.add_argument("--limit", type=int, help="print at most this many tasks")
+    archived.set_defaults(func=cmd_archived)
+
+    serve = commands.add_parser("serve", help="serve the task file over HTTP/JSON on localhost")
+    serve.add_argument("--host", default="127.0.0.1", help="address to bind, default 127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on, default 8765")
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    try:
+        if args.profile:
+            with metrics.profile(args.profile):
+                return args.func(args)
+        return args.func(args)
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.metrics:
+            metrics.export(None if args.metrics == '-' else args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
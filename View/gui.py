@@ -1,24 +1,117 @@
 
 
+import time
 import tkinter as tk
+from itertools import islice
 from tkinter import ttk, messagebox
-from Model.Task import Task, Priority
+from Model.Task import Priority
 from Controller.TaskManager import TaskManager
-from datetime import datetime
+from Controller.SearchWorker import SearchWorker
+from Controller.DueScheduler import DueScheduler
+from Controller.Metrics import metrics
+from datetime import date, datetime
 from tkcalendar import Calendar, DateEntry
 
+# Above this many rows only the rows in view are materialized in the Treeview
+VIRTUAL_THRESHOLD = 2000
+# Default ttk Treeview row height in pixels
+ROW_HEIGHT = 20
+# Quiet period after the last keystroke before a search starts, and how
+# often to check the search worker for its result
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_POLL_MS = 15
+# How often to look for changes other processes made to the task files
+EXTERNAL_POLL_MS = 1000
+# Where F12 writes the cProfile capture it toggles
+PROFILE_FILE = "todo.prof"
+# Most task titles listed in one reminder dialog
+REMINDER_TITLES = 10
+# "Archive Completed" moves tasks completed at least this many days ago
+ARCHIVE_AFTER_DAYS = 30
+# Most archived tasks listed at once in the archive window
+ARCHIVE_VIEW_LIMIT = 1000
+
 
 class TodoApp:
-    def __init__(self, root):
+    def __init__(self, root, archive_after: int = None):
         self.root = root
         self.root.title("Todo List App")
         self.root.geometry("700x500")
 
-        # Initialize controller
-        self.task_manager = TaskManager()
+        # Initialize controller; journaled so each edit appends one record,
+        # loaded in batches so the window paints before tasks.json is fully
+        # parsed, and written from a background thread so disk I/O never
+        # blocks the Tk loop. Completed tasks are only archived automatically
+        # when the caller opts in with `archive_after` (days).
+        self.task_manager = TaskManager(journal=True, lazy_load=True, background=True,
+                                        archive_after=archive_after)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # Searches run off the Tk thread; results are picked up by polling
+        self.search_worker = SearchWorker(self.task_manager)
+        self._search_after = None
+        self._search_polling = False
+        # When the last keystroke arrived, for the keystroke-to-result latency
+        self._typed_at = None
+
+        # Last render, used to touch only the rows that changed
+        self._rendered = {}  # iid -> (values, tags)
+        self._order = []     # iids in display order
+        # Full list being shown and, in virtual mode, the first row in view
+        self._view_tasks = []
+        self._virtual = False
+        self._offset = 0
+        # Tag picked in the sidebar (None shows every task), the tags listed
+        # there and the task manager version they were counted at
+        self._tag_filter = None
+        self._tag_names = [None]
+        self._tags_version = None
+
+        # Wakes at the midnights that make tasks due or overdue; started
+        # once loading finishes, re-armed on every refresh
+        self.due_scheduler = DueScheduler(
+            self.task_manager, self._on_due_change,
+            after=lambda seconds, callback: self.root.after(int(seconds * 1000), callback),
+            cancel=self.root.after_cancel)
 
         self._setup_ui()
-        self._refresh_task_list()
+        self._load_next_batch(first=True)
+        self.root.after(EXTERNAL_POLL_MS, self._poll_external_changes)
+
+    def _on_close(self):
+        """Write out pending edits before the window goes away"""
+        self.search_worker.close()
+        self.due_scheduler.stop()
+        self.task_manager.close()
+        self.root.destroy()
+
+    def _load_next_batch(self, first=False):
+        """Parse one more batch of tasks between Tk events"""
+        more = self.task_manager.load_step()
+        if first or not more:
+            self._refresh_task_list()
+        if more:
+            self.root.after(1, self._load_next_batch)
+        else:
+            self.due_scheduler.start()
+            self.root.after_idle(self._warm_search_index)
+
+    def _poll_external_changes(self):
+        """Merge edits made by other processes (e.g. the CLI) into the view"""
+        changed = self.task_manager.check_external_changes()
+        # An opted-in archive policy runs once a day, so a long session stays lean too
+        if changed or self.task_manager.auto_archive():
+            # Only the affected rows change in the Treeview
+            if self.search_var.get():
+                self._start_search()
+            else:
+                self._refresh_task_list()
+        self.root.after(EXTERNAL_POLL_MS, self._poll_external_changes)
+
+    def _warm_search_index(self):
+        """Build the search index in small idle-time steps after loading"""
+        if self.task_manager.warm_indexes():
+            self.root.after(1, self._warm_search_index)
 
     def _setup_ui(self):
         """Build the GUI components"""
@@ -93,9 +186,20 @@ class TodoApp:
             command=self._add_task
         ).pack(side="left", padx=5)
 
-        # Task list treeview
+        # Task list treeview with its scrollbar
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill="both", expand=True, pady=5)
+
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Tag sidebar: every tag with its task count; picking one filters the list
+        self.tag_list = tk.Listbox(tree_frame, width=18, exportselection=False)
+        self.tag_list.pack(side="left", fill="y", padx=(0, 5))
+        self.tag_list.bind("<<ListboxSelect>>", self._on_tag_select)
+
         self.tree = ttk.Treeview(
-            main_frame,
+            tree_frame,
             columns=("Title", "Priority", "Due Date", "Status","Tags"),
             show="headings",
             selectmode="browse"
@@ -114,8 +218,18 @@ class TodoApp:
         self.tree.column("Status", width=60, anchor="center")
         self.tree.column("Tags", width=100, anchor="center")
         
-        self.tree.pack(fill="both", expand=True, pady=5)
+        # Configure tag colors for priorities
+        self.tree.tag_configure("HIGH", background="#ffdddd")
+        self.tree.tag_configure("MEDIUM", background="#ffffdd")
+        self.tree.tag_configure("LOW", background="#ddffdd")
+
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll)
+        self.tree.pack(side="left", fill="both", expand=True)
         self.tree.bind("<Double-1>", self._on_double_click)  # Enable editing
+        self.tree.bind("<Configure>", self._on_tree_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_mousewheel)
+        self.root.bind("<F12>", self._toggle_profile)
 
         # Action buttons frame
         button_frame = ttk.Frame(main_frame)
@@ -138,6 +252,18 @@ class TodoApp:
             text="Uncheck", 
             command=self._uncheck_task
         ).pack(side="left", padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="View Archive",
+            command=self._show_archive
+        ).pack(side="right", padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="Archive Completed",
+            command=self._archive_completed
+        ).pack(side="right", padx=5)
     
     def _show_calendar(self):
         """Show standalone calendar for date selection"""
@@ -185,48 +311,219 @@ class TodoApp:
             command=lambda: [self.due_date_entry.set_date(""), top.destroy()]
         ).pack(side="left", padx=5)
 
+    def _toggle_profile(self, event=None):
+        """F12: start a cProfile capture, or stop it and write PROFILE_FILE"""
+        if metrics.profiling:
+            print(metrics.stop_profile(PROFILE_FILE))
+            print(f"Profile written to {PROFILE_FILE}")
+        else:
+            metrics.start_profile()
+            print("Profiling; press F12 again to stop")
+
+    @metrics.timed('gui.refresh_task_list')
     def _refresh_task_list(self, tasks=None):
         """Update the Treeview with current tasks"""
-        self.tree.delete(*self.tree.get_children())
-        tasks = tasks or self.task_manager.get_tasks(sort=True)
-        today = datetime.now().date()
-
-        for task in tasks:
-            status = "✓" if task.completed else ""
-            due_date = task.due_date.strftime("%Y-%m-%d") if task.due_date else ""
-            tags_text = ", ".join(task.tags) if task.tags else ""
-
-            is_overdue = (task.due_date and task.due_date.date() < today 
-                        and not task.completed)
-            
-            self.tree.insert(
-                "", "end",
-                values=(task.title, task.priority.name, due_date, status, tags_text),
-                tags=("overdue" if is_overdue else task.priority.name,)
-            )
+        if tasks is None:
+            if self._tag_filter is not None:
+                tasks = self.task_manager.get_tasks_by_tags([self._tag_filter], sort=True)
+            else:
+                tasks = self.task_manager.get_tasks(sort=True)
+        self._refresh_tag_list()
+        self.due_scheduler.reschedule()
+        self._view_tasks = tasks
+        self._virtual = len(tasks) > VIRTUAL_THRESHOLD
+        if not self._virtual:
+            self._offset = 0
+        self._render_rows()
+
+    def _on_due_change(self, due, overdue):
+        """A day boundary passed: recolour the rows in view and remind about the tasks"""
+        self._render_rows()
+        lines = []
+        for heading, tasks in (("Due today", due), ("Now overdue", overdue)):
+            if tasks:
+                titles = [f"  {task.title}" for task in tasks[:REMINDER_TITLES]]
+                if len(tasks) > REMINDER_TITLES:
+                    titles.append(f"  ... and {len(tasks) - REMINDER_TITLES} more")
+                lines += [f"{heading}:"] + titles
+        self.root.bell()
+        messagebox.showinfo("Reminder", "\n".join(lines))
+
+    def _refresh_tag_list(self):
+        """Re-fill the tag sidebar if any task changed since it was filled"""
+        version = self.task_manager.version
+        if version == self._tags_version:
+            return
+        self._tags_version = version
+        counts = self.task_manager.tag_counts()
+        if self._tag_filter is not None and self._tag_filter.lower() not in map(str.lower, counts):
+            # Its last task went away
+            self._tag_filter = None
+        self._tag_names = [None] + list(counts)
+        self.tag_list.delete(0, "end")
+        self.tag_list.insert("end", "All tasks", *(f"{tag} ({count})" for tag, count in counts.items()))
+        self.tag_list.selection_set(self._tag_names.index(self._tag_filter))
+
+    def _on_tag_select(self, event=None):
+        """Show only the tasks carrying the tag picked in the sidebar"""
+        selection = self.tag_list.curselection()
+        if not selection:
+            return
+        self._tag_filter = self._tag_names[selection[0]]
+        if self.search_var.get().strip():
+            # Narrow (or widen) the current search rather than replace it
+            self._start_search()
+        else:
+            self._refresh_task_list()
 
-        # Configure tag colors for priorities
-        self.tree.tag_configure("HIGH", background="#ffdddd")
-        self.tree.tag_configure("MEDIUM", background="#ffffdd")
-        self.tree.tag_configure("LOW", background="#ddffdd")
+    @staticmethod
+    def _row_for(task, today):
+        """Values and tags for a task's Treeview row"""
+        status = "✓" if task.completed else ""
+        due_date = task.due_date.strftime("%Y-%m-%d") if task.due_date else ""
+        tags_text = ", ".join(task.tags) if task.tags else ""
+
+        # Undated tasks have an ordinal after every date
+        is_overdue = task.due_ordinal < today and not task.completed
 
+        values = (task.title, task.priority.name, due_date, status, tags_text)
+        return values, ("overdue" if is_overdue else task.priority.name,)
+
+    def _visible_rows(self):
+        """How many rows fit in the Treeview at its current size"""
+        return max(10, self.tree.winfo_height() // ROW_HEIGHT + 1)
+
+    def _render_rows(self):
+        """Show all rows, or in virtual mode just the window in view"""
+        tasks = self._view_tasks
+        if not self._virtual:
+            self._reconcile(tasks)
+            return
+
+        visible = self._visible_rows()
+        self._offset = max(0, min(self._offset, len(tasks) - visible))
+        window = tasks[self._offset:self._offset + visible]
+        self._reconcile(window)
+        total = len(tasks)
+        self.scrollbar.set(self._offset / total, (self._offset + len(window)) / total)
+
+    @metrics.timed('gui.reconcile')
+    def _reconcile(self, tasks):
+        """Bring the Treeview in line with `tasks`, touching only changed rows.
+
+        Rows are matched to tasks by id against the last render: vanished
+        rows are deleted, new ones inserted, changed ones updated in place,
+        and the order is fixed with a single set_children call if needed.
+        """
+        today = date.today().toordinal()
+        rows = {task.id: self._row_for(task, today) for task in tasks}
+        rendered = self._rendered
+
+        stale = [iid for iid in self._order if iid not in rows]
+        if stale:
+            self.tree.delete(*stale)
+
+        # Order the tree will have once the new rows are appended
+        current = [iid for iid in self._order if iid in rows]
+        updated = 0
+        for iid, row in rows.items():
+            old = rendered.get(iid)
+            if old is None:
+                self.tree.insert("", "end", iid=iid, values=row[0], tags=row[1])
+                current.append(iid)
+            elif old != row:
+                self.tree.item(iid, values=row[0], tags=row[1])
+                updated += 1
+
+        order = list(rows)
+        if current != order:
+            self.tree.set_children("", *order)
+            metrics.count('treeview.reorder')
+        metrics.count('treeview.delete', len(stale))
+        metrics.count('treeview.insert', len(current) - (len(self._order) - len(stale)))
+        metrics.count('treeview.update', updated)
+
+        self._rendered = rows
+        self._order = order
+
+    def _on_tree_yscroll(self, first, last):
+        """Mirror the Treeview's own scrolling unless virtual mode drives the bar"""
+        if not self._virtual:
+            self.scrollbar.set(first, last)
+
+    def _on_scroll(self, *args):
+        """Scrollbar command: scroll the Treeview, or move the virtual window"""
+        if not self._virtual:
+            self.tree.yview(*args)
+            return
+
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * len(self._view_tasks))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self._visible_rows() - 1
+            self._offset += step
+        self._render_rows()
+
+    def _on_mousewheel(self, event):
+        """Scroll the virtual window by a few rows per wheel notch"""
+        if not self._virtual:
+            return None
+        if event.num == 4 or event.delta > 0:
+            self._offset -= 3
+        else:
+            self._offset += 3
+        self._render_rows()
+        return "break"
+
+    def _on_tree_resize(self, event):
+        """Re-fill the virtual window when the Treeview changes height"""
+        if self._virtual:
+            self._render_rows()
+
+    @metrics.timed('gui.filter_tasks')
     def _filter_tasks(self, event=None):
-        """Filter tasks based on search query"""
-        query = self.search_var.get().lower()
-        all_tasks = self.task_manager.get_tasks()
-        
-        if not query:
-            self._refresh_task_list(all_tasks)
+        """Debounce typing: start the search once keystrokes pause"""
+        self._typed_at = time.perf_counter()
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        # Whatever was searched for before is stale now
+        self.search_worker.cancel()
+        self._search_after = self.root.after(SEARCH_DEBOUNCE_MS, self._start_search)
+
+    @metrics.timed('gui.start_search')
+    def _start_search(self):
+        """Hand the current query to the search worker"""
+        self._search_after = None
+        query = self.search_var.get()
+
+        if not query.strip():
+            self._refresh_task_list()
             return
-            
-        filtered = [
-            t for t in all_tasks 
-            if query in t.title.lower() or 
-                query in t.priority.name.lower() or
-                (t.due_date and query in t.due_date.strftime("%Y-%m-%d")) or
-                any(query in tag.lower() for tag in t.tags)
-        ]
-        self._refresh_task_list(filtered)
+
+        # A structured query ('tag:#work due<today -done report'), planned
+        # against the tag, due-date and text indexes
+        self.search_worker.submit(query)
+        if not self._search_polling:
+            self._search_polling = True
+            self.root.after(SEARCH_POLL_MS, self._poll_search)
+
+    def _poll_search(self):
+        """Show the search result once the worker has it"""
+        result = self.search_worker.poll()
+        if result is not None:
+            if self._tag_filter is not None:
+                # Searches stay within the tag picked in the sidebar
+                tag = self._tag_filter.lower()
+                result = [task for task in result if any(t.lower() == tag for t in task.tags)]
+            self._refresh_task_list(result)
+            if metrics.enabled and self._typed_at is not None:
+                metrics.observe('gui.search_latency', time.perf_counter() - self._typed_at)
+        if self.search_worker.busy:
+            self.root.after(SEARCH_POLL_MS, self._poll_search)
+        else:
+            self._search_polling = False
 
     def _on_double_click(self, event):
         """Handle cell editing on double-click"""
@@ -257,39 +554,21 @@ class TodoApp:
         def save_edit():
             """Save the edited value back to the model"""
             new_value = entry.get()
-            self.tree.set(row_id, column, new_value)
             entry.destroy()
-            
-            # Update model
-            task_index = self.tree.index(row_id)
-            tasks = self.task_manager.get_tasks()
-            
-            if 0 <= task_index < len(tasks):
-                task = tasks[task_index]
-                
-                if col_index == 0:  # Title
-                    if not new_value.strip():
-                        messagebox.showerror("Error", "Title cannot be empty")
-                        return
-                    task.title = new_value
-                elif col_index == 1:  # Priority
-                    try:
-                        task.priority = Priority[new_value.upper()]
-                    except KeyError:
-                        messagebox.showerror("Error", "Invalid priority value")
-                        return
-                elif col_index == 2:  # Due Date
-                    try:
-                        if new_value:  # Only parse if not empty
-                            task.due_date = datetime.strptime(new_value, "%Y-%m-%d")
-                        else:
-                            task.due_date = None
-                    except ValueError:
-                        messagebox.showerror("Error", "Date must be in YYYY-MM-DD format")
-                        return
-                
-                self.task_manager._save_tasks()
-                self._refresh_task_list()  # Refresh to update colors if priority changed
+
+            # Update model; rows are keyed by task id. The cell is repainted
+            # from the saved task only, so a rejected edit leaves the old value
+            # (_reconcile would not rewrite a row whose task is unchanged)
+            field = {0: 'title', 1: 'priority', 2: 'due_date'}.get(col_index)
+            if field is None:
+                return
+            try:
+                self.task_manager.update_task(row_id, **{field: new_value})
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            self._refresh_task_list()  # Repaints the row, and its colors if priority changed
         
         entry.bind("<FocusOut>", lambda e: save_edit())
         entry.bind("<Return>", lambda e: save_edit())
@@ -318,31 +597,72 @@ class TodoApp:
         """Delete selected task"""
         selected = self.tree.selection()
         if selected:
-            index = self.tree.index(selected[0])
-            self.task_manager.delete_task(index)
+            self.task_manager.delete_task(selected[0])
             self._refresh_task_list()
 
     def _mark_complete(self):
         """Mark selected task as complete"""
         selected = self.tree.selection()
         if selected:
-            index = self.tree.index(selected[0])
-            tasks = self.task_manager.get_tasks()
-            if 0 <= index < len(tasks):
-                tasks[index].mark_completed()
-                self.task_manager._save_tasks()
-                self._refresh_task_list()
+            self.task_manager.update_task(selected[0], completed=True)
+            self._refresh_task_list()
 
     def _uncheck_task(self):
         """Uncheck selected task"""
         selected = self.tree.selection()
         if selected:
-            index = self.tree.index(selected[0])
-            tasks = self.task_manager.get_tasks()
-            if 0 <= index < len(tasks):
-                tasks[index].completed = False
-                self.task_manager._save_tasks()
-                self._refresh_task_list()
+            self.task_manager.update_task(selected[0], completed=False)
+            self._refresh_task_list()
+
+    def _archive_completed(self):
+        """Move tasks completed ARCHIVE_AFTER_DAYS or more ago to the archive, after asking"""
+        if not messagebox.askyesno(
+                "Archive Completed",
+                f"Move tasks completed at least {ARCHIVE_AFTER_DAYS} days ago to the archive?\n"
+                "They stay readable under View Archive."):
+            return
+        moved = self.task_manager.archive_completed(ARCHIVE_AFTER_DAYS)
+        self._refresh_task_list()
+        messagebox.showinfo("Archive Completed", f"Archived {moved} tasks.")
+
+    def _show_archive(self):
+        """List archived tasks in their own window, read lazily from the archive"""
+        top = tk.Toplevel(self.root)
+        top.title("Archived Tasks")
+        top.geometry("650x400")
+
+        bar = ttk.Frame(top)
+        bar.pack(fill="x", padx=10, pady=5)
+        ttk.Label(bar, text="Search:").pack(side="left")
+        search_var = tk.StringVar()
+        entry = ttk.Entry(bar, textvariable=search_var, width=30)
+        entry.pack(side="left", padx=5)
+
+        columns = ("Title", "Priority", "Due Date", "Completed", "Tags")
+        tree = ttk.Treeview(top, columns=columns, show="headings", selectmode="browse")
+        for column, width in zip(columns, (250, 80, 100, 100, 100)):
+            tree.heading(column, text=column)
+            tree.column(column, width=width, anchor="w" if column == "Title" else "center")
+        tree.pack(fill="both", expand=True, padx=10)
+        status = ttk.Label(top)
+        status.pack(pady=5)
+
+        def show(event=None):
+            tree.delete(*tree.get_children())
+            archived = self.task_manager.iter_archived(search_query=search_var.get().strip() or None)
+            tasks = list(islice(archived, ARCHIVE_VIEW_LIMIT))
+            for task in tasks:
+                tree.insert("", "end", values=(
+                    task.title, task.priority.name,
+                    task.due_date.strftime("%Y-%m-%d") if task.due_date else "",
+                    task.completed_at.strftime("%Y-%m-%d") if task.completed_at else "",
+                    ", ".join(task.tags)))
+            limited = " (oldest first, more not shown)" if len(tasks) == ARCHIVE_VIEW_LIMIT else ""
+            status.config(text=f"{len(tasks)} archived tasks{limited}")
+
+        ttk.Button(bar, text="Find", command=show).pack(side="left")
+        entry.bind("<Return>", show)
+        show()
 
 if __name__ == "__main__":
     root = tk.Tk()
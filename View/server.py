@@ -0,0 +1,365 @@
+"""Local HTTP/JSON API in front of one TaskManager, so several clients can
+share a task store without each of them loading the whole file.
+
+    python main.py serve --port 8765
+
+    GET    /tasks?completed=false&q=report&tag=work&sort=1&offset=0&limit=100
+    GET    /tasks?query=tag:%23work+due<today+-done
+    GET    /tasks/<id>
+    POST   /tasks                   {"title": ..., "due_date": ..., "priority": ..., "tags": [...]}
+    PATCH  /tasks/<id>              {"title": ..., "due_date": ..., "priority": ..., "completed": ...}
+    DELETE /tasks/<id>
+    POST   /tasks/clear-completed
+
+List filters: completed, q (search_query), tags (1 to let q match tags too),
+tag, due_from, due_to, query (structured, as the GUI search box takes it)
+and sort, as in TaskManager.get_tasks. Lists come back
+a page at a time: {"total", "offset", "limit", "next", "tasks"}.
+
+GET responses carry an ETag derived from the task set version; a request
+whose If-None-Match still matches gets an empty 304 without the query being
+run. Mutations go through a single writer that applies everything queued
+since its last round as one transaction. The server binds to localhost and
+has no authentication.
+"""
+
+import asyncio
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADERS = 100
+# How often to pick up changes other processes made to the task files
+EXTERNAL_POLL_SECONDS = 1.0
+
+UPDATE_FIELDS = {'title': str, 'due_date': (str, type(None)), 'priority': str, 'completed': bool}
+ADD_FIELDS = {'title': str, 'due_date': (str, type(None)), 'priority': str, 'tags': list}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _flag(name: str, value: str) -> bool:
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise HttpError(400, f"{name} must be true or false")
+
+
+def _int(name: str, value: str, low: int, high: int = None) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+    if number < low or (high is not None and number > high):
+        raise HttpError(400, f"{name} must be between {low} and {high}" if high else f"{name} must be >= {low}")
+    return number
+
+
+def _fields(body: dict, allowed: dict) -> dict:
+    """Check a JSON request body against field -> expected type(s)"""
+    if not isinstance(body, dict):
+        raise HttpError(400, "Request body must be a JSON object")
+    for name, value in body.items():
+        if name not in allowed:
+            raise HttpError(400, f"Unknown field {name!r}")
+        if not isinstance(value, allowed[name]):
+            raise HttpError(400, f"Invalid value for {name!r}")
+    if 'tags' in body and not all(isinstance(tag, str) for tag in body['tags']):
+        raise HttpError(400, "Tags must be strings")
+    return body
+
+
+class TaskServer:
+    """asyncio HTTP/1.1 server exposing a TaskManager.
+
+    Every TaskManager call runs on one dedicated thread, since the
+    manager serializes its methods under one lock anyway. The event loop
+    itself only parses requests and answers 304s.
+    """
+
+    def __init__(self, task_manager, host: str = "127.0.0.1", port: int = 8765):
+        self.task_manager = task_manager
+        self.host = host
+        self.port = port
+        # Part of every ETag, so a restarted server (whose version counter
+        # starts again) never validates a client's stale copy
+        self._instance = uuid.uuid4().hex[:8]
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-server")
+        self._queue: asyncio.Queue = None
+        self._server = None
+        self._background: list[asyncio.Task] = []
+
+    async def start(self):
+        """Bind and start accepting connections; `port` 0 picks a free port"""
+        self._queue = asyncio.Queue()
+        # Index everything for search now rather than in the first query
+        await self._call(self.task_manager.warm_indexes, None)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._background = [asyncio.create_task(self._write_loop()), asyncio.create_task(self._poll_external())]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting, finish queued mutations and stop the background tasks"""
+        self._server.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._executor.shutdown()
+
+    async def _call(self, fn, *args, **kwargs):
+        """Run a TaskManager call on the manager thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def _write(self, fn):
+        """Queue a mutation for the writer and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, future))
+        return await future
+
+    async def _write_loop(self):
+        while True:
+            ops = [await self._queue.get()]
+            while not self._queue.empty():
+                ops.append(self._queue.get_nowait())
+            try:
+                results = await self._call(self._apply_writes, [fn for fn, _ in ops])
+            except Exception as e:
+                # The commit itself failed, so none of the group was applied
+                results = [(False, e)] * len(ops)
+            for (_, future), (ok, value) in zip(ops, results):
+                if not future.done():
+                    future.set_result(value) if ok else future.set_exception(value)
+            for _ in ops:
+                self._queue.task_done()
+
+    def _apply_writes(self, fns) -> list[tuple]:
+        """Apply queued mutations as one transaction, so a burst costs one commit.
+
+        TaskManager validates before it changes anything, so a rejected
+        mutation is reported to its own request without rolling back the
+        others.
+        """
+        if len(fns) == 1:
+            # Nothing to group; skips the transaction's undo snapshot
+            try:
+                return [(True, fns[0]())]
+            except Exception as e:
+                return [(False, e)]
+        results = []
+        with self.task_manager.transaction():
+            for fn in fns:
+                try:
+                    results.append((True, fn()))
+                except Exception as e:
+                    results.append((False, e))
+        return results
+
+    async def _poll_external(self):
+        while True:
+            await asyncio.sleep(EXTERNAL_POLL_SECONDS)
+            try:
+                await self._call(self.task_manager.check_external_changes)
+            except Exception as e:
+                print(f"Error checking for external changes: {e}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    writer.write(self._response(e.status, {'error': str(e)}, {}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload, extra = await self._dispatch(method, target, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(self._response(status, payload, extra, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader):
+        """(method, target, headers, body), or None once the client hangs up"""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise HttpError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(431, "Too many headers")
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = _int("Content-Length", headers.get('content-length', '0'), 0)
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return parts[0].upper(), parts[1], headers, body
+
+    @staticmethod
+    def _response(status: int, payload, extra: dict, keep_alive: bool) -> bytes:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body:
+            lines.append("Content-Type: application/json")
+        lines.extend(f"{name}: {value}" for name, value in extra.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
+
+    async def _dispatch(self, method: str, target: str, headers: dict, body: bytes) -> tuple:
+        """(status, JSON payload or None, extra headers) for one request"""
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if not parts or parts[0] != 'tasks' or len(parts) > 2:
+                raise HttpError(404, f"No such resource {url.path}")
+            if len(parts) == 1:
+                if method == 'GET':
+                    return await self._list(parse_qs(url.query), headers)
+                if method == 'POST':
+                    return await self._add(_fields(self._json(body), ADD_FIELDS))
+            elif parts[1] == 'clear-completed':
+                if method == 'POST':
+                    removed = await self._write(self.task_manager.clear_completed)
+                    return 200, {'removed': removed}, {}
+            elif method == 'GET':
+                return await self._get(parts[1], headers)
+            elif method == 'PATCH':
+                return await self._update(parts[1], _fields(self._json(body), UPDATE_FIELDS))
+            elif method == 'DELETE':
+                if not await self._write(partial(self.task_manager.delete_task, parts[1])):
+                    raise HttpError(404, f"No task with id {parts[1]}")
+                return 204, None, {}
+            raise HttpError(405, f"{method} is not allowed on {url.path}")
+        except HttpError as e:
+            return e.status, {'error': str(e)}, {}
+        except ValueError as e:
+            return 400, {'error': str(e)}, {}
+        except Exception as e:
+            print(f"Error handling {method} {target}: {e}")
+            return 500, {'error': "Internal server error"}, {}
+
+    @staticmethod
+    def _json(body: bytes):
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON")
+
+    def _etag(self) -> str:
+        return f'"{self._instance}-{self.task_manager.version}"'
+
+    @staticmethod
+    def _not_modified(headers: dict, etag: str) -> bool:
+        tags = [tag.strip().removeprefix('W/') for tag in headers.get('if-none-match', '').split(',')]
+        return etag in tags or '*' in tags
+
+    async def _list(self, query: dict, headers: dict) -> tuple:
+        # Taken before the query runs: if a write lands meanwhile, the client
+        # holds newer data under an older tag and simply refetches next time
+        etag = self._etag()
+        if self._not_modified(headers, etag):
+            return 304, None, {'ETag': etag}
+        args = {name: values[-1] for name, values in query.items()}
+        offset = _int("offset", args.pop('offset', '0'), 0)
+        limit = _int("limit", args.pop('limit', str(DEFAULT_PAGE_SIZE)), 1, MAX_PAGE_SIZE)
+        kwargs = {}
+        for name, param in (('completed', 'filter_completed'), ('sort', 'sort'), ('tags', 'search_tags')):
+            if name in args:
+                kwargs[param] = _flag(name, args.pop(name))
+        for name, param in (('q', 'search_query'), ('tag', 'tag_filter'), ('due_from', 'due_from'),
+                            ('due_to', 'due_to'), ('query', 'query')):
+            if name in args:
+                kwargs[param] = args.pop(name)
+        if args:
+            raise HttpError(400, f"Unknown parameter {next(iter(args))!r}")
+        payload = await self._call(self._page, kwargs, offset, limit)
+        return 200, payload, {'ETag': etag}
+
+    def _page(self, kwargs: dict, offset: int, limit: int) -> dict:
+        tasks = self.task_manager.get_tasks(**kwargs)
+        end = offset + limit
+        return {
+            'total': len(tasks),
+            'offset': offset,
+            'limit': limit,
+            'next': end if end < len(tasks) else None,
+            'tasks': [task.to_dict() for task in tasks[offset:end]],
+        }
+
+    async def _get(self, task_id: str, headers: dict) -> tuple:
+        etag = self._etag()
+        if self._not_modified(headers, etag):
+            return 304, None, {'ETag': etag}
+        task = await self._call(self.task_manager.get_task, task_id)
+        if task is None:
+            raise HttpError(404, f"No task with id {task_id}")
+        return 200, task.to_dict(), {'ETag': etag}
+
+    async def _add(self, fields: dict) -> tuple:
+        if 'title' not in fields:
+            raise HttpError(400, "Missing field 'title'")
+        task = await self._write(partial(self.task_manager.add_task, **fields))
+        return 201, task.to_dict(), {'Location': f"/tasks/{task.id}"}
+
+    async def _update(self, task_id: str, fields: dict) -> tuple:
+        def update():
+            if not self.task_manager.update_task(task_id, **fields):
+                return None
+            return self.task_manager.get_task(task_id).to_dict()
+
+        task = await self._write(update)
+        if task is None:
+            raise HttpError(404, f"No task with id {task_id}")
+        return 200, task, {}
+
+
+async def _serve(task_manager, host: str, port: int):
+    server = TaskServer(task_manager, host, port)
+    await server.start()
+    print(f"Serving {task_manager.data_file} on http://{server.host}:{server.port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def serve(data_file, host: str = "127.0.0.1", port: int = 8765):
+    """Serve `data_file` until interrupted"""
+    from Controller.TaskManager import TaskManager
+    task_manager = TaskManager(data_file, journal=True, background=True)
+    try:
+        asyncio.run(_serve(task_manager, host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        task_manager.close()
@@ -0,0 +1,39 @@
+"""Compare JSON and binary snapshot load/save speed.
+
+Usage: python benchmarks/bench_storage.py [task counts...]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Controller.JsonStorage import JsonStorage
+from Controller.BinaryStorage import BinaryStorage
+from taskgen import generate_tasks
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(counts):
+    print(f"{'tasks':>9} {'format':>7} {'size MB':>8} {'save s':>8} {'load s':>8} {'first 500 ms':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            tasks = generate_tasks(count)
+            for name, storage in (("json", JsonStorage(Path(tmp) / "tasks.json")),
+                                  ("binary", BinaryStorage(Path(tmp) / "tasks.bin"))):
+                save_time, _ = timed(lambda: storage.save(tasks))
+                load_time, loaded = timed(storage.load)
+                assert len(loaded) == count
+                first_time, _ = timed(lambda: next(storage.iter_load(500), []))
+                size = storage.data_file.stat().st_size / 1e6
+                print(f"{count:>9} {name:>7} {size:>8.1f} {save_time:>8.2f} {load_time:>8.2f} {first_time * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
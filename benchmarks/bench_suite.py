@@ -0,0 +1,294 @@
+"""TaskManager benchmark suite with JSON results and baseline comparison.
+
+Usage:
+    python benchmarks/bench_suite.py [COUNTS...] [--repeat N] [--output results.json]
+                                     [--baseline baseline.json] [--threshold 0.2] [--only SUBSTRING]
+
+Times loading and saving, get_tasks for every filter combination,
+clear_completed and, when View.gui can be imported, the GUI's list refresh
+and search paths against a headless stand-in for the Tk widgets (so they
+measure the Python side of a refresh, not Tcl drawing). Each case is run
+`repeat` times on its own fresh state; min and median are recorded.
+
+With --baseline, every case also present in the baseline whose min got
+more than `threshold` slower (and by more than NOISE_FLOOR seconds) is
+reported as a regression and the exit status is 1. To refresh the
+baseline, run with --output and commit or keep the file.
+"""
+import argparse
+import itertools
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Controller.DueScheduler import DueScheduler
+from Controller.JsonStorage import JsonStorage
+from Controller.SearchWorker import SearchWorker
+from Controller.TaskManager import TaskManager
+from taskgen import generate_tasks, TODAY
+
+# Slowdowns smaller than this many seconds are treated as timer noise
+NOISE_FLOOR = 0.001
+SEARCH_QUERY = "report"
+# Structured queries, as typed into the search box
+QUERIES = {
+    'example': 'tag:#work priority:HIGH due<2025-07-01 -done "report"',
+    'tag+text': '#work report',
+    'overdue': 'is:overdue p>=medium',
+    'or': '#urgent OR due:2025-06-15',
+}
+
+
+def filter_combinations() -> list[tuple[str, dict]]:
+    """(name, get_tasks kwargs) for every combination of the filters"""
+    week = (TODAY.strftime("%Y-%m-%d"), (TODAY + timedelta(days=6)).strftime("%Y-%m-%d"))
+    options = [
+        [("", {}), ("done", {'filter_completed': True}), ("open", {'filter_completed': False})],
+        [("", {}), ("q", {'search_query': SEARCH_QUERY}), ("q+tags", {'search_query': SEARCH_QUERY, 'search_tags': True})],
+        [("", {}), ("tag", {'tag_filter': "work"})],
+        [("", {}), ("due", {'due_from': week[0], 'due_to': week[1]})],
+        [("", {}), ("sort", {'sort': True})],
+    ]
+    combos = []
+    for choice in itertools.product(*options):
+        name = ",".join(label for label, _ in choice if label) or "all"
+        kwargs = {key: value for _, option in choice for key, value in option.items()}
+        combos.append((f"get_tasks[{name}]", kwargs))
+    return combos
+
+
+def measure(fn, setup=None, repeat: int = 5) -> dict:
+    """Run setup() untimed then time fn(setup result), `repeat` times"""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'runs': repeat}
+
+
+class _HeadlessTree:
+    """Just enough of ttk.Treeview for TodoApp's refresh code to run"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def insert(self, *args, **kwargs):
+        self.calls += 1
+
+    def item(self, *args, **kwargs):
+        self.calls += 1
+
+    def delete(self, *args):
+        self.calls += 1
+
+    def set_children(self, *args):
+        self.calls += 1
+
+    def winfo_height(self):
+        return 500
+
+
+class _HeadlessListbox:
+    """Just enough of tk.Listbox for the tag sidebar"""
+
+    def delete(self, *args):
+        pass
+
+    def insert(self, *args):
+        pass
+
+    def selection_set(self, index):
+        pass
+
+
+class _HeadlessRoot:
+    """Tk root whose after() queue is run explicitly by the benchmark"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def after_cancel(self, after_id):
+        pass
+
+    def run_scheduled(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+
+class _Var:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def headless_app(manager: TaskManager):
+    """A TodoApp wired to `manager` without creating any Tk widgets, or None
+    if the GUI module cannot be imported here (e.g. tkcalendar missing)"""
+    try:
+        from View.gui import TodoApp
+    except ImportError as e:
+        print(f"Skipping GUI benchmarks: {e}")
+        return None
+    app = TodoApp.__new__(TodoApp)
+    app.root = _HeadlessRoot()
+    app.task_manager = manager
+    app.search_worker = SearchWorker(manager)
+    app.search_var = _Var()
+    app._search_after = None
+    app._search_polling = False
+    app._typed_at = None
+    app._rendered, app._order = {}, []
+    app._view_tasks, app._virtual, app._offset = [], False, 0
+    app._tag_filter, app._tag_names, app._tags_version = None, [None], None
+    # Never started, so refreshes only pay for its version check
+    app.due_scheduler = DueScheduler(manager, lambda due, overdue: None)
+    app.tag_list = _HeadlessListbox()
+    app.tree = _HeadlessTree()
+    app.scrollbar = type("Scrollbar", (), {'set': lambda self, first, last: None})()
+    return app
+
+
+def run_cases(count: int, tmp: Path, repeat: int, only: str) -> dict:
+    results = {}
+
+    def case(name, fn, setup=None):
+        if only and only not in name:
+            return
+        results[f"{name}/{count}"] = measure(fn, setup, repeat)
+
+    tasks = generate_tasks(count)
+    data_file = tmp / f"tasks-{count}.json"
+    JsonStorage(data_file).save(tasks)
+    # Without the query cache, so repeated runs time the query itself
+    manager = TaskManager(data_file, query_cache_size=0)
+
+    case("load", lambda _: manager._load_tasks())
+    case("save", lambda _: manager._save_tasks())
+    # Search goes through the text index, which is filled lazily; time the
+    # queries against a warm index and the first fill separately
+    case("index_build", lambda m: m.text_index.flush(), lambda: TaskManager(data_file))
+    manager.text_index.flush()
+    for name, kwargs in filter_combinations():
+        case(name, lambda _, kwargs=kwargs: manager.get_tasks(**kwargs))
+    for name, query in QUERIES.items():
+        case(f"get_tasks_query[{name}]", lambda _, query=query: manager.get_tasks(query=query))
+    manager.query_cache.maxsize = 32
+    manager.get_tasks(sort=True)
+    case("get_tasks_cached[sort]", lambda _: manager.get_tasks(sort=True))
+    # The GUI paths below are timed on cache misses, like a first keystroke
+    manager.query_cache.maxsize = 0
+    manager.query_cache.clear()
+
+    def fresh_manager():
+        # clear_completed rewrites the file, so every run starts from the original
+        JsonStorage(data_file).save(tasks)
+        return TaskManager(data_file)
+    case("clear_completed", lambda m: m.clear_completed(), fresh_manager)
+
+    def fresh_archive():
+        shutil.rmtree(data_file.with_suffix('.archive'), ignore_errors=True)
+        return fresh_manager()
+    case("archive_completed", lambda m: m.archive_completed(30), fresh_archive)
+    JsonStorage(data_file).save(tasks)
+
+    app = headless_app(manager)
+    if app is not None:
+        def reset_view():
+            app._rendered, app._order, app._offset = {}, [], 0
+        case("gui_refresh", lambda _: app._refresh_task_list(), reset_view)
+        case("gui_refresh_unchanged", lambda _: app._refresh_task_list())
+
+        def new_worker():
+            # A fresh worker, so the search is not refined from the last run's result
+            app.search_worker.close()
+            app.search_worker = SearchWorker(manager)
+            app.search_var.value = SEARCH_QUERY
+
+        def search(_):
+            app._filter_tasks()
+            app.root.run_scheduled()  # the debounced _start_search
+            # What _poll_search does once the result is in
+            app._refresh_task_list(app.search_worker.wait())
+        case("gui_filter", search, new_worker)
+        app.search_worker.close()
+    manager.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print current vs baseline, returns the names of the regressed cases"""
+    regressions = []
+    print(f"\n{'case':<48} {'baseline ms':>12} {'current ms':>11} {'change':>8}")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = current['min'] / old['min'] if old['min'] else float('inf')
+        regressed = ratio > 1 + threshold and current['min'] - old['min'] > NOISE_FLOOR
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<48} {old['min'] * 1000:>12.2f} {current['min'] * 1000:>11.2f} {ratio - 1:>+8.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark TaskManager on synthetic task lists")
+    parser.add_argument("counts", type=int, nargs="*", default=[10_000, 100_000],
+                        help="task list sizes, default 10000 100000 (up to 1M is practical)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, default 5")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown that counts as a regression, default 0.2 (20%%)")
+    parser.add_argument("--only", help="run only cases whose name contains this")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.counts:
+            results.update(run_cases(count, Path(tmp), args.repeat, args.only))
+
+    print(f"{'case':<48} {'min ms':>10} {'median ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<48} {result['min'] * 1000:>10.2f} {result['median'] * 1000:>10.2f}")
+
+    if args.output:
+        meta = {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Load-test the HTTP/JSON task server and report requests/s and latency percentiles.
+
+Usage: python benchmarks/load_test.py [--tasks N] [--clients C] [--duration S] [--writes F] [--port P]
+
+Without --port a server is started on a temporary file holding --tasks
+generated tasks. Each client keeps one connection open and loops over a mix
+of page reads (revalidated with If-None-Match, as a polling client would),
+filtered/searched reads and, with probability --writes, an add or update.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Controller.JsonStorage import JsonStorage
+from taskgen import generate_tasks
+
+READS = ["/tasks?limit=50", "/tasks?sort=1&limit=50", "/tasks?completed=false&limit=50",
+         "/tasks?tag=work&limit=50", "/tasks?q=report&tags=1&limit=50"]
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 client, enough for the server's responses"""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body=None, headers=None) -> tuple:
+        data = json.dumps(body).encode() if body is not None else b''
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(data)}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + data)
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        payload = await self.reader.readexactly(int(response_headers.get('content-length', 0)))
+        return status, response_headers, payload
+
+    def close(self):
+        self.writer.close()
+
+
+async def run_client(host: str, port: int, deadline: float, writes: float, seed: int, latencies: dict):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    await client.connect()
+    etags = {}
+    ids = []
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if rng.random() < writes:
+                if ids and rng.random() < 0.5:
+                    kind = "update"
+                    status, _, _ = await client.request("PATCH", f"/tasks/{rng.choice(ids)}",
+                                                        {'completed': rng.random() < 0.5})
+                else:
+                    kind = "add"
+                    status, _, payload = await client.request("POST", "/tasks", {'title': f"load test {seed}",
+                                                                                 'tags': ["#work"]})
+                    ids.append(json.loads(payload)['id'])
+            else:
+                path = rng.choice(READS)
+                headers = {'If-None-Match': etags[path]} if path in etags else None
+                status, response_headers, _ = await client.request("GET", path, headers=headers)
+                etags[path] = response_headers.get('etag', etags.get(path))
+                kind = "304" if status == 304 else "read"
+            if status >= 400:
+                raise RuntimeError(f"{kind} request failed with {status}")
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+    finally:
+        client.close()
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def report(latencies: dict, elapsed: float):
+    print(f"{'kind':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    every = [value for values in latencies.values() for value in values]
+    for kind, values in sorted(latencies.items()) + [("total", every)]:
+        print(f"{kind:>8} {len(values):>9} {len(values) / elapsed:>9.0f} "
+              f"{percentile(values, 0.5) * 1000:>8.2f} {percentile(values, 0.99) * 1000:>8.2f}")
+
+
+async def load(host: str, port: int, clients: int, duration: float, writes: float):
+    latencies = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, start + duration, writes, i, latencies) for i in range(clients)))
+    report(latencies, time.perf_counter() - start)
+
+
+def start_server(data_file: Path) -> tuple:
+    """Run `main.py serve` on a free port, returns (process, port)"""
+    main_py = Path(__file__).resolve().parent.parent / "main.py"
+    process = subprocess.Popen([sys.executable, str(main_py), "--file", str(data_file), "serve", "--port", "0"],
+                               stdout=subprocess.PIPE, text=True)
+    # "Serving <file> on http://127.0.0.1:<port>"
+    line = process.stdout.readline()
+    if not line:
+        raise RuntimeError("Server did not start")
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10_000, help="tasks in the generated store")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--writes", type=float, default=0.1, help="fraction of requests that write")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="load an already running server instead of starting one")
+    args = parser.parse_args()
+
+    if args.port:
+        asyncio.run(load(args.host, args.port, args.clients, args.duration, args.writes))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "tasks.json"
+        JsonStorage(data_file).save(generate_tasks(args.tasks))
+        process, port = start_server(data_file)
+        try:
+            asyncio.run(load(args.host, port, args.clients, args.duration, args.writes))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
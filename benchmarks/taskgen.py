@@ -0,0 +1,83 @@
+"""Reproducible synthetic task lists shaped like real ones.
+
+Real lists are skewed: a handful of tags (#work, #home) cover most tasks
+while a long tail is used once or twice, due dates bunch up around today
+with a backlog of overdue items, most tasks are MEDIUM priority, and older
+tasks are more likely to be done. generate_tasks() reproduces that with
+Zipf-distributed tags and title words, so index and filter benchmarks see
+realistic selectivities instead of uniform ones.
+
+Usage: python benchmarks/taskgen.py COUNT OUT_FILE [--seed N]
+"""
+import argparse
+import bisect
+import itertools
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Model.Task import Task, Priority
+from Controller.StorageBackend import open_storage
+
+# Fixed reference day, so the same seed always yields the same file
+TODAY = datetime(2025, 6, 15)
+HEAD_TAGS = ["#work", "#home", "#errands", "#urgent", "#someday", "#health", "#finance", "#family"]
+WORDS = ("report review plan call email budget meeting draft fix deploy buy book pay clean write read "
+         "update prepare send check order schedule renew cancel submit organize backup test refactor").split()
+PRIORITY_WEIGHTS = {Priority.LOW: 0.25, Priority.MEDIUM: 0.55, Priority.HIGH: 0.20}
+
+
+def _zipf_sampler(items: list, rng: random.Random, exponent: float = 1.1):
+    """Draw from `items` with weight 1 / rank**exponent"""
+    cumulative = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, len(items) + 1)))
+    total = cumulative[-1]
+    return lambda: items[bisect.bisect(cumulative, rng.random() * total)]
+
+
+def generate_tasks(count: int, seed: int = 0, tag_count: int = 500) -> list[Task]:
+    """`count` tasks with skewed tags, titles, priorities and due dates"""
+    rng = random.Random(seed)
+    tags = HEAD_TAGS + [f"#project-{i}" for i in range(tag_count - len(HEAD_TAGS))]
+    next_tag = _zipf_sampler(tags, rng)
+    next_word = _zipf_sampler(WORDS, rng)
+    priorities = list(PRIORITY_WEIGHTS)
+    weights = list(PRIORITY_WEIGHTS.values())
+
+    tasks = []
+    for i in range(count):
+        due_date = None
+        if rng.random() < 0.75:
+            # Mostly the next few weeks, with a long tail of overdue items
+            offset = int(rng.gauss(7, 10)) if rng.random() < 0.7 else -int(rng.expovariate(1 / 60))
+            due_date = TODAY + timedelta(days=offset)
+        title = " ".join(next_word() for _ in range(rng.randint(2, 5))) + f" {i}"
+        task_tags = sorted({next_tag() for _ in range(min(rng.randint(0, 3), rng.randint(0, 3)))})
+        completed = rng.random() < (0.7 if due_date and due_date < TODAY else 0.15)
+        # Finished on the due date, or for undated tasks some time in the last
+        # quarter; derived without the rng so the other fields stay as they were
+        completed_at = None
+        if completed:
+            completed_at = min(due_date, TODAY) if due_date else TODAY - timedelta(days=i % 90)
+        tasks.append(Task.from_fields(f"{seed:04x}{i:028x}", title, due_date,
+                                      rng.choices(priorities, weights)[0], completed, task_tags, completed_at))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic task list")
+    parser.add_argument("count", type=int)
+    parser.add_argument("out_file", type=Path, help=".json, .bin or .db, picked by suffix")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    storage = open_storage(args.out_file)
+    storage.save(generate_tasks(args.count, args.seed))
+    storage.close()
+    print(f"Wrote {args.count} tasks to {args.out_file}")
+
+
+if __name__ == "__main__":
+    main()
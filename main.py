@@ -1,7 +1,21 @@
-from View.gui import TodoApp
-import tkinter as tk
+import sys
 
-if __name__ == "__main__":
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        # Any arguments mean headless use; never touches tkinter
+        from View.cli import main as cli_main
+        return cli_main(argv)
+
+    # Imported here so the CLI does not pay for (or need a display for) the GUI
+    import tkinter as tk
+    from View.gui import TodoApp
     root = tk.Tk()
     app = TodoApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())